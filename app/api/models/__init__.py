@@ -8,6 +8,7 @@ from app.api.models.task import (
 from app.api.models.directory import (
     DirectoryTriggerRequest,
     DirectoriesTriggerRequest,
+    ChangeFeedRequest,
     QuickStrmRequest
 )
 
@@ -19,5 +20,6 @@ __all__ = [
     "TaskInfo",
     "DirectoryTriggerRequest",
     "DirectoriesTriggerRequest",
+    "ChangeFeedRequest",
     "QuickStrmRequest"
 ]
\ No newline at end of file
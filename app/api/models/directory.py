@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 
 
 class DirectoryTriggerRequest(BaseModel):
@@ -18,6 +18,11 @@ class DirectoriesTriggerRequest(BaseModel):
     overwrite: bool = False
 
 
+class ChangeFeedRequest(BaseModel):
+    """目录变更推送请求"""
+    paths: List[str]
+
+
 class QuickStrmRequest(BaseModel):
     """快速 STRM 生成请求（无需预配置）"""
     alist_url: str
@@ -27,6 +32,7 @@ class QuickStrmRequest(BaseModel):
     source_dir: str
     target_dir: str
     mode: str = "AlistURL"
+    sign_secret: str = ""
     flatten_mode: bool = False
     subtitle: bool = False
     image: bool = False
@@ -34,6 +40,24 @@ class QuickStrmRequest(BaseModel):
     other_ext: str = ""
     max_workers: int = 50
     max_downloaders: int = 5
+    max_list_workers: int = 5
+    list_per_page: int = 0
+    max_page_workers: int = 3
+    max_detail_workers: int = 5
+    max_writers: int = 4
     wait_time: float = 0
+    rate_limit: Optional[Dict[str, Any]] = None
     sync_server: bool = False
-    sync_ignore: Optional[str] = None
\ No newline at end of file
+    sync_ignore: Optional[str] = None
+    include: Optional[List[str]] = None
+    exclude: Optional[List[str]] = None
+    incremental: bool = False
+    full_rescan_interval: int = 7
+    use_search: bool = False
+    search_max_age: float = 24
+    use_manifest: bool = False
+    checkpoint_interval: float = 0
+    newest_first: bool = False
+    time_budget: float = 0
+    max_processes: int = 1
+    outputs: Optional[List[Dict[str, Any]]] = None
\ No newline at end of file
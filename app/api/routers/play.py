@@ -0,0 +1,56 @@
+from hmac import compare_digest
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import RedirectResponse
+
+from app.api.dependencies import verify_api_key, get_task_manager
+from app.core import settings, logger
+from app.utils import AlistUtils
+
+router = APIRouter(prefix="/api", tags=["play"])
+
+
+@router.get("/play/metrics")
+async def get_play_metrics(
+    _: bool = Depends(verify_api_key),
+    task_manager=Depends(get_task_manager)
+):
+    """
+    获取各任务播放地址解析的统计信息（缓存命中数、fs/get 请求数与耗时等）
+    """
+    return task_manager.get_play_metrics()
+
+
+@router.api_route("/play/{task_id}/{path:path}", methods=["GET", "HEAD"])
+async def play(
+    task_id: str,
+    path: str,
+    sign: Optional[str] = None,
+    task_manager=Depends(get_task_manager)
+):
+    """
+    PlayURL 模式的 strm 文件指向的播放地址，解析文件的 raw_url 后重定向
+
+    播放器无法携带 API 密钥，设置了 API 密钥时通过地址中的签名校验
+
+    :param task_id: Alist2Strm 任务ID
+    :param path: 文件在 Alist 中的路径
+    :param sign: 播放地址签名
+    """
+    path = "/" + path
+    api_key = getattr(settings, 'APIConfig', {}).get('api_key')
+    if api_key and not compare_digest(
+        sign or "", AlistUtils.sign(api_key, task_id + path)
+    ):
+        raise HTTPException(status_code=403, detail="Invalid sign")
+
+    try:
+        raw_url = await task_manager.resolve_play_url(task_id, path)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to resolve {path}: {str(e)}")
+        raise HTTPException(status_code=502, detail=str(e))
+
+    return RedirectResponse(raw_url, status_code=302)
@@ -8,6 +8,7 @@ from app.api.models import (
     TaskStatus,
     DirectoryTriggerRequest,
     DirectoriesTriggerRequest,
+    ChangeFeedRequest,
     QuickStrmRequest
 )
 from app.api.dependencies import verify_api_key, get_task_manager
@@ -191,6 +192,28 @@ async def trigger_directories(
     }
 
 
+@router.post("/alist2strm/{task_id}/changes")
+async def push_changes(
+    task_id: str,
+    request: ChangeFeedRequest,
+    _: bool = Depends(verify_api_key),
+    task_manager=Depends(get_task_manager)
+):
+    """
+    推送变更的目录路径
+
+    变更经去抖、合并为共同的上级目录后，以一次多起点遍历处理，
+    任务正在运行（如全量扫描）时同样会处理
+
+    :param task_id: Alist2Strm 任务ID
+    :param request: 变更推送请求
+    """
+    try:
+        return task_manager.push_changes(task_id, request.paths)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.post("/alist2strm/quick")
 async def quick_strm_generation(
     request: QuickStrmRequest,
@@ -1,7 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core import settings, logger
-from app.api.routers import tasks, health
+from app.api.routers import tasks, health, play
 from app.version import APP_VERSION
 
 # 创建 FastAPI 应用
@@ -29,6 +29,7 @@ app.add_middleware(
 # 注册路由
 app.include_router(health.router)
 app.include_router(tasks.router)
+app.include_router(play.router)
 
 
 @app.on_event("startup")
@@ -0,0 +1,129 @@
+from asyncio import Event, Task, create_task, get_running_loop, wait_for
+from collections.abc import Awaitable, Callable, Iterable
+from posixpath import dirname, normpath
+
+from app.core.log import logger
+
+
+def collapse_paths(paths: Iterable[str], max_roots: int = 50) -> list[str]:
+    """
+    合并变更路径：去除已被其它路径包含的子路径；
+    合并后的路径数超过 max_roots 时，逐层将最深的路径替换为其上级目录，直至不超过 max_roots
+
+    :param paths: 路径（以 "/" 开头）
+    :param max_roots: 合并后的路径数上限
+    :return: 互不包含的有序路径列表
+    """
+
+    def remove_nested(paths: Iterable[str]) -> list[str]:
+        roots: list[str] = []
+        # 排序后祖先目录位于其子路径之前，且子路径紧随其后
+        for path in sorted(set(paths), key=lambda path: path.split("/")):
+            if roots and (
+                path == roots[-1] or path.startswith(roots[-1].rstrip("/") + "/")
+            ):
+                continue
+            roots.append(path)
+        return roots
+
+    roots = remove_nested(normpath("/" + path.lstrip("/")) for path in paths)
+    while len(roots) > max(1, max_roots):
+        depth = max(root.count("/") for root in roots)
+        roots = remove_nested(
+            dirname(root) if root.count("/") == depth else root for root in roots
+        )
+    return roots
+
+
+class ChangeFeed:
+    """
+    目录变更推送队列
+    接收变更的目录路径，debounce 秒内没有新的变更（或距本批第一个变更超过 max_delay 秒）时，
+    将本批路径合并为互不包含的目录，交给 handler 执行一次多起点遍历；
+    同一队列同时只执行一批，执行期间收到的变更进入下一批
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[list[str]], Awaitable[object]],
+        debounce: float = 5,
+        max_delay: float = 60,
+        max_roots: int = 50,
+    ) -> None:
+        """
+        :param handler: 处理一批合并后目录的协程函数
+        :param debounce: 等待后续变更的时间，单位为秒
+        :param max_delay: 一批变更的最长等待时间，单位为秒
+        :param max_roots: 一批中合并后的目录数上限
+        """
+        self.__handler = handler
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.max_roots = max_roots
+        self.__paths: set[str] = set()
+        self.__event = Event()
+        self.__task: Task | None = None
+        self.batches = 0  # 已执行的批次数
+
+    @property
+    def pending(self) -> int:
+        """
+        等待执行的变更路径数
+        """
+        return len(self.__paths)
+
+    @property
+    def running(self) -> bool:
+        """
+        是否有等待或正在执行的批次
+        """
+        return self.__task is not None
+
+    def push(self, paths: Iterable[str]) -> int:
+        """
+        加入变更路径
+
+        :param paths: 变更的目录路径
+        :return: 等待执行的变更路径数
+        """
+        self.__paths.update(paths)
+        self.__event.set()
+        if self.__task is None and self.__paths:
+            self.__task = create_task(self.__loop())
+        return len(self.__paths)
+
+    async def __loop(self) -> None:
+        """
+        依次执行各批变更，没有等待的变更时退出
+        """
+        loop = get_running_loop()
+        try:
+            while self.__paths:
+                deadline = loop.time() + self.max_delay
+                while True:
+                    self.__event.clear()
+                    timeout = min(self.debounce, deadline - loop.time())
+                    if timeout <= 0:
+                        break
+                    try:
+                        await wait_for(self.__event.wait(), timeout)
+                    except TimeoutError:
+                        break
+
+                roots = collapse_paths(self.__paths, self.max_roots)
+                logger.info(f"处理 {len(self.__paths)} 个变更路径，合并为 {len(roots)} 个目录")
+                self.__paths = set()
+                self.batches += 1
+                try:
+                    await self.__handler(roots)
+                except Exception as e:
+                    logger.error(f"处理变更目录失败：{e}")
+        finally:
+            self.__task = None
+
+    async def join(self) -> None:
+        """
+        等待所有已加入的变更执行完毕
+        """
+        while self.__task is not None:
+            await self.__task
@@ -2,9 +2,13 @@ from typing import Dict, Any, Optional, List
 from datetime import datetime
 from asyncio import create_task, Task as AsyncTask
 from enum import Enum
+from posixpath import dirname, splitext
 
 from app.core import settings, logger
+from app.core.change_feed import ChangeFeed
 from app.modules import Alist2Strm, Ani2Alist, LibraryPoster
+from app.modules.alist import AlistClient, AlistRawURLResolver
+from app.extensions import VIDEO_EXTS, SUBTITLE_EXTS, IMAGE_EXTS, NFO_EXTS
 from app.api.models.task import TaskStatus, TaskInfo
 
 
@@ -23,6 +27,8 @@ class TaskManager:
         self.tasks: Dict[str, Dict[str, Any]] = {}
         self.running_tasks: Dict[str, AsyncTask] = {}
         self.task_history: List[Dict[str, Any]] = []
+        self.change_feeds: Dict[str, ChangeFeed] = {}
+        self.play_resolvers: Dict[str, AlistRawURLResolver] = {}
         self._initialize_tasks()
 
     def _initialize_tasks(self):
@@ -233,6 +239,112 @@ class TaskManager:
             if task_id in self.running_tasks:
                 del self.running_tasks[task_id]
 
+    def push_changes(self, task_id: str, paths: List[str]) -> Dict[str, Any]:
+        """
+        加入变更路径（仅适用于 Alist2Strm）
+        变更经去抖、合并后以一次多起点遍历处理，不受任务运行状态限制，可以与全量扫描同时进行
+        文件路径（后缀为媒体、字幕、图片或 .nfo）按其所在目录处理，不在任务 source_dir 下的路径被忽略
+        """
+        task = self.get_task(task_id)
+        if not task:
+            raise ValueError(f"Task {task_id} not found")
+
+        if task["type"] != TaskType.ALIST2STRM:
+            raise ValueError(f"Task {task_id} is not an Alist2Strm task")
+
+        config = task["config"]
+        source_dir = "/" + config.get("source_dir", "/").strip("/")
+        file_exts = VIDEO_EXTS | SUBTITLE_EXTS | IMAGE_EXTS | NFO_EXTS
+        accepted, ignored = [], []
+        for path in paths:
+            path = "/" + path.strip().strip("/")
+            if splitext(path)[1].lower() in file_exts:
+                path = dirname(path)
+            if path == source_dir or path.startswith(source_dir.rstrip("/") + "/"):
+                accepted.append(path)
+            else:
+                ignored.append(path)
+
+        feed = self.change_feeds.get(task_id)
+        if feed is None:
+            feed = ChangeFeed(
+                lambda dirs: self._run_change_batch(task_id, dirs),
+                debounce=config.get("feed_debounce", 5),
+                max_delay=config.get("feed_max_delay", 60),
+            )
+            self.change_feeds[task_id] = feed
+        pending = feed.push(accepted)
+
+        return {
+            "status": "accepted",
+            "task_id": task_id,
+            "accepted": len(accepted),
+            "ignored": ignored,
+            "pending": pending
+        }
+
+    async def _run_change_batch(self, task_id: str, directories: List[str]) -> Dict[str, Any]:
+        """执行一批合并后的变更目录"""
+        task = self.tasks[task_id]
+        started_at = datetime.now()
+        try:
+            instance = Alist2Strm(**task["config"])
+            result = await instance.run(specific_dirs=directories)
+            self.task_history.append({
+                "task_id": task_id,
+                "status": TaskStatus.COMPLETED,
+                "started_at": started_at,
+                "completed_at": datetime.now(),
+                "directories": directories,
+                "result": result
+            })
+            return result
+        except Exception as e:
+            self.task_history.append({
+                "task_id": task_id,
+                "status": TaskStatus.FAILED,
+                "started_at": started_at,
+                "completed_at": datetime.now(),
+                "directories": directories,
+                "error": str(e)
+            })
+            raise
+
+    async def resolve_play_url(self, task_id: str, path: str) -> str:
+        """
+        解析文件的 raw_url（仅适用于 Alist2Strm），供 PlayURL 模式的 strm 文件播放时使用
+        每个任务使用一个带缓存的解析器，缓存时间与条目数由任务配置 play_cache_ttl、play_cache_size 设置
+        """
+        task = self.get_task(task_id)
+        if not task or task["type"] != TaskType.ALIST2STRM:
+            raise ValueError(f"Alist2Strm task {task_id} not found")
+
+        resolver = self.play_resolvers.get(task_id)
+        if resolver is None:
+            config = task["config"]
+            client = AlistClient(
+                config.get("url", "http://localhost:5244"),
+                config.get("username", ""),
+                config.get("password", ""),
+                config.get("token", ""),
+            )
+            resolver = AlistRawURLResolver(
+                client,
+                ttl=config.get("play_cache_ttl", 300),
+                max_size=config.get("play_cache_size", 10000),
+            )
+            self.play_resolvers[task_id] = resolver
+
+        await resolver.client.ensure_initialized()
+        return await resolver.resolve(path)
+
+    def get_play_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """获取各任务播放地址解析的统计信息"""
+        return {
+            task_id: resolver.metrics()
+            for task_id, resolver in self.play_resolvers.items()
+        }
+
     async def create_quick_strm(self, config: Dict[str, Any]) -> Dict[str, Any]:
         """快速创建 STRM 文件（无需预配置）"""
         try:
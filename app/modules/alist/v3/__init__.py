@@ -1,3 +1,5 @@
 from app.modules.alist.v3.client import AlistClient
-from app.modules.alist.v3.path import AlistPath
+from app.modules.alist.v3.path import AlistPath, AlistEntry
 from app.modules.alist.v3.storage import AlistStorage
+from app.modules.alist.v3.cache import AlistListingCache
+from app.modules.alist.v3.resolver import AlistRawURLResolver
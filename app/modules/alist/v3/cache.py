@@ -0,0 +1,130 @@
+from json import dumps, loads
+from pathlib import Path
+from time import time
+
+from app.core import logger
+from app.utils import SQLiteUtils
+
+
+class AlistListingCache:
+    """
+    Alist 目录列表缓存
+    使用 SQLite 持久化保存目录的修改时间及其子条目，用于增量遍历：
+    父目录列表中子目录的修改时间与缓存一致时，直接使用缓存的子条目，不再请求 fs/list
+
+    注意：部分网盘在深层文件变化时不会更新上级目录的修改时间，
+    此类存储器需要定期执行全量扫描以发现变化
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        server: str,
+        refresh: bool = False,
+        commit_interval: int = 500,
+    ) -> None:
+        """
+        :param db_path: SQLite 数据库文件路径
+        :param server: 服务器标识（Alist 服务器地址 + 用户基础路径）
+        :param refresh: 刷新模式，只写入缓存不读取缓存（用于全量扫描）
+        :param commit_interval: 每写入多少个目录提交一次事务
+        """
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.server = server
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self.__commit_interval = commit_interval
+        self.__pending = 0
+        self.__conn = SQLiteUtils.connect(db_path)
+        self.__conn.execute(
+            "CREATE TABLE IF NOT EXISTS listing ("
+            "server TEXT NOT NULL, path TEXT NOT NULL, modified TEXT NOT NULL, "
+            "children TEXT NOT NULL, PRIMARY KEY (server, path))"
+        )
+        self.__conn.execute(
+            "CREATE TABLE IF NOT EXISTS full_scan ("
+            "server TEXT NOT NULL, path TEXT NOT NULL, scanned_at REAL NOT NULL, "
+            "PRIMARY KEY (server, path))"
+        )
+        self.__conn.commit()
+
+    def get(self, dir_path: str, modified: str) -> list[dict] | None:
+        """
+        获取目录的缓存子条目
+
+        :param dir_path: 目录路径
+        :param modified: 父目录列表中该目录的修改时间
+        :return: 子条目字典列表，缓存不存在或已过期时返回 None
+        """
+        if self.refresh:
+            return None
+
+        row = self.__conn.execute(
+            "SELECT modified, children FROM listing WHERE server = ? AND path = ?",
+            (self.server, dir_path),
+        ).fetchone()
+        if row is None or row[0] != modified:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        logger.debug(f"目录 {dir_path} 未变化，使用缓存的文件列表")
+        return loads(row[1])
+
+    def set(self, dir_path: str, modified: str, children: list[dict]) -> None:
+        """
+        保存目录的子条目
+
+        :param dir_path: 目录路径
+        :param modified: 目录的修改时间
+        :param children: 子条目字典列表
+        """
+        self.__conn.execute(
+            "INSERT OR REPLACE INTO listing (server, path, modified, children) "
+            "VALUES (?, ?, ?, ?)",
+            (self.server, dir_path, modified, dumps(children, ensure_ascii=False)),
+        )
+        self.__pending += 1
+        if self.__pending >= self.__commit_interval:
+            self.commit()
+
+    def get_full_scan_time(self, dir_path: str) -> float | None:
+        """
+        获取目录上次全量扫描完成的时间戳
+
+        :param dir_path: 目录路径
+        """
+        row = self.__conn.execute(
+            "SELECT scanned_at FROM full_scan WHERE server = ? AND path = ?",
+            (self.server, dir_path),
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_full_scan_time(self, dir_path: str, scanned_at: float | None = None) -> None:
+        """
+        记录目录全量扫描完成的时间戳
+
+        :param dir_path: 目录路径
+        :param scanned_at: 时间戳，默认为当前时间
+        """
+        self.__conn.execute(
+            "INSERT OR REPLACE INTO full_scan (server, path, scanned_at) "
+            "VALUES (?, ?, ?)",
+            (self.server, dir_path, scanned_at if scanned_at is not None else time()),
+        )
+        self.commit()
+
+    def commit(self) -> None:
+        """
+        提交未保存的修改
+        """
+        self.__conn.commit()
+        self.__pending = 0
+
+    def close(self) -> None:
+        """
+        提交修改并释放数据库连接
+        """
+        self.commit()
+        SQLiteUtils.close(self.__conn)
@@ -1,13 +1,26 @@
-from asyncio import sleep
-from typing import Callable, AsyncGenerator
+from asyncio import (
+    FIRST_COMPLETED,
+    PriorityQueue,
+    Queue,
+    Task,
+    create_task,
+    gather,
+    shield,
+    wait,
+)
+from itertools import count, islice
+from math import ceil
+from typing import Awaitable, Callable, AsyncGenerator
 from time import time
+from datetime import datetime
 
 from httpx import Response
 
 from app.core import logger
 from app.utils import RequestUtils, Multiton
-from app.modules.alist.v3.path import AlistPath
+from app.modules.alist.v3.path import AlistPath, AlistEntry
 from app.modules.alist.v3.storage import AlistStorage
+from app.modules.alist.v3.cache import AlistListingCache
 
 
 class AlistClient(metaclass=Multiton):
@@ -15,6 +28,13 @@ class AlistClient(metaclass=Multiton):
     Alist 客户端 API
     """
 
+    # 搜索结果不包含时间信息时使用的占位时间
+    SEARCH_UNKNOWN_TIME: str = "1970-01-01T00:00:00+00:00"
+    # 临时令牌有效时间：2天 - 5分钟（alist 令牌有效期为 2 天，提前 5 分钟视为过期）
+    TOKEN_TTL: int = 2 * 24 * 60 * 60 - 5 * 60
+    # 临时令牌剩余有效时间少于该值时在后台提前刷新，1小时
+    TOKEN_REFRESH_AHEAD: int = 60 * 60
+
     def __init__(
         self,
         url: str,
@@ -34,17 +54,18 @@ class AlistClient(metaclass=Multiton):
         if (username == "" or password == "") and token == "":
             raise ValueError("用户名及密码为空或令牌 Token 为空")
 
-        self.__client = RequestUtils.get_client()
         self.__token = {
             "token": "",  # 令牌 token str
             "expires": 0,  # 令牌过期时间（时间戳，-1为永不过期） int
         }
+        self.__refresh_task: Task[str] | None = None
         self.base_path = ""
         self.id = 0
 
         if not url.startswith("http"):
             url = "https://" + url
         self.url = url.rstrip("/")
+        self.__client = RequestUtils.get_client(self.url)
 
         if token != "":
             self.__token["token"] = token
@@ -55,7 +76,19 @@ class AlistClient(metaclass=Multiton):
         else:
             raise ValueError("用户名及密码为空或令牌 Token 为空")
 
-        self.sync_api_me()
+        # 用户信息（base_path、id）在首次使用时通过 ensure_initialized 异步获取
+        self.__init_task: Task[None] | None = None
+
+    async def ensure_initialized(self) -> None:
+        """
+        确保已获取当前用户信息（base_path 和 id）
+        首次调用时请求 /api/me，并发调用共享同一请求，失败后下次调用会重新请求
+        """
+
+        task = self.__init_task
+        if task is None or (task.done() and (task.cancelled() or task.exception())):
+            task = self.__init_task = create_task(self.async_api_me())
+        await shield(task)
 
     async def __request(
         self,
@@ -72,9 +105,13 @@ class AlistClient(metaclass=Multiton):
         :param auth header 中是否带有 alist 认证令牌
         """
 
+        # 接口中的路径相对用户基础路径，限速覆盖规则按挂载路径（服务器上的绝对路径）匹配
+        json = kwargs.get("json") or {}
+        if json.get("path"):
+            kwargs.setdefault("rate_key", self.base_path.rstrip("/") + json["path"])
         if auth:
             headers = kwargs.get("headers", {})
-            headers["Authorization"] = self.__get_token
+            headers["Authorization"] = await self.__async_get_token()
             kwargs["headers"] = headers
         return await self.__client.request(method, url, **kwargs, sync=False)
 
@@ -112,38 +149,71 @@ class AlistClient(metaclass=Multiton):
 
         return self.___password
 
-    @property
-    def __get_token(self) -> str:
+    async def __async_get_token(self) -> str:
         """
-        返回可用登录令牌
+        异步返回可用登录令牌
+        临时令牌即将过期时在后台提前刷新并继续使用当前令牌，已过期时等待刷新完成；
+        同一时间只有一个登录请求，所有等待者共享其结果
 
         :return: 登录令牌 token
         """
 
         if self.__token["expires"] == -1:
-            logger.debug("使用永久令牌")
             return self.__token["token"]
-        else:
-            logger.debug("使用临时令牌")
-            now_stamp = int(time())
 
-            if self.__token["expires"] < now_stamp:  # 令牌过期需要重新更新
-                self.__token["token"] = self.api_auth_login()
-                self.__token["expires"] = (
-                    now_stamp + 2 * 24 * 60 * 60 - 5 * 60
-                )  # 2天 - 5分钟（alist 令牌有效期为 2 天，提前 5 分钟刷新）
+        now_stamp = int(time())
+        if self.__token["expires"] - now_stamp > self.TOKEN_REFRESH_AHEAD:
+            return self.__token["token"]
 
+        refresh_task = self.__refresh_token()
+        if self.__token["expires"] > now_stamp:
+            logger.debug("临时令牌即将过期，在后台刷新令牌")
             return self.__token["token"]
 
-    def api_auth_login(self) -> str:
+        # 使用 shield 避免单个等待者被取消时取消共享的刷新任务
+        return await shield(refresh_task)
+
+    def __refresh_token(self) -> Task[str]:
+        """
+        获取进行中的令牌刷新任务，没有时创建新任务
+
+        :return: 令牌刷新任务
+        """
+
+        if self.__refresh_task is None or self.__refresh_task.done():
+            self.__refresh_task = create_task(self.__do_refresh_token())
+            self.__refresh_task.add_done_callback(self.__on_token_refreshed)
+        return self.__refresh_task
+
+    def __on_token_refreshed(self, task: Task[str]) -> None:
+        """
+        令牌刷新任务完成回调，记录后台刷新失败的原因
         """
-        登录 Alist 服务器认证账户信息
+
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"刷新 Alist 令牌失败：{task.exception()}")
+
+    async def __do_refresh_token(self) -> str:
+        """
+        登录并更新临时令牌
+
+        :return: 新的登录令牌 token
+        """
+
+        token = await self.async_api_auth_login()
+        self.__token["token"] = token
+        self.__token["expires"] = int(time()) + self.TOKEN_TTL
+        return token
+
+    async def async_api_auth_login(self) -> str:
+        """
+        异步登录 Alist 服务器认证账户信息
 
         :return: 重新申请的登录令牌 token
         """
 
         json = {"username": self.username, "password": self.__password}
-        resp = self.__client.post(self.url + "/api/auth/login", json=json, sync=True)
+        resp = await self.__post(self.url + "/api/auth/login", auth=False, json=json)
         if resp.status_code != 200:
             raise RuntimeError(f"更新令牌请求发送失败，状态码：{resp.status_code}")
 
@@ -155,14 +225,13 @@ class AlistClient(metaclass=Multiton):
         logger.debug(f"{self.username} 更新令牌成功")
         return result["data"]["token"]
 
-    def sync_api_me(self) -> None:
+    async def async_api_me(self) -> None:
         """
-        获取用户信息
+        异步获取用户信息
         获取当前用户 base_path 和 id 并分别保存在 self.base_path 和 self.id 中
         """
 
-        headers = {"Authorization": self.__get_token}
-        resp = self.__client.get(self.url + "/api/me", headers=headers, sync=True)
+        resp = await self.__get(self.url + "/api/me")
 
         if resp.status_code != 200:
             raise RuntimeError(f"获取用户信息请求发送失败，状态码：{resp.status_code}")
@@ -178,21 +247,27 @@ class AlistClient(metaclass=Multiton):
         except Exception:
             raise RuntimeError("获取用户信息失败")
 
-    async def async_api_fs_list(self, dir_path: str) -> list[AlistPath]:
+        logger.debug(f"获取用户信息成功，base_path：{self.base_path}")
+
+    async def __fs_list_page(
+        self, dir_path: str, page: int, per_page: int
+    ) -> tuple[list[AlistEntry], int]:
         """
-        获取文件列表
+        获取文件列表的一页
 
         :param dir_path: 目录路径
-        :return: AlistPath 对象列表
+        :param page: 页码（从 1 开始）
+        :param per_page: 每页条目数，为 0 时一次返回全部条目
+        :return: (AlistEntry 对象列表, 目录条目总数)
         """
 
-        logger.debug(f"获取目录 {dir_path} 下的文件列表")
+        logger.debug(f"获取目录 {dir_path} 下的文件列表，第 {page} 页")
 
         json = {
             "path": dir_path,
             "password": "",
-            "page": 1,
-            "per_page": 0,
+            "page": page,
+            "per_page": per_page,
             "refresh": False,
         }
 
@@ -209,20 +284,103 @@ class AlistClient(metaclass=Multiton):
                 f"获取目录 {dir_path} 的文件列表失败，错误信息：{result['message']}"
             )
 
-        logger.debug(f"获取目录 {dir_path} 的文件列表成功")
+        logger.debug(f"获取目录 {dir_path} 的文件列表成功，第 {page} 页")
 
-        if result["data"]["total"] == 0:
-            return []
+        total: int = result["data"]["total"]
+        if total == 0 or not result["data"]["content"]:
+            return [], total
 
         return [
-            AlistPath(
+            AlistEntry(
                 server_url=self.url,
                 base_path=self.base_path,
                 full_path=dir_path + "/" + alist_path["name"],
                 **alist_path,
             )
             for alist_path in result["data"]["content"]
-        ]
+        ], total
+
+    async def async_api_fs_list(
+        self, dir_path: str, page: int = 1, per_page: int = 0
+    ) -> list[AlistEntry]:
+        """
+        获取文件列表
+
+        :param dir_path: 目录路径
+        :param page: 页码（从 1 开始），默认为 1
+        :param per_page: 每页条目数，默认为 0（一次返回全部条目）
+        :return: AlistEntry 对象列表
+        """
+
+        content, _ = await self.__fs_list_page(dir_path, page, per_page)
+        return content
+
+    async def iter_fs_list(
+        self,
+        dir_path: str,
+        per_page: int = 0,
+        max_workers: int = 3,
+    ) -> AsyncGenerator[list[AlistEntry], None]:
+        """
+        分页获取文件列表生成器
+        首页返回目录条目总数后，其余页面并发请求，按到达顺序逐页返回
+
+        :param dir_path: 目录路径
+        :param per_page: 每页条目数，为 0 时不分页，一次返回全部条目
+        :param max_workers: 同时请求的页数上限
+        :return: 每页 AlistEntry 对象列表的生成器
+        """
+
+        if per_page <= 0:
+            yield await self.async_api_fs_list(dir_path)
+            return
+
+        content, total = await self.__fs_list_page(dir_path, 1, per_page)
+        yield content
+
+        pages = ceil(total / per_page)
+        if pages <= 1:
+            return
+
+        async def fetch(page: int) -> list[AlistEntry]:
+            content, _ = await self.__fs_list_page(dir_path, page, per_page)
+            return content
+
+        async for content in self.__iter_pages(fetch, range(2, pages + 1), max_workers):
+            yield content
+
+    @staticmethod
+    async def __iter_pages(
+        fetch: Callable[[int], Awaitable[list[AlistEntry]]],
+        pages: range,
+        max_workers: int,
+    ) -> AsyncGenerator[list[AlistEntry], None]:
+        """
+        并发请求各页，按到达顺序逐页返回
+        已请求但未被取走的页面最多 max_workers 个，取走一页后才请求下一页，
+        调用方处理较慢时已获取的页面不会在内存中堆积
+
+        :param fetch: 获取指定页条目的协程函数
+        :param pages: 页码
+        :param max_workers: 同时请求的页数上限
+        :return: 每页 AlistEntry 对象列表的生成器
+        """
+        remaining = iter(pages)
+        pending: set[Task] = {
+            create_task(fetch(page)) for page in islice(remaining, max(1, max_workers))
+        }
+        try:
+            while pending:
+                done, pending = await wait(pending, return_when=FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+                    page = next(remaining, None)
+                    if page is not None:
+                        pending.add(create_task(fetch(page)))
+        finally:
+            for task in pending:
+                task.cancel()
+            await gather(*pending, return_exceptions=True)
 
     async def async_api_fs_get(self, path: str) -> AlistPath:
         """
@@ -260,6 +418,103 @@ class AlistClient(metaclass=Multiton):
             **result["data"],
         )
 
+    async def async_api_fs_search(
+        self,
+        parent: str,
+        keywords: str = "",
+        scope: int = 0,
+        page: int = 1,
+        per_page: int = 100,
+    ) -> tuple[list[AlistEntry], int]:
+        """
+        搜索文件/目录（需要 Alist 服务器已建立搜索索引）
+
+        搜索结果只包含名称、大小、是否为目录等基础信息，
+        修改时间、签名等字段为空，需要时应通过 fs/get 获取
+
+        :param parent: 搜索的父目录路径
+        :param keywords: 搜索关键字，为空时匹配全部
+        :param scope: 搜索范围，0 为全部，1 为仅目录，2 为仅文件
+        :param page: 页码（从 1 开始）
+        :param per_page: 每页条目数
+        :return: (AlistEntry 对象列表, 搜索结果总数)
+        """
+
+        json = {
+            "parent": parent,
+            "keywords": keywords,
+            "scope": scope,
+            "page": page,
+            "per_page": per_page,
+            "password": "",
+        }
+
+        resp = await self.__post(
+            self.url + "/api/fs/search",
+            json=json,
+            rate_key=self.base_path.rstrip("/") + parent,
+        )
+        if resp.status_code != 200:
+            raise RuntimeError(
+                f"搜索目录 {parent} 请求发送失败，状态码：{resp.status_code}"
+            )
+
+        result = resp.json()
+
+        if result["code"] != 200:
+            raise RuntimeError(f"搜索目录 {parent} 失败，错误信息：{result['message']}")
+
+        logger.debug(f"搜索目录 {parent} 成功，第 {page} 页")
+
+        base_path = self.base_path.rstrip("/")
+        paths = []
+        for node in result["data"]["content"] or []:
+            # 搜索结果中的 parent 为服务器绝对路径，需要去除用户基础路径
+            node_parent: str = node["parent"]
+            if base_path and (
+                node_parent == base_path or node_parent.startswith(base_path + "/")
+            ):
+                node_parent = node_parent[len(base_path) :]
+            paths.append(
+                AlistEntry(
+                    server_url=self.url,
+                    base_path=self.base_path,
+                    full_path=node_parent.rstrip("/") + "/" + node["name"],
+                    name=node["name"],
+                    size=node["size"],
+                    is_dir=node["is_dir"],
+                    modified=self.SEARCH_UNKNOWN_TIME,
+                    created=self.SEARCH_UNKNOWN_TIME,
+                    sign="",
+                    thumb="",
+                    type=node["type"],
+                    hashinfo="null",
+                )
+            )
+
+        return paths, result["data"]["total"]
+
+    async def async_api_admin_index_progress(self) -> dict:
+        """
+        获取搜索索引构建进度 需要管理员用户权限
+
+        :return: 索引进度字典，包含 obj_count、is_done、last_done_time、error
+        """
+
+        resp = await self.__get(self.url + "/api/admin/index/progress")
+        if resp.status_code != 200:
+            raise RuntimeError(
+                f"获取搜索索引进度请求发送失败，状态码：{resp.status_code}"
+            )
+
+        result = resp.json()
+
+        if result["code"] != 200:
+            raise RuntimeError(f"获取搜索索引进度失败，详细信息：{result['message']}")
+
+        logger.debug("获取搜索索引进度成功")
+        return result["data"]
+
     async def async_api_admin_storage_list(self) -> list[AlistStorage]:
         """
         列出存储列表 需要管理员用户权限
@@ -358,36 +613,288 @@ class AlistClient(metaclass=Multiton):
     async def iter_path(
         self,
         dir_path: str,
-        wait_time: float | int,
         is_detail: bool = True,
-        filter: Callable[[AlistPath], bool] = lambda x: True,
-    ) -> AsyncGenerator[AlistPath, None]:
+        filter: Callable[[AlistEntry], bool] = lambda x: True,
+        per_page: int = 0,
+        dir_filter: Callable[[AlistEntry], bool] | None = None,
+    ) -> AsyncGenerator[AlistEntry | AlistPath, None]:
         """
         异步路径列表生成器
-        返回目录及其子目录的所有文件和目录的 AlistPath 对象
+        返回目录及其子目录的所有文件和目录的 AlistEntry 对象（获取详细信息时为 AlistPath 对象）
 
         :param dir_path: 目录路径
-        :param wait_time: 每轮遍历等待时间（单位秒）,
         :param is_detail：是否获取详细信息（raw_url）
         :param filter: 匿名函数过滤器（默认不启用）
-        :return: AlistPath 对象生成器
+        :param per_page: 分页获取目录列表时每页条目数，为 0 时不分页
+        :param dir_filter: 目录过滤器，返回 False 的子目录不会被遍历（默认遍历全部）
+        :return: AlistEntry 对象生成器
+        """
+
+        async for page in self.iter_fs_list(dir_path, per_page=per_page):
+            for path in page:
+                if path.is_dir and (dir_filter is None or dir_filter(path)):
+                    async for child_path in self.iter_path(
+                        dir_path=path.full_path,
+                        is_detail=is_detail,
+                        filter=filter,
+                        per_page=per_page,
+                        dir_filter=dir_filter,
+                    ):
+                        yield child_path
+
+                if filter(path):
+                    if is_detail:
+                        yield await self.async_api_fs_get(path.full_path)
+                    else:
+                        yield path
+
+    async def __iter_dir(
+        self,
+        dir_path: str,
+        modified: str | None,
+        cache: AlistListingCache | None,
+        per_page: int,
+        max_page_workers: int,
+    ) -> AsyncGenerator[list[AlistEntry], None]:
+        """
+        逐页获取目录列表，优先使用目录列表缓存，完整获取后写入缓存
+
+        :param dir_path: 目录路径
+        :param modified: 父目录列表中该目录的修改时间，为 None 时不使用缓存
+        :param cache: 目录列表缓存
+        :param per_page: 分页获取目录列表时每页条目数
+        :param max_page_workers: 分页时同时请求的页数上限
+        :return: 每页 AlistEntry 对象列表的生成器
+        """
+
+        if cache is None or modified is None:
+            async for page in self.iter_fs_list(
+                dir_path, per_page=per_page, max_workers=max_page_workers
+            ):
+                yield page
+            return
+
+        children = cache.get(dir_path, modified)
+        if children is not None:
+            yield [
+                AlistEntry(
+                    server_url=self.url,
+                    base_path=self.base_path,
+                    full_path=dir_path + "/" + child["name"],
+                    **child,
+                )
+                for child in children
+            ]
+            return
+
+        children = []
+        async for page in self.iter_fs_list(
+            dir_path, per_page=per_page, max_workers=max_page_workers
+        ):
+            children.extend(
+                path.to_dict() for path in page
+            )
+            yield page
+        cache.set(dir_path, modified, children)
+
+    async def iter_path_concurrent(
+        self,
+        dir_path: str,
+        is_detail: bool = True,
+        filter: Callable[[AlistEntry], bool] = lambda x: True,
+        max_workers: int = 5,
+        max_buffer: int = 1000,
+        per_page: int = 0,
+        max_page_workers: int = 3,
+        cache: AlistListingCache | None = None,
+        dir_filter: Callable[[AlistEntry], bool] | None = None,
+        on_dir_listed: Callable[[str], Awaitable[None]] | None = None,
+        start_dirs: list[str] | None = None,
+        newest_first: bool = False,
+        time_budget: float = 0,
+    ) -> AsyncGenerator[AlistEntry | AlistPath, None]:
+        """
+        并发广度优先路径列表生成器
+        以目录队列保存待遍历目录，由 max_workers 个协程同时请求 fs/list
+        返回目录及其子目录的所有文件和目录的 AlistEntry 对象（获取详细信息时为 AlistPath 对象）
+
+        与 iter_path 的深度优先顺序不同，本生成器不保证返回顺序：
+        同一目录下的条目按列表顺序返回，不同目录的条目可能交错返回，
+        子目录中的文件也可能早于或晚于父目录中其它条目返回
+
+        :param dir_path: 目录路径
+        :param is_detail: 是否获取详细信息（raw_url）
+        :param filter: 匿名函数过滤器（默认不启用）
+        :param max_workers: 同时进行中的 fs/list 请求数上限
+        :param max_buffer: 等待消费的 AlistEntry 数量上限，超出后暂停遍历
+        :param per_page: 分页获取目录列表时每页条目数，为 0 时不分页
+        :param max_page_workers: 分页时单个目录同时请求的页数上限
+        :param cache: 目录列表缓存，修改时间未变化的目录直接使用缓存的子条目（增量遍历）
+        :param dir_filter: 目录过滤器，返回 False 的子目录不会被请求（默认遍历全部）
+        :param on_dir_listed: 目录列表获取完成且其中所有条目都已经过 filter 后调用的协程函数，参数为目录路径
+        :param start_dirs: 起始待遍历目录列表（用于从检查点继续遍历），为 None 时从 dir_path 开始
+        :param newest_first: 按目录修改时间从新到旧遍历待遍历目录，新增内容所在的目录优先被请求
+        :param time_budget: 遍历时间预算，单位为秒，超出后不再请求新的目录（已开始的目录仍会完成），为 0 时不限制
+        :return: AlistEntry 对象生成器
+        """
+
+        # 待遍历目录按 (优先级, 加入顺序) 排序，不按修改时间排序时优先级相同，即先进先出
+        # 元素为 (优先级, 加入顺序, 目录路径, 父目录列表中的修改时间（起始目录修改时间未知）)
+        frontier: PriorityQueue[tuple[float, int, str, str | None]] = PriorityQueue()
+        output: Queue[AlistEntry | AlistPath | Exception | None] = Queue(maxsize=max_buffer)
+        sequence = count()
+        for start_dir in [dir_path] if start_dirs is None else start_dirs:
+            frontier.put_nowait((float("-inf"), next(sequence), start_dir, None))
+        deadline = time() + time_budget if time_budget > 0 else None
+        skipped_dirs = 0
+
+        def priority(path: AlistEntry) -> float:
+            if not newest_first:
+                return 0
+            try:
+                return -path.modified_timestamp
+            except ValueError:  # 修改时间未知时最后遍历
+                return 0
+
+        async def worker() -> None:
+            nonlocal skipped_dirs
+            while True:
+                _, _, current_dir, modified = await frontier.get()
+                if deadline is not None and time() > deadline:
+                    skipped_dirs += 1
+                    frontier.task_done()
+                    continue
+                try:
+                    async for page in self.__iter_dir(
+                        current_dir, modified, cache, per_page, max_page_workers
+                    ):
+                        for path in page:
+                            if path.is_dir and (dir_filter is None or dir_filter(path)):
+                                frontier.put_nowait(
+                                    (
+                                        priority(path),
+                                        next(sequence),
+                                        path.full_path,
+                                        path.modified,
+                                    )
+                                )
+
+                            if filter(path):
+                                if is_detail:
+                                    path = await self.async_api_fs_get(path.full_path)
+                                await output.put(path)
+                    if on_dir_listed is not None:
+                        await on_dir_listed(current_dir)
+                except Exception as e:
+                    await output.put(e)
+                finally:
+                    frontier.task_done()
+
+        async def closer() -> None:
+            await frontier.join()
+            await output.put(None)
+
+        tasks = [create_task(worker()) for _ in range(max(1, max_workers))]
+        tasks.append(create_task(closer()))
+        try:
+            while (item := await output.get()) is not None:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await gather(*tasks, return_exceptions=True)
+        if skipped_dirs:
+            logger.info(f"遍历时间预算已用完，跳过 {skipped_dirs} 个目录")
+
+    async def is_search_available(self, parent: str, max_age: float = 0) -> bool:
         """
+        检查搜索索引是否可用于遍历目录
+        能获取索引进度（管理员用户）时，要求索引构建完成、无错误且未过期；
+        并且需要能够在 parent 下正常搜索
 
-        for path in await self.async_api_fs_list(dir_path):
-            await sleep(wait_time)
-            if path.is_dir:
-                async for child_path in self.iter_path(
-                    dir_path=path.full_path,
-                    wait_time=wait_time,
-                    is_detail=is_detail,
-                    filter=filter,
-                ):
-                    yield child_path
+        :param parent: 需要遍历的目录路径
+        :param max_age: 索引最长有效时间（单位秒），为 0 时不检查索引是否过期
+        :return: 搜索索引是否可用
+        """
 
+        try:
+            progress = await self.async_api_admin_index_progress()
+        except Exception as e:
+            logger.debug(f"无法获取搜索索引进度，跳过索引时效检查：{e}")
+            progress = None
+
+        if progress is not None:
+            if progress.get("error"):
+                logger.warning(f"搜索索引存在错误：{progress['error']}")
+                return False
+            if not progress.get("is_done"):
+                logger.warning("搜索索引尚未构建完成")
+                return False
+            last_done_time = progress.get("last_done_time")
+            if max_age > 0:
+                if not last_done_time:
+                    logger.warning("搜索索引从未构建完成")
+                    return False
+                age = time() - datetime.fromisoformat(last_done_time).timestamp()
+                if age > max_age:
+                    logger.warning(f"搜索索引已过期，上次构建完成时间：{last_done_time}")
+                    return False
+
+        try:
+            await self.async_api_fs_search(parent, scope=2, per_page=1)
+        except Exception as e:
+            logger.warning(f"搜索功能不可用：{e}")
+            return False
+
+        return True
+
+    async def iter_search(
+        self,
+        parent: str,
+        keywords: str = "",
+        scope: int = 2,
+        filter: Callable[[AlistEntry], bool] = lambda x: True,
+        per_page: int = 100,
+        max_workers: int = 3,
+    ) -> AsyncGenerator[AlistEntry, None]:
+        """
+        基于搜索索引的路径列表生成器
+        通过分页的 fs/search 请求枚举 parent 下（包括子目录）的文件/目录，
+        首页返回结果总数后，其余页面并发请求，按到达顺序返回
+
+        搜索结果来自索引，可能与服务器当前状态不一致，且不包含修改时间、签名等信息
+
+        :param parent: 父目录路径
+        :param keywords: 搜索关键字，为空时匹配全部
+        :param scope: 搜索范围，0 为全部，1 为仅目录，2 为仅文件（默认）
+        :param filter: 匿名函数过滤器（默认不启用）
+        :param per_page: 每页条目数
+        :param max_workers: 同时请求的页数上限
+        :return: AlistEntry 对象生成器
+        """
+
+        content, total = await self.async_api_fs_search(
+            parent, keywords, scope, 1, per_page
+        )
+        for path in content:
             if filter(path):
-                if is_detail:
-                    yield await self.async_api_fs_get(path.full_path)
-                else:
+                yield path
+
+        pages = ceil(total / per_page)
+        if pages <= 1:
+            return
+
+        async def fetch(page: int) -> list[AlistEntry]:
+            content, _ = await self.async_api_fs_search(
+                parent, keywords, scope, page, per_page
+            )
+            return content
+
+        async for content in self.__iter_pages(fetch, range(2, pages + 1), max_workers):
+            for path in content:
+                if filter(path):
                     yield path
 
     async def get_storage_by_mount_path(
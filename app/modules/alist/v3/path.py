@@ -92,3 +92,196 @@ class AlistPath(BaseModel):
         获得创建时间的时间戳
         """
         return self.__parse_timestamp(self.created)
+
+
+class AlistEntry:
+    """
+    轻量 Alist 文件/目录对象
+    用于目录遍历等需要大量创建对象的场景，属性与 AlistPath 一致，
+    使用 __slots__ 减少内存占用，构造时不做校验，派生属性首次访问时计算并缓存
+    """
+
+    __slots__ = (
+        "server_url",
+        "base_path",
+        "__full_path",
+        "id",
+        "path",
+        "name",
+        "size",
+        "is_dir",
+        "modified",
+        "created",
+        "sign",
+        "thumb",
+        "type",
+        "hashinfo",
+        "hash_info",
+        "raw_url",
+        "readme",
+        "header",
+        "provider",
+        "related",
+        "__abs_path",
+        "__download_url",
+        "__suffix",
+        "__modified_timestamp",
+    )
+
+    def __init__(
+        self,
+        server_url: str,
+        base_path: str,
+        full_path: str,
+        name: str,
+        size: int = 0,
+        is_dir: bool = False,
+        modified: str = "",
+        created: str = "",
+        sign: str = "",
+        thumb: str = "",
+        type: int = 0,
+        hashinfo: str = "",
+        hash_info: dict | None = None,
+        id: str | None = None,
+        path: str | None = None,
+        raw_url: str | None = None,
+        readme: str | None = None,
+        header: str | None = None,
+        provider: str | None = None,
+        related: Any = None,
+        **_,
+    ) -> None:
+        self.server_url = server_url
+        self.base_path = base_path
+        self.id = id
+        self.path = path
+        self.name = name
+        self.size = size
+        self.is_dir = is_dir
+        self.modified = modified
+        self.created = created
+        self.sign = sign
+        self.thumb = thumb
+        self.type = type
+        self.hashinfo = hashinfo
+        self.hash_info = hash_info
+        self.raw_url = raw_url
+        self.readme = readme
+        self.header = header
+        self.provider = provider
+        self.related = related
+        self.full_path = full_path
+        self.__suffix: str | None = None
+        self.__modified_timestamp: float | None = None
+
+    def __repr__(self) -> str:
+        return f"AlistEntry(full_path={self.full_path!r}, is_dir={self.is_dir})"
+
+    @property
+    def full_path(self) -> str:
+        """
+        相对用户根文件/目录路径
+        """
+        return self.__full_path
+
+    @full_path.setter
+    def full_path(self, value: str) -> None:
+        self.__full_path = value
+        self.__abs_path: str | None = None
+        self.__download_url: str | None = None
+
+    @property
+    def abs_path(self) -> str:
+        """
+        文件/目录在 Alist 服务器上的绝对路径
+        """
+        if self.__abs_path is None:
+            self.__abs_path = self.base_path.rstrip("/") + self.full_path
+        return self.__abs_path
+
+    @property
+    def download_url(self) -> str:
+        """
+        文件下载地址
+        """
+        if self.__download_url is None:
+            if self.sign:
+                url = self.server_url + "/d" + self.abs_path + "?sign=" + self.sign
+            else:
+                url = self.server_url + "/d" + self.abs_path
+            self.__download_url = URLUtils.encode(url)
+        return self.__download_url
+
+    @property
+    def proxy_download_url(self) -> str:
+        """
+        Alist代理下载地址
+        """
+        return sub("/d/", "/p/", self.download_url, 1)
+
+    @property
+    def suffix(self) -> str:
+        """
+        文件后缀
+        """
+        if self.__suffix is None:
+            if self.is_dir:
+                self.__suffix = ""
+            else:
+                self.__suffix = "." + self.name.split(".")[-1]
+        return self.__suffix
+
+    @property
+    def modified_timestamp(self) -> float:
+        """
+        获得修改时间的时间戳
+        """
+        if self.__modified_timestamp is None:
+            self.__modified_timestamp = datetime.fromisoformat(
+                self.modified
+            ).timestamp()
+        return self.__modified_timestamp
+
+    @property
+    def created_timestamp(self) -> float:
+        """
+        获得创建时间的时间戳
+        """
+        return datetime.fromisoformat(self.created).timestamp()
+
+    def to_dict(self) -> dict:
+        """
+        导出 Alist 接口返回的原始字段（不包括 server_url、base_path、full_path）
+        """
+        return {
+            "id": self.id,
+            "path": self.path,
+            "name": self.name,
+            "size": self.size,
+            "is_dir": self.is_dir,
+            "modified": self.modified,
+            "created": self.created,
+            "sign": self.sign,
+            "thumb": self.thumb,
+            "type": self.type,
+            "hashinfo": self.hashinfo,
+            "hash_info": self.hash_info,
+        }
+
+    def to_alist_path(self) -> AlistPath:
+        """
+        转换为经过校验的 AlistPath 对象
+        """
+        return AlistPath(
+            server_url=self.server_url,
+            base_path=self.base_path,
+            full_path=self.full_path,
+            raw_url=self.raw_url,
+            readme=self.readme,
+            header=self.header,
+            provider=self.provider,
+            related=self.related,
+            **self.to_dict(),
+        )
+
@@ -0,0 +1,112 @@
+from asyncio import Task, create_task, shield
+from collections import OrderedDict, deque
+from time import monotonic, perf_counter
+
+from app.core import logger
+from app.modules.alist.v3.client import AlistClient
+
+
+class AlistRawURLResolver:
+    """
+    按需获取文件的 raw_url（播放时解析，不在生成 strm 时请求 fs/get）
+    解析结果缓存 ttl 秒（应小于网盘直链的有效期），缓存条目数超出 max_size 时淘汰最久未使用的条目；
+    同一路径同时只发出一次 fs/get 请求，其余请求等待该请求的结果
+    """
+
+    def __init__(
+        self,
+        client: AlistClient,
+        ttl: float = 300,
+        max_size: int = 10000,
+        max_samples: int = 1000,
+    ) -> None:
+        """
+        :param client: AlistClient 对象
+        :param ttl: raw_url 缓存时间，单位为秒
+        :param max_size: 缓存条目数上限
+        :param max_samples: 用于统计解析耗时的最近请求数
+        """
+        self.client = client
+        self.ttl = ttl
+        self.max_size = max(1, max_size)
+        # 文件路径 -> (raw_url, 过期时间)，按最近使用顺序排列
+        self.__cache: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self.__pending: dict[str, Task[str]] = {}
+        self.__latencies: deque[float] = deque(maxlen=max(1, max_samples))
+        self.hits = 0  # 命中缓存的请求数
+        self.misses = 0  # 发出 fs/get 的请求数
+        self.coalesced = 0  # 等待进行中的 fs/get 的请求数
+        self.errors = 0  # 解析失败的 fs/get 请求数
+
+    async def resolve(self, path: str) -> str:
+        """
+        获取文件的 raw_url
+
+        :param path: 文件路径
+        :return: raw_url
+        """
+        cached = self.__cache.get(path)
+        if cached is not None and cached[1] > monotonic():
+            self.__cache.move_to_end(path)
+            self.hits += 1
+            return cached[0]
+
+        task = self.__pending.get(path)
+        if task is None:
+            self.misses += 1
+            task = self.__pending[path] = create_task(self.__fetch(path))
+            task.add_done_callback(lambda _: self.__pending.pop(path, None))
+        else:
+            self.coalesced += 1
+        # 使用 shield 避免单个等待者被取消（如播放器断开连接）时取消共享的解析任务
+        return await shield(task)
+
+    async def __fetch(self, path: str) -> str:
+        """
+        请求 fs/get 获取 raw_url 并写入缓存
+
+        :param path: 文件路径
+        :return: raw_url
+        """
+        start = perf_counter()
+        try:
+            detail = await self.client.async_api_fs_get(path)
+            if detail.is_dir or not detail.raw_url:
+                raise RuntimeError(f"路径 {path} 没有可用的 raw_url")
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"解析 {path} 的 raw_url 失败：{e}")
+            raise
+        finally:
+            self.__latencies.append(perf_counter() - start)
+
+        self.__cache[path] = (detail.raw_url, monotonic() + self.ttl)
+        self.__cache.move_to_end(path)
+        while len(self.__cache) > self.max_size:
+            self.__cache.popitem(last=False)
+        return detail.raw_url
+
+    def metrics(self) -> dict:
+        """
+        获取统计信息，耗时为最近 max_samples 次 fs/get 请求的统计值，单位为毫秒
+
+        :return: 统计信息字典
+        """
+        latencies = sorted(self.__latencies)
+
+        def percentile(ratio: float) -> float:
+            if not latencies:
+                return 0
+            return latencies[min(len(latencies) - 1, int(len(latencies) * ratio))] * 1000
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "cache_size": len(self.__cache),
+            "latency_avg_ms": sum(latencies) / len(latencies) * 1000 if latencies else 0,
+            "latency_p50_ms": percentile(0.5),
+            "latency_p95_ms": percentile(0.95),
+            "latency_max_ms": latencies[-1] * 1000 if latencies else 0,
+        }
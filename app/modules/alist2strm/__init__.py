@@ -1 +1,5 @@
-from app.modules.alist2strm.alist2strm import Alist2Strm
\ No newline at end of file
+from app.modules.alist2strm.alist2strm import Alist2Strm
+from app.modules.alist2strm.checkpoint import Alist2StrmCheckpoint
+from app.modules.alist2strm.lease import Alist2StrmLeases
+from app.modules.alist2strm.manifest import Alist2StrmManifest
+from app.modules.alist2strm.writer import StrmWriter
@@ -1,19 +1,58 @@
-from asyncio import to_thread, Semaphore, TaskGroup
-from os import PathLike
+from asyncio import (
+    CancelledError,
+    create_task,
+    current_task,
+    gather,
+    get_running_loop,
+    run,
+    sleep,
+    to_thread,
+    Queue,
+    Semaphore,
+    TaskGroup,
+)
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha1
+from json import dumps
+from multiprocessing import get_context
+from os import PathLike, fspath, scandir, stat
+from os.path import basename
 from pathlib import Path
+from posixpath import commonpath
 from re import compile as re_compile
-from time import time
-import traceback
-
-from aiofile import async_open
-
-from app.core import logger
-from app.utils import RequestUtils
+from time import time, time_ns
+from zlib import crc32
+
+from app.core import settings, logger
+from app.utils import (
+    AlistUtils,
+    RequestUtils,
+    FileUtils,
+    PathMatcher,
+    RateLimiter,
+    SortedPathSet,
+    URLUtils,
+)
 from app.extensions import VIDEO_EXTS, SUBTITLE_EXTS, IMAGE_EXTS, NFO_EXTS
-from app.modules.alist import AlistClient, AlistPath
+from app.modules.alist import AlistClient, AlistPath, AlistEntry, AlistListingCache
 from app.modules.alist2strm.mode import Alist2StrmMode
+from app.modules.alist2strm.checkpoint import Alist2StrmCheckpoint
+from app.modules.alist2strm.lease import Alist2StrmLeases
+from app.modules.alist2strm.manifest import Alist2StrmManifest
+from app.modules.alist2strm.writer import StrmWriter
 
 class Alist2Strm:
+    # 始终排除的系统文件夹/文件，以及 BDMV 中除 STREAM 以外的目录（只需要 STREAM 中的 .m2ts 文件）
+    DEFAULT_EXCLUDE = [
+        "@eaDir",
+        "Thumbs.db",
+        ".DS_Store",
+        r"re:/BDMV/(?!STREAM(?:/|$))[^/]+",
+    ]
+
+    # (任务 id, 服务器地址) -> (限速配置, 限速器)
+    __rate_limiters: dict[tuple[str, str], tuple[tuple, RateLimiter]] = {}
+
     def __init__(
         self,
         url: str = "http://localhost:5244",
@@ -31,9 +70,32 @@ class Alist2Strm:
         other_ext: str = "",
         max_workers: int = 50,
         max_downloaders: int = 5,
+        max_list_workers: int = 5,
+        list_per_page: int = 0,
+        max_page_workers: int = 3,
+        max_detail_workers: int = 5,
+        max_writers: int = 4,
         wait_time: float | int = 0,
+        rate_limit: dict | None = None,
         sync_server: bool = False,
         sync_ignore: str | None = None,
+        include: list[str] | None = None,
+        exclude: list[str] | None = None,
+        incremental: bool = False,
+        full_rescan_interval: int = 7,
+        use_search: bool = False,
+        search_max_age: float = 24,
+        use_manifest: bool = False,
+        checkpoint_interval: float = 0,
+        newest_first: bool = False,
+        time_budget: float = 0,
+        max_processes: int = 1,
+        lease_db: str = "",
+        lease_ttl: float = 300,
+        outputs: list[dict] | None = None,
+        sign_secret: str = "",
+        id: str = "",
+        play_url: str = "",
         **_,
     ) -> None:
         """
@@ -48,16 +110,45 @@ class Alist2Strm:
         :param subtitle: 是否下载字幕文件，默认为 False
         :param image: 是否下载图片文件，默认为 False
         :param nfo: 是否下载 .nfo 文件，默认为 False
-        :param mode: Strm模式(AlistURL/RawURL/AlistPath)
+        :param mode: Strm模式(AlistURL/RawURL/AlistPath/PlayURL)
         :param overwrite: 本地路径存在同名文件时是否重新生成/下载该文件，默认为 False
         :param sync_server: 是否同步服务器，启用后若服务器中删除了文件，也会将本地文件删除，默认为 True
         :param other_ext: 自定义下载后缀，使用西文半角逗号进行分割，默认为空
-        :param max_workers: 最大并发数
+        :param max_workers: 同时处理文件（生成 strm 或下载）的协程数
         :param max_downloaders: 最大同时下载
-        :param wait_time: 遍历请求间隔时间，单位为秒，默认为 0
+        :param max_list_workers: 同时遍历目录（fs/list 请求）的最大并发数，设为 1 时按顺序遍历
+        :param list_per_page: 分页获取目录列表时每页条目数，默认为 0（不分页）
+        :param max_page_workers: 分页时单个目录同时请求的页数上限，默认为 3
+        :param max_detail_workers: RawURL 模式下同时获取文件详细信息（fs/get）的协程数，默认为 5
+        :param max_writers: 写入 strm 文件的线程数，默认为 4
+        :param wait_time: 请求间隔时间，单位为秒，默认为 0，未设置 rate_limit 时等价于每秒 1/wait_time 次请求
+        :param rate_limit: Alist 服务器请求限速配置 {"rate": 每秒请求数, "burst": 突发请求数, "overrides": {挂载路径前缀: {"rate": ..., "burst": ...}}}
         :param sync_ignore: 同步时忽略的文件正则表达式
+        :param include: 包含规则列表（通配符或 "re:" 开头的正则表达式），为空时包含全部
+        :param exclude: 排除规则列表，匹配的目录不会被遍历，格式同 include
+        :param incremental: 增量模式，修改时间未变化的目录使用本地缓存的文件列表，不再请求 Alist，默认为 False
+        :param full_rescan_interval: 增量模式下强制全量扫描的间隔天数，为 0 时不强制，默认为 7
+        :param use_search: 使用 Alist 搜索索引（fs/search）枚举文件，索引不可用或过期时回退到目录遍历，默认为 False
+        :param search_max_age: 搜索索引的最长有效时间，单位为小时，为 0 时不检查，默认为 24
+        :param use_manifest: 使用输出清单记录已生成的文件，跳过判断与同步删除通过查询清单完成，不再逐个检查本地文件，默认为 False
+        :param checkpoint_interval: 遍历检查点保存间隔，单位为秒，中断的运行再次运行时从中断处继续遍历，为 0 时不启用，默认为 0
+        :param newest_first: 按目录修改时间从新到旧遍历，新增内容所在的目录优先处理，默认为 False
+        :param time_budget: 遍历时间预算，单位为秒，超出后不再遍历新的目录，为 0 时不限制，默认为 0；
+                            设置后为热扫描，只处理预算内遍历到的文件，不执行同步删除，配合 newest_first 使用
+        :param max_processes: 分片执行的进程数，按顶层目录将任务划分给多个进程，各进程均分 rate_limit/wait_time 限制的请求速率，为 1 时不启用，默认为 1
+        :param lease_db: 租约数据库路径（位于多个实例共享的存储上），设置后按顶层目录划分工作单元，由多个实例共同处理，默认为空（不启用）
+        :param lease_ttl: 工作单元租约有效时间，单位为秒，实例失联超过该时间后其它实例可以接管，默认为 300
+        :param outputs: 额外的输出配置列表，一次遍历同时生成多个输出目录，每项可设置 target_dir、mode、flatten_mode、subtitle、image、nfo、other_ext 等，未设置的项与本任务相同
+        :param sign_secret: Alist 签名密钥（Alist 的令牌），设置后在本地计算 /d/ 地址的签名，不依赖服务器返回的签名，默认为空
+        :param id: 任务 ID，PlayURL 模式下用于生成播放地址
+        :param play_url: 播放器可访问的 AutoFilm API 地址（如 http://192.168.1.2:8080），PlayURL 模式下必须设置
         """
 
+        # 多进程分片执行时用于在子进程中创建相同配置的对象
+        self.options = {
+            name: value for name, value in locals().items() if name not in ("self", "_")
+        }
+
         self.client = AlistClient(url, username, password, token)
         self.mode = Alist2StrmMode.from_str(mode)
 
@@ -82,9 +173,13 @@ class Alist2Strm:
         self.process_file_exts = VIDEO_EXTS | download_exts
 
         self.overwrite = overwrite
-        self.__max_workers = Semaphore(max_workers)
+        self.max_workers = max(1, max_workers)
         self.__max_downloaders = Semaphore(max_downloaders)
-        self.wait_time = wait_time
+        self.max_list_workers = max_list_workers
+        self.list_per_page = list_per_page
+        self.max_page_workers = max_page_workers
+        self.max_detail_workers = max(1, max_detail_workers)
+        self.max_writers = max(1, max_writers)
         self.sync_server = sync_server
 
         if sync_ignore:
@@ -92,207 +187,1246 @@ class Alist2Strm:
         else:
             self.sync_ignore_pattern = None
 
-    async def run(self, specific_dir: str = None, sync_mode: bool = None) -> dict:
+        self.include = include or []
+        self.exclude = exclude or []
+        self.matcher = PathMatcher(self.include, self.DEFAULT_EXCLUDE + self.exclude)
+
+        self.incremental = incremental
+        self.full_rescan_interval = full_rescan_interval
+        self.use_search = use_search
+        self.search_max_age = search_max_age
+        self.use_manifest = use_manifest
+        self.checkpoint_interval = checkpoint_interval
+        self.newest_first = newest_first
+        self.time_budget = time_budget
+        self.max_processes = max(1, max_processes)
+        self.lease_db = lease_db
+        self.lease_ttl = lease_ttl
+        self.sign_secret = sign_secret
+        self.task_id = id
+        self.rate_limiter = self.__get_rate_limiter(rate_limit, wait_time)
+        self.play_url = play_url.rstrip("/")
+        self.play_secret = ""
+        if self.mode == Alist2StrmMode.PlayURL:
+            if not (self.task_id and self.play_url):
+                raise ValueError("PlayURL 模式需要设置任务 id 与 play_url")
+            # 设置了 API 密钥时播放地址带有签名，播放接口据此校验，播放器无需提供 API 密钥
+            self.play_secret = settings.APIConfig.get("api_key") or ""
+
+        # 每个输出配置对应一个 Alist2Strm 对象，遍历由本对象完成，文件交给需要处理它的输出
+        self.outputs_config = outputs or []
+        self.outputs: list[Alist2Strm] = [self] + [
+            Alist2Strm(**(self.options | output | {"outputs": None}))
+            for output in self.outputs_config
+        ]
+
+    async def run(
+        self,
+        specific_dir: str = None,
+        sync_mode: bool = None,
+        full_rescan: bool = False,
+        shard: tuple[int, int] | None = None,
+        recursive: bool = True,
+        specific_dirs: list[str] | None = None,
+    ) -> dict:
         """
         处理主体
 
         :param specific_dir: 可选，指定要处理的子目录路径
         :param sync_mode: 可选，覆盖默认的同步设置
+        :param full_rescan: 可选，强制全量扫描（目录列表缓存不生效，并检查本地文件以校正输出清单）
+        :param shard: 可选，多进程分片执行时子进程处理的分片 (分片序号, 分片数)
+        :param recursive: 可选，是否遍历子目录，为 False 时只处理目录中的文件，同步时删除云盘中已不存在的子目录
+        :param specific_dirs: 可选，指定要处理的多个互不包含的子目录，一次遍历同时从这些目录开始，同步时只清理这些目录
         :return: 执行结果字典
         """
+        # 本次运行中发出的请求（包括创建的协程任务与线程中的请求）使用本任务的限速器
+        token = self.rate_limiter.activate() if self.rate_limiter else None
+        try:
+            return await self.__run(
+                specific_dir, sync_mode, full_rescan, shard, recursive, specific_dirs
+            )
+        finally:
+            if token is not None:
+                RateLimiter.deactivate(token)
+
+    async def __run(
+        self,
+        specific_dir: str | None,
+        sync_mode: bool | None,
+        full_rescan: bool,
+        shard: tuple[int, int] | None,
+        recursive: bool,
+        specific_dirs: list[str] | None,
+    ) -> dict:
+        """
+        处理主体，参数见 run
+        """
         
-        # BDMV 处理相关变量初始化
-        # 统计信息
+        # 统计信息（写入、未变化、跳过的文件数由各输出分别统计）
         processed_count = 0
         error_count = 0
         start_time = time()
 
-        # 使用指定目录或默认配置目录
-        actual_source_dir = specific_dir if specific_dir else self.source_dir
+        # 使用指定目录或默认配置目录，指定多个目录时为它们的共同上级目录
+        if specific_dirs:
+            actual_source_dir = commonpath(specific_dirs)
+        else:
+            actual_source_dir = specific_dir if specific_dir else self.source_dir
+
+        # 获取 Alist 用户信息（base_path），首次运行时请求服务器
+        await self.client.ensure_initialized()
 
         # 临时覆盖同步设置
-        original_sync = self.sync_server
+        original_sync = [output.sync_server for output in self.outputs]
         if sync_mode is not None:
-            self.sync_server = sync_mode
+            for output in self.outputs:
+                output.sync_server = sync_mode
 
-        # BDMV 处理相关变量初始化
-        self.bdmv_collections: dict[str, list[tuple[AlistPath, int]]] = {}  # BDMV目录 -> [(文件路径, 文件大小)]
-        self.bdmv_largest_files: dict[str, AlistPath] = {}  # BDMV目录 -> 最大文件路径
+        if self.lease_db and specific_dir is None and not specific_dirs:
+            try:
+                return await self.__run_leased(actual_source_dir, full_rescan)
+            finally:
+                self.__restore_sync(original_sync)
+        if self.max_processes > 1 and shard is None and not specific_dirs:
+            try:
+                return await self.__run_sharded(actual_source_dir, full_rescan)
+            finally:
+                self.__restore_sync(original_sync)
+        self.shard = shard
+        shard_root = actual_source_dir.rstrip("/")
+
+        self.writer = StrmWriter(max_workers=self.max_writers)
+
+        # 热扫描只遍历时间预算内能到达的目录，不使用搜索索引与检查点
+        # 指定多个目录时从这些目录开始遍历，同样不使用搜索索引与检查点
+        hot_scan = self.time_budget > 0
+        partial = hot_scan or bool(specific_dirs)
+        use_search = (
+            self.use_search
+            and not partial
+            and self.__search_supported()
+            and await self.client.is_search_available(
+                actual_source_dir, self.search_max_age * 60 * 60
+            )
+        )
+
+        # 遍历检查点：上次运行中断时从中断处继续遍历（搜索模式不使用检查点）
+        self.checkpoint = None
+        resume_state = None
+        if self.checkpoint_interval > 0 and not use_search and not partial:
+            self.checkpoint = self.__open_checkpoint(actual_source_dir)
+            if full_rescan:
+                self.checkpoint.clear()
+            else:
+                resume_state = self.checkpoint.load()
 
-        def filter(path: AlistPath) -> bool:
+        # BDMV 处理相关变量初始化
+        self.bdmv_pending: dict[str, tuple[AlistEntry | AlistPath, int]] = {}  # BDMV目录 -> (当前最大文件, 文件数)
+        self.bdmv_largest_files: dict[str, AlistEntry | AlistPath] = {}  # BDMV目录 -> 最大文件路径
+        self.__remote_dirs: set[str] = set()  # 不遍历子目录时，云盘目录中的子目录名称
+        self.__file_outputs: dict[str, list[Alist2Strm]] = {}  # 处理中的文件 -> 需要处理该文件的输出
+
+        # 输出清单：继续中断的运行时沿用上次的运行标识，中断前已处理的文件不会在同步时被删除
+        run_id = resume_state[0] if resume_state and resume_state[0] else time_ns()
+        for output in self.outputs:
+            output.__open_output(full_rescan, run_id, shard is not None)
+            output.writer = self.writer
+            output.bdmv_largest_files = self.bdmv_largest_files
+            output.__remote_dirs = self.__remote_dirs
+
+        # 检查点相关变量初始化
+        self.__dir_files: dict[str, int] = {}  # 目录 -> 已交给处理阶段但尚未处理完成的文件数
+        self.__listed_dirs: set[str] = set()  # 列表已获取完成、等待文件处理完成的目录
+        self.__failed_files = 0  # 本次运行处理失败的文件数
+        resumed_dirs: set[str] = set()  # 检查点中已完成或待遍历的目录
+        start_dirs = specific_dirs or None
+        if resume_state:
+            _, counters, pending_dirs, done_dirs = resume_state
+            processed_count = counters["processed_count"]
+            error_count = counters["error_count"]
+            # 中断前各输出的统计信息合计记录在本对象上
+            self.written_count = counters["written_count"]
+            self.unchanged_count = counters["unchanged_count"]
+            self.skipped_count = counters["skipped_count"]
+            resumed_dirs = done_dirs.union(pending_dirs)
+            start_dirs = [dir_path or "/" for dir_path in pending_dirs]
+            logger.info(
+                f"从检查点继续遍历 {actual_source_dir}：已完成 {len(done_dirs)} 个目录，"
+                f"剩余 {len(pending_dirs)} 个目录"
+            )
+        elif self.checkpoint:
+            self.checkpoint.discover(actual_source_dir.rstrip("/"))
+
+        def save_checkpoint() -> None:
+            """
+            保存遍历检查点，先提交输出清单，保证检查点中已完成目录的清单记录已写入
+            """
+            for output in self.outputs:
+                if output.manifest:
+                    output.manifest.commit()
+            self.checkpoint.save(
+                run_id,
+                {
+                    "processed_count": processed_count,
+                    "error_count": error_count + self.__failed_files,
+                    **self.__output_counts(),
+                },
+            )
+
+        async def save_checkpoint_periodically() -> None:
+            while True:
+                await sleep(self.checkpoint_interval)
+                save_checkpoint()
+
+        def filter(path: AlistEntry) -> bool:
             """
             过滤器
-            根据 Alist2Strm 配置判断是否需要处理该文件
-            将云盘上上的文件对应的本地文件路径保存至 self.processed_local_paths
+            根据 Alist2Strm 配置判断是否需要处理该文件，记录需要处理该文件的输出，
+            并将文件对应的本地文件路径保存至各输出的 processed_local_paths
 
-            :param path: AlistPath 对象
+            :param path: AlistEntry 对象
             """
 
             if path.is_dir:
                 return False
 
-            # 跳过系统文件夹和不需要的文件
-            if any(folder in path.full_path for folder in ["@eaDir", "Thumbs.db", ".DS_Store"]):
+            if shard and not self.__in_shard(shard_root, path):
+                return False
+
+            # 跳过系统文件夹和排除规则匹配的文件（搜索模式下目录未经过目录过滤器）
+            if not self.matcher.match_file(path.full_path):
                 return False
 
             # 完全跳过 BDMV 文件夹内的所有文件（除了我们特殊处理的 .m2ts 文件）
-            if "/BDMV/" in path.full_path and not self._is_bdmv_file(path):
+            is_bdmv_file = self._is_bdmv_file(path)
+            if not is_bdmv_file and "/BDMV/" in path.full_path:
                 logger.debug(f"跳过 BDMV 文件夹内的文件: {path.name}")
                 return False
 
-            if path.suffix.lower() not in self.process_file_exts:
-                logger.debug(f"文件 {path.name} 不在处理列表中")
+            # 检查是否为 BDMV 文件
+            if is_bdmv_file:
+                self._track_bdmv_file(path)
+                # 暂时不处理，等 BDMV/STREAM 目录列表获取完成后再决定
                 return False
 
-            # 检查是否为 BDMV 文件
-            if self._is_bdmv_file(path):
-                self._collect_bdmv_file(path)
-                # 暂时不处理，等收集完所有文件后再决定
+            outputs = [output for output in self.outputs if output.__check_file(path)]
+            if not outputs:
                 return False
+            self.__file_outputs[path.full_path] = outputs
+            return True
 
-            try:
-                local_path = self.__get_local_path(path)
-            except OSError as e:  # 可能是文件名过长
-                logger.warning(f"获取 {path.full_path} 本地路径失败：{e}")
+        def walk_filter(path: AlistEntry) -> bool:
+            """
+            遍历时使用的过滤器，记录交给处理阶段的文件所在目录
+            """
+            if not filter(path):
                 return False
+            self.__track_file(path)
+            return True
 
-            self.processed_local_paths.add(local_path)
+        def dir_filter(path: AlistEntry) -> bool:
+            """
+            目录过滤器
+            跳过排除规则匹配的目录，以及检查点中已完成或已作为起始目录的目录
+            """
+            if not recursive:
+                self.__remote_dirs.add(path.name)
+                return False
+            if not self.matcher.match_dir(path.full_path):
+                return False
+            if shard and not self.__in_shard(shard_root, path):
+                return False
+            if self.checkpoint:
+                if path.full_path in resumed_dirs:
+                    return False
+                self.checkpoint.discover(path.full_path)
+            return True
 
-            if not self.overwrite and local_path.exists():
-                if path.suffix in self.download_exts:
-                    local_path_stat = local_path.stat()
-                    if local_path_stat.st_mtime < path.modified_timestamp:
-                        logger.debug(
-                            f"文件 {local_path.name} 已过期，需要重新处理 {path.full_path}"
-                        )
-                        return True
-                    if local_path_stat.st_size < path.size:
-                        logger.debug(
-                            f"文件 {local_path.name} 大小不一致，可能是本地文件损坏，需要重新处理 {path.full_path}"
+        # 第一阶段：收集所有文件信息并直接处理普通文件
+        # 遍历结果经有界队列交给 max_workers 个处理协程，
+        # RawURL 模式下视频文件需要先经过详细信息获取阶段（fs/get）得到 raw_url
+        file_queue: Queue[AlistEntry | AlistPath | None] = Queue(
+            maxsize=self.max_workers * 2
+        )
+        detail_queue: Queue[AlistEntry | None] = Queue(
+            maxsize=self.max_detail_workers * 2
+        )
+        if use_search:
+            logger.info(f"使用搜索索引枚举 {actual_source_dir} 中的文件")
+            cache = None
+        else:
+            if self.use_search:
+                logger.warning("搜索索引不可用或已过期，回退到目录遍历")
+            # 多个进程同时写入目录列表缓存时，每个目录提交一次以缩短持有写锁的时间
+            cache = self.__open_listing_cache(
+                actual_source_dir, full_rescan, commit_interval=1 if shard else 500
+            )
+
+        def needs_detail(path: AlistEntry | AlistPath) -> bool:
+            """
+            需要处理该文件的输出中有 RawURL 模式时，视频文件需要先通过 fs/get 获取 raw_url
+            """
+            return (
+                path.suffix.lower() in VIDEO_EXTS
+                and not path.raw_url
+                and any(
+                    output.mode == Alist2StrmMode.RawURL
+                    for output in self.__file_outputs[path.full_path]
+                )
+            )
+
+        async def emit_bdmv(bdmv_root: str) -> None:
+            """
+            选出 BDMV 目录中最大的 .m2ts 文件并交给处理阶段
+
+            :param bdmv_root: BDMV 根目录路径
+            """
+            nonlocal processed_count
+            largest_file = self._select_bdmv_file(bdmv_root)
+            if largest_file is None:
+                return
+
+            outputs = [
+                output
+                for output in self.outputs
+                if output.__check_file(largest_file, bdmv=True)
+            ]
+            if not outputs:
+                return
+            self.__file_outputs[largest_file.full_path] = outputs
+
+            self.__track_file(largest_file)
+            # RawURL 模式下与其它视频文件一样经过详细信息获取阶段得到 raw_url
+            if needs_detail(largest_file):
+                await detail_queue.put(largest_file)
+            else:
+                await file_queue.put(largest_file)
+            processed_count += 1
+
+        async def on_dir_listed(dir_path: str) -> None:
+            """
+            BDMV/STREAM 目录列表获取完成后立即处理该 BDMV 目录
+            """
+            if dir_path.endswith("/BDMV/STREAM"):
+                await emit_bdmv(dir_path.removesuffix("/BDMV/STREAM"))
+            self.__dir_listed(dir_path.rstrip("/"))
+
+        traversal_done = False
+        try:
+            async with TaskGroup() as tg:
+                # 处理协程数量固定为 max_workers，队列已满时遍历会被阻塞，
+                # 待处理的文件数不会随媒体库规模增长
+                file_workers = [
+                    tg.create_task(self.__file_worker(file_queue))
+                    for _ in range(self.max_workers)
+                ]
+                if any(output.mode == Alist2StrmMode.RawURL for output in self.outputs):
+                    detail_workers = [
+                        tg.create_task(self.__detail_worker(detail_queue, file_queue))
+                        for _ in range(self.max_detail_workers)
+                    ]
+                else:
+                    detail_workers = []
+                if self.checkpoint:
+                    saver = tg.create_task(save_checkpoint_periodically())
+
+                if use_search:
+                    paths = self.client.iter_search(
+                        actual_source_dir,
+                        filter=filter,
+                        max_workers=self.max_page_workers,
+                    )
+                else:
+                    paths = self.client.iter_path_concurrent(
+                        dir_path=actual_source_dir,
+                        is_detail=False,
+                        filter=walk_filter,
+                        max_workers=self.max_list_workers,
+                        per_page=self.list_per_page,
+                        max_page_workers=self.max_page_workers,
+                        cache=cache,
+                        dir_filter=dir_filter,
+                        on_dir_listed=on_dir_listed,
+                        start_dirs=start_dirs,
+                        newest_first=self.newest_first,
+                        time_budget=self.time_budget,
+                    )
+
+                async for path in paths:
+                    if needs_detail(path):
+                        await detail_queue.put(path)
+                    else:
+                        await file_queue.put(path)
+                    processed_count += 1
+
+                # 搜索模式下没有目录列表完成事件，遍历结束后处理剩余的 BDMV 目录
+                for bdmv_root in list(self.bdmv_pending):
+                    await emit_bdmv(bdmv_root)
+
+                # 详细信息获取协程全部退出后才能结束处理协程
+                for _ in detail_workers:
+                    await detail_queue.put(None)
+                for worker in detail_workers:
+                    error_count += await worker
+                for _ in file_workers:
+                    await file_queue.put(None)
+                for worker in file_workers:
+                    error_count += await worker
+                if self.checkpoint:
+                    saver.cancel()
+            traversal_done = True
+
+            # 分片执行时由主进程在所有分片完成后记录全量扫描时间
+            if cache and cache.refresh and not shard and not partial:
+                cache.set_full_scan_time(actual_source_dir)
+
+            for output in self.outputs:
+                if not output.sync_server:
+                    continue
+                if hot_scan:
+                    # 未遍历到的目录中的文件不能视为已删除
+                    logger.info("热扫描只遍历了部分目录，跳过清理本地文件")
+                    break
+                if resume_state and not output.__manifest_cleanup:
+                    # 中断前已处理的文件未记录在本次运行中，遍历本地目录清理会误删这些文件
+                    logger.info("本次运行从检查点继续，跳过清理本地文件，将在下次完整运行时清理")
+                    continue
+                # 所有目录清理完成后才能释放已处理路径，各目录的清理都需要与完整的已处理路径比较
+                for cleanup_dir in specific_dirs or [actual_source_dir]:
+                    if output.__manifest_cleanup:
+                        await output.__cleanup_manifest_files(cleanup_dir)
+                    else:
+                        await output.__cleanup_local_files(
+                            cleanup_dir, recursive, start_time
                         )
-                        return True
-                logger.debug(
-                    f"文件 {local_path.name} 已存在，跳过处理 {path.full_path}"
+                logger.info(f"清理 {output.target_dir} 中过期的 .strm 文件完成")
+
+            if shard:
+                # 交由主进程汇总后执行同步删除
+                # 交出已排序写入磁盘的有序段，不将全部路径载入内存传回主进程
+                shard_outputs = [
+                    {
+                        "local_paths": output.processed_local_paths.export_runs(),
+                        "manifest_changes": (
+                            output.manifest.export_changes()
+                            if output.manifest
+                            else ""
+                        ),
+                    }
+                    for output in self.outputs
+                ]
+        finally:
+            if self.checkpoint:
+                if traversal_done:
+                    self.checkpoint.clear()
+                else:
+                    save_checkpoint()
+                    logger.info("遍历中断，已保存检查点，下次运行时将从中断处继续")
+                self.checkpoint.close()
+            if cache:
+                logger.info(
+                    f"目录列表缓存命中 {cache.hits} 个目录，未命中 {cache.misses} 个目录"
                 )
-                return False
+                cache.close()
+            self.writer.close()
+            for output in self.outputs:
+                output.processed_local_paths.close()
+                if output.manifest:
+                    output.manifest.close()
+            # 恢复原始同步设置
+            self.__restore_sync(original_sync)
 
-            return True
+        # 计算执行时间
+        execution_time = time() - start_time
+        counts = self.__output_counts()
 
+        logger.info(
+            f"Alist2Strm 处理完成，处理文件数：{processed_count}，写入：{counts['written_count']}，"
+            f"未变化：{counts['unchanged_count']}，跳过：{counts['skipped_count']}，"
+            f"错误数：{error_count}，耗时：{execution_time:.2f}秒"
+        )
+
+        result = {
+            "status": "success",
+            "processed_count": processed_count,
+            "error_count": error_count,
+            **counts,
+            "execution_time": execution_time,
+            "source_dir": actual_source_dir
+        }
+        if shard:
+            result["outputs"] = shard_outputs
+        return result
+
+    def __open_output(
+        self,
+        full_rescan: bool,
+        run_id: int,
+        deferred: bool = False,
+    ) -> None:
+        """
+        初始化输出本次运行的状态（统计信息、输出清单）
 
-        if self.mode == Alist2StrmMode.RawURL:
-            is_detail = True
+        :param full_rescan: 是否强制全量扫描
+        :param run_id: 输出清单运行标识，同一次运行的所有输出使用同一标识
+        :param deferred: 输出清单是否只记录修改（多进程分片执行时）
+        """
+        self.written_count = 0  # 写入或下载的文件数
+        self.unchanged_count = 0  # 内容未变化、未重新写入的 strm 文件数
+        self.skipped_count = 0  # 本地文件已存在或清单记录未变化、未处理的文件数
+        # 云盘文件对应的本地文件路径，超出内存缓存的部分排序后暂存到磁盘
+        self.processed_local_paths = SortedPathSet(settings.CONFIG_DIR / "cache")
+
+        # 输出清单：全量扫描时仍检查本地文件，并用检查结果校正清单
+        if self.use_manifest:
+            self.manifest = Alist2StrmManifest(
+                settings.CONFIG_DIR / "cache" / "manifest.db",
+                self.target_dir,
+                run_id=run_id,
+                deferred=deferred,
+            )
         else:
-            is_detail = False
+            self.manifest = None
+        self.__verify_local = self.manifest is None or full_rescan
+        # 清单中已有该输出目录的记录时，同步删除通过查询清单完成，不再遍历本地目录
+        self.__manifest_cleanup = (
+            self.manifest is not None and not full_rescan and not self.manifest.is_empty()
+        )
+
+    def __output_counts(self) -> dict[str, int]:
+        """
+        合计各输出的统计信息
+        """
+        return {
+            key: sum(getattr(output, key) for output in self.outputs)
+            for key in ("written_count", "unchanged_count", "skipped_count")
+        }
 
-        self.processed_local_paths = set()  # 云盘文件对应的本地文件路径
+    def __restore_sync(self, original_sync: list[bool]) -> None:
+        """
+        恢复各输出原始的同步设置
+        """
+        for output, sync_server in zip(self.outputs, original_sync):
+            output.sync_server = sync_server
 
-        # 第一阶段：收集所有文件信息并直接处理普通文件
-        async with self.__max_workers, TaskGroup() as tg:
-            async for path in self.client.iter_path(
-                dir_path=actual_source_dir,
-                wait_time=self.wait_time,
-                is_detail=is_detail,
-                filter=filter,
-            ):
-                # 直接处理普通文件，不需要额外的 list
-                tg.create_task(self.__file_processer(path))
-                processed_count += 1
-
-        # 完成 BDMV 文件收集，确定最大文件
-        self._finalize_bdmv_collections()
-        
-        # 第二阶段：处理 BDMV 最大文件
-        logger.info(f"开始处理 {len(self.bdmv_largest_files)} 个 BDMV 目录")
-        for bdmv_root, largest_file in self.bdmv_largest_files.items():
-            try:
-                logger.info(f"处理 BDMV 目录: {bdmv_root}")
-                logger.info(f"最大文件: {largest_file.full_path}")
-                
-                # 重新获取详细信息以确保有 raw_url
-                if self.mode == Alist2StrmMode.RawURL and not largest_file.raw_url:
-                    logger.debug(f"重新获取 BDMV 文件详细信息: {largest_file.full_path}")
-                    try:
-                        updated_path = await self.client.async_api_fs_get(largest_file.full_path)
-                        # 保持原有的 full_path，只更新其他属性
-                        original_full_path = largest_file.full_path
-                        largest_file = updated_path
-                        largest_file.full_path = original_full_path
-                    except Exception as e:
-                        logger.warning(f"重新获取 BDMV 文件详细信息失败: {e}")
-                
-                # 处理文件
-                await self.__file_processer(largest_file)
-                
-                # 添加到已处理路径列表
-                local_path = self.__get_local_path(largest_file)
-                self.processed_local_paths.add(local_path)
-                
-                logger.info(f"BDMV 文件处理完成: {largest_file.name}")
-            except Exception as e:
-                logger.error(f"处理 BDMV 文件 {largest_file.full_path} 时出错：{e}")
-                logger.error(f"详细错误信息: {traceback.format_exc()}")
-                continue
+    def __check_file(
+        self, path: AlistEntry | AlistPath, bdmv: bool = False
+    ) -> bool:
+        """
+        判断本输出是否需要处理文件，并记录文件对应的本地文件路径
 
-        if self.sync_server:
-            await self.__cleanup_local_files()
-            logger.info("清理过期的 .strm 文件完成")
+        :param path: AlistEntry/AlistPath 对象
+        :param bdmv: 是否为选出的 BDMV 文件，BDMV 文件不检查本地文件是否存在
+        """
+        if path.suffix.lower() not in self.process_file_exts:
+            logger.debug(f"文件 {path.name} 不在处理列表中")
+            return False
 
-        # 恢复原始同步设置
-        self.sync_server = original_sync
+        try:
+            local_path = self.__get_local_path(path)
+        except OSError as e:  # 可能是文件名过长
+            logger.warning(f"获取 {path.full_path} 本地路径失败：{e}")
+            return False
 
-        # 计算执行时间
+        if not self.__manifest_cleanup:
+            self.processed_local_paths.add(local_path)
+
+        if not self.overwrite and not self.__verify_local:
+            need_process = self.__check_manifest(path, local_path)
+            if need_process is False:
+                self.skipped_count += 1
+            if need_process is not None:
+                return need_process
+
+        if bdmv:
+            return True
+
+        if not self.overwrite and local_path.exists():
+            if path.suffix in self.download_exts:
+                local_path_stat = local_path.stat()
+                # 搜索结果没有修改时间（时间戳为 0），只能通过大小判断
+                if local_path_stat.st_mtime < path.modified_timestamp:
+                    logger.debug(
+                        f"文件 {local_path.name} 已过期，需要重新处理 {path.full_path}"
+                    )
+                    return True
+                if local_path_stat.st_size < path.size:
+                    logger.debug(
+                        f"文件 {local_path.name} 大小不一致，可能是本地文件损坏，需要重新处理 {path.full_path}"
+                    )
+                    return True
+            logger.debug(
+                f"文件 {local_path.name} 已存在，跳过处理 {path.full_path}"
+            )
+            if self.manifest:
+                self.__save_manifest(path, local_path)
+            self.skipped_count += 1
+            return False
+
+        return True
+
+    async def __run_sharded(self, source_dir: str, full_rescan: bool) -> dict:
+        """
+        多进程分片执行
+        按顶层目录名称的哈希将目录树划分为 max_processes 个分片，每个子进程使用独立的事件循环和
+        AlistClient 处理一个分片，主进程汇总统计信息与输出清单修改后执行同步删除
+
+        :param source_dir: 遍历的起始目录
+        :param full_rescan: 是否强制全量扫描
+        :return: 执行结果字典
+        """
+        start_time = time()
+        logger.info(f"使用 {self.max_processes} 个进程分片处理 {source_dir}")
+
+        run_id = time_ns()
+        for output in self.outputs:
+            output.__open_output(full_rescan, run_id)
+        if self.use_search and self.__search_supported():
+            cache = None
+        else:
+            cache = self.__open_listing_cache(source_dir, full_rescan)
+
+        # 子进程不执行同步删除，检查点以单个进程的遍历为单位，分片执行时不使用
+        options = self.options | {
+            "max_processes": 1,
+            "sync_server": False,
+            "checkpoint_interval": 0,
+        }
+        # 每个子进程使用独立的限速器，按分片数均分速率，所有子进程的总请求速率不超过配置
+        if self.options["rate_limit"]:
+            options["rate_limit"] = self.__divide_rate_limit(
+                self.options["rate_limit"], self.max_processes
+            )
+        elif self.options["wait_time"]:
+            options["wait_time"] = self.options["wait_time"] * self.max_processes
+        loop = get_running_loop()
+        executor = ProcessPoolExecutor(
+            max_workers=self.max_processes, mp_context=get_context("spawn")
+        )
+        # 子进程交出、尚未写入清单的修改记录文件，出错时由主进程删除
+        changes_paths: set[str] = set()
+        try:
+            results = await gather(
+                *(
+                    loop.run_in_executor(
+                        executor,
+                        _run_shard,
+                        options,
+                        source_dir,
+                        full_rescan,
+                        (index, self.max_processes),
+                    )
+                    for index in range(self.max_processes)
+                )
+            )
+            if cache and cache.refresh and self.time_budget <= 0:
+                cache.set_full_scan_time(source_dir)
+
+            changes_paths = {
+                output_result["manifest_changes"]
+                for result in results
+                for output_result in result["outputs"]
+            } - {""}
+            for index, output in enumerate(self.outputs):
+                for result in results:
+                    output_result = result["outputs"][index]
+                    output.processed_local_paths.import_runs(
+                        *output_result["local_paths"]
+                    )
+                    if output.manifest:
+                        changes_path = output_result["manifest_changes"]
+                        changes_paths.discard(changes_path)
+                        output.manifest.apply(changes_path)
+
+                if output.sync_server and self.time_budget <= 0:
+                    if output.__manifest_cleanup:
+                        await output.__cleanup_manifest_files(source_dir)
+                    else:
+                        await output.__cleanup_local_files(
+                            source_dir, started_at=start_time
+                        )
+                    logger.info(f"清理 {output.target_dir} 中过期的 .strm 文件完成")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            for changes_path in changes_paths:
+                Path(changes_path).unlink(missing_ok=True)
+            if cache:
+                cache.close()
+            for output in self.outputs:
+                output.processed_local_paths.close()
+                if output.manifest:
+                    output.manifest.close()
+
+        summary = {
+            key: sum(result[key] for result in results)
+            for key in (
+                "processed_count",
+                "error_count",
+                "written_count",
+                "unchanged_count",
+                "skipped_count",
+            )
+        }
         execution_time = time() - start_time
+        logger.info(
+            f"Alist2Strm 分片处理完成，处理文件数：{summary['processed_count']}，"
+            f"写入：{summary['written_count']}，未变化：{summary['unchanged_count']}，"
+            f"跳过：{summary['skipped_count']}，错误数：{summary['error_count']}，"
+            f"耗时：{execution_time:.2f}秒"
+        )
+        return {
+            "status": "success",
+            **summary,
+            "execution_time": execution_time,
+            "source_dir": source_dir,
+        }
 
-        logger.info(f"Alist2Strm 处理完成，处理文件数：{processed_count}，错误数：{error_count}，耗时：{execution_time:.2f}秒")
+    async def __run_leased(self, source_dir: str, full_rescan: bool) -> dict:
+        """
+        租约模式
+        将起始目录中的每个顶层目录（以及起始目录中的文件）作为一个工作单元，
+        多个实例通过共享的租约数据库获取工作单元，每个工作单元只由一个实例处理，
+        同步删除在工作单元对应的本地目录中进行
+
+        :param source_dir: 遍历的起始目录
+        :param full_rescan: 是否强制全量扫描
+        :return: 本实例处理的工作单元的汇总结果
+        """
+        start_time = time()
+        root = source_dir.rstrip("/")
+        entries = await self.client.async_api_fs_list(source_dir)
+        # 空字符串表示起始目录中的文件
+        units = [""] + [
+            path.name
+            for path in entries
+            if path.is_dir and self.matcher.match_dir(path.full_path)
+        ]
+
+        # 租约数据库位于共享存储上，等待其它实例的写锁时不能阻塞事件循环
+        leases = await to_thread(
+            Alist2StrmLeases,
+            Path(self.lease_db),
+            task=f"{self.client.url + self.client.base_path}:{source_dir}:{self.target_dir.absolute()}",
+            ttl=self.lease_ttl,
+        )
+        summary = dict.fromkeys(
+            (
+                "processed_count",
+                "error_count",
+                "written_count",
+                "unchanged_count",
+                "skipped_count",
+            ),
+            0,
+        )
+        processed_units = 0
+        try:
+            # 其它实例刚完成本轮运行时不再重复处理
+            round_id = await to_thread(
+                leases.join_round, units, min_interval=self.lease_ttl
+            )
+            if round_id is None:
+                logger.info(f"其它实例刚完成 {source_dir} 的处理，跳过本次运行")
+            else:
+                while (unit := await to_thread(leases.acquire)) is not None:
+                    logger.info(f"获取工作单元：{root}/{unit}")
+                    result = await self.__run_lease_unit(
+                        leases, source_dir, unit, full_rescan
+                    )
+                    if result is None:
+                        continue
+                    for key in summary:
+                        summary[key] += result[key]
+                    processed_units += 1
+        finally:
+            await to_thread(leases.close)
 
+        execution_time = time() - start_time
+        logger.info(
+            f"Alist2Strm 租约模式处理完成，本实例处理工作单元数：{processed_units}，"
+            f"处理文件数：{summary['processed_count']}，错误数：{summary['error_count']}，"
+            f"耗时：{execution_time:.2f}秒"
+        )
         return {
             "status": "success",
-            "processed_count": processed_count,
-            "error_count": error_count,
+            **summary,
             "execution_time": execution_time,
-            "source_dir": actual_source_dir
+            "source_dir": source_dir,
         }
 
-    async def __file_processer(self, path: AlistPath) -> None:
+    async def __run_lease_unit(
+        self, leases: Alist2StrmLeases, source_dir: str, unit: str, full_rescan: bool
+    ) -> dict | None:
+        """
+        处理一个工作单元，处理期间定期续约，失败时释放租约；
+        续约失败（租约已被其它实例接管）时取消本实例的处理，避免两个实例同时写入同一目录
+
+        :param leases: 工作单元租约
+        :param source_dir: 遍历的起始目录
+        :param unit: 工作单元（顶层目录名称，空字符串表示起始目录中的文件）
+        :param full_rescan: 是否强制全量扫描
+        :return: 执行结果字典，租约被接管时返回 None
+        """
+        root = source_dir.rstrip("/")
+        lease_lost = False
+
+        if unit:
+            worker = create_task(self.run(f"{root}/{unit}", full_rescan=full_rescan))
+        else:
+            worker = create_task(
+                self.run(source_dir, full_rescan=full_rescan, recursive=False)
+            )
+
+        async def keep_alive() -> None:
+            nonlocal lease_lost
+            while True:
+                await sleep(leases.ttl / 3)
+                if not await to_thread(leases.renew, unit):
+                    lease_lost = True
+                    worker.cancel()
+                    return
+
+        renewer = create_task(keep_alive())
+        try:
+            result = await worker
+        except CancelledError:
+            # 本任务被取消（而非租约被接管）时照常释放租约并继续取消
+            if not lease_lost or current_task().cancelling():
+                await to_thread(leases.release, unit)
+                raise
+        except BaseException:
+            await to_thread(leases.release, unit)
+            raise
+        finally:
+            renewer.cancel()
+
+        if lease_lost or not await to_thread(leases.complete, unit):
+            logger.warning(f"工作单元 {root}/{unit} 的租约已被其它实例接管，停止处理")
+            return None
+        return result
+
+    def __get_rate_limiter(
+        self, rate_limit: dict | None, wait_time: float
+    ) -> RateLimiter | None:
+        """
+        获取本任务的限速器
+        同一任务（相同 id）同时进行的多次运行（如变更推送与定时扫描）共用一个限速器，配置变化时重新创建；
+        未设置 id 的任务每次构造使用独立的限速器
+
+        :param rate_limit: 限速配置
+        :param wait_time: 请求间隔时间，未设置 rate_limit 时生效
+        :return: 限速器，不限速时返回 None
+        """
+        if rate_limit:
+            config = (
+                float(rate_limit.get("rate", 0)),
+                int(rate_limit.get("burst", 1)),
+                rate_limit.get("overrides"),
+            )
+        elif wait_time:
+            config = (1 / wait_time, 1, None)
+        else:
+            return None
+
+        if not self.task_id:
+            return RateLimiter(*config, host=self.client.url)
+        key = (self.task_id, self.client.url)
+        cached = self.__rate_limiters.get(key)
+        if cached is None or cached[0] != config:
+            cached = (config, RateLimiter(*config, host=self.client.url))
+            self.__rate_limiters[key] = cached
+        return cached[1]
+
+    @staticmethod
+    def __divide_rate_limit(rate_limit: dict, count: int) -> dict:
+        """
+        将限速配置（包括各挂载路径的覆盖配置）的速率与突发请求数按分片数均分
+
+        :param rate_limit: 限速配置
+        :param count: 分片数
+        :return: 每个分片的限速配置
+        """
+
+        def divide(config: dict) -> dict:
+            divided = dict(config)
+            if "rate" in config:
+                divided["rate"] = float(config["rate"]) / count
+            if "burst" in config:
+                divided["burst"] = max(1, int(config["burst"]) // count)
+            return divided
+
+        overrides = rate_limit.get("overrides") or {}
+        return divide(rate_limit) | {
+            "overrides": {prefix: divide(config) for prefix, config in overrides.items()}
+        }
+
+    def __in_shard(self, root: str, path: AlistEntry) -> bool:
+        """
+        判断文件/目录是否属于当前进程处理的分片
+        按顶层目录名称的哈希划分，起始目录中的文件由第一个分片处理
+
+        :param root: 遍历的起始目录（不含末尾的 /）
+        :param path: AlistEntry 对象
+        """
+        index, count = self.shard
+        top, separator, _ = path.full_path[len(root) + 1 :].partition("/")
+        if not separator and not path.is_dir:
+            return index == 0
+        return crc32(top.encode("utf-8")) % count == index
+
+    def __open_listing_cache(
+        self, source_dir: str, full_rescan: bool, commit_interval: int = 500
+    ) -> AlistListingCache | None:
+        """
+        增量模式下打开目录列表缓存
+        首次运行、距上次全量扫描超过 full_rescan_interval 天或指定 full_rescan 时，
+        以刷新模式打开（只写入不读取），即执行全量扫描
+
+        :param source_dir: 遍历的起始目录
+        :param full_rescan: 是否强制全量扫描
+        :param commit_interval: 每写入多少个目录提交一次事务
+        :return: 目录列表缓存，未启用增量模式时返回 None
+        """
+        if not self.incremental:
+            return None
+
+        cache = AlistListingCache(
+            settings.CONFIG_DIR / "cache" / "listing.db",
+            server=self.client.url + self.client.base_path,
+            commit_interval=commit_interval,
+        )
+        last_full_scan = cache.get_full_scan_time(source_dir)
+        if full_rescan or last_full_scan is None:
+            cache.refresh = True
+        elif self.full_rescan_interval > 0:
+            cache.refresh = (
+                time() - last_full_scan >= self.full_rescan_interval * 24 * 60 * 60
+            )
+
+        if cache.refresh:
+            logger.info(f"增量模式：对 {source_dir} 执行全量扫描")
+        else:
+            logger.info(f"增量模式：{source_dir} 中未变化的目录将使用缓存的文件列表")
+        return cache
+
+    def __open_checkpoint(self, source_dir: str) -> Alist2StrmCheckpoint:
+        """
+        打开遍历检查点
+        检查点以服务器、遍历目录与输出目录区分，影响遍历结果的配置变化后检查点失效
+
+        :param source_dir: 遍历的起始目录
+        :return: 遍历检查点
+        """
+        server = self.client.url + self.client.base_path
+        config = {
+            "mode": self.mode.name,
+            "flatten_mode": self.flatten_mode,
+            "overwrite": self.overwrite,
+            "download_exts": sorted(self.download_exts),
+            "include": self.include,
+            "exclude": self.exclude,
+            "use_manifest": self.use_manifest,
+            "outputs": self.outputs_config,
+        }
+        return Alist2StrmCheckpoint(
+            settings.CONFIG_DIR / "cache" / "checkpoint.db",
+            key=f"{server}:{source_dir}:{self.target_dir.absolute()}",
+            config_hash=sha1(
+                dumps(config, sort_keys=True, default=str).encode("utf-8")
+            ).hexdigest(),
+        )
+
+    def __track_file(self, path: AlistEntry | AlistPath) -> None:
+        """
+        记录交给处理阶段的文件，其所在目录在文件处理完成前不会被标记为已完成
+
+        :param path: AlistEntry/AlistPath 对象
+        """
+        if self.checkpoint:
+            dir_path = path.full_path.rsplit("/", 1)[0]
+            self.__dir_files[dir_path] = self.__dir_files.get(dir_path, 0) + 1
+
+    def __file_done(self, path: AlistEntry | AlistPath, failed: bool = False) -> None:
+        """
+        文件处理完成（或失败），目录列表已获取完成且其中文件均已处理完成时将目录标记为已完成
+
+        :param path: AlistEntry/AlistPath 对象
+        :param failed: 是否处理失败
+        """
+        if not self.checkpoint:
+            return
+        if failed:
+            self.__failed_files += 1
+        dir_path = path.full_path.rsplit("/", 1)[0]
+        left = self.__dir_files[dir_path] - 1
+        if left:
+            self.__dir_files[dir_path] = left
+            return
+        del self.__dir_files[dir_path]
+        if dir_path in self.__listed_dirs:
+            self.__listed_dirs.discard(dir_path)
+            self.checkpoint.finish(dir_path)
+
+    def __dir_listed(self, dir_path: str) -> None:
+        """
+        目录列表获取完成，目录中没有待处理的文件时直接标记为已完成
+
+        :param dir_path: 目录路径（不含末尾的 /）
+        """
+        if not self.checkpoint:
+            return
+        if dir_path in self.__dir_files:
+            self.__listed_dirs.add(dir_path)
+        else:
+            self.checkpoint.finish(dir_path)
+
+    async def __detail_worker(
+        self,
+        queue: Queue[AlistEntry | None],
+        file_queue: Queue[AlistEntry | AlistPath | None],
+    ) -> int:
+        """
+        详细信息获取协程
+        从队列中取出文件，通过 fs/get 获取 raw_url 后放入处理队列，
+        取到 None 时退出
+
+        :param queue: 待获取详细信息的 AlistEntry 队列
+        :param file_queue: 待处理文件队列
+        :return: 获取失败的文件数
+        """
+        error_count = 0
+        while (path := await queue.get()) is not None:
+            try:
+                detail_path = await self.client.async_api_fs_get(path.full_path)
+            except Exception as e:
+                logger.error(f"获取 {path.full_path} 详细信息失败：{e}")
+                error_count += 1
+                self.__file_outputs.pop(path.full_path, None)
+                self.__file_done(path, failed=True)
+                continue
+            await file_queue.put(detail_path)
+        return error_count
+
+    async def __file_worker(
+        self, queue: Queue[AlistEntry | AlistPath | None]
+    ) -> int:
+        """
+        文件处理协程
+        从队列中取出文件交由需要处理该文件的各输出的 __file_processer 处理，取到 None 时退出
+
+        :param queue: 待处理文件队列
+        :return: 处理失败的文件数
+        """
+        error_count = 0
+        while (path := await queue.get()) is not None:
+            failed = False
+            for output in self.__file_outputs.pop(path.full_path, ()):
+                try:
+                    await output.__file_processer(path)
+                except Exception as e:
+                    logger.error(f"处理 {path.full_path} 至 {output.target_dir} 失败：{e}")
+                    error_count += 1
+                    failed = True
+            self.__file_done(path, failed)
+        return error_count
+
+    async def __file_processer(self, path: AlistEntry | AlistPath) -> None:
         """
         异步保存文件至本地
 
-        :param path: AlistPath 对象
+        :param path: AlistEntry/AlistPath 对象
         """
         local_path = self.__get_local_path(path)
         logger.debug(f"__file_processer: 处理文件 {path.full_path} -> 本地路径 {local_path} | 模式 {self.mode}")
 
         # 统一的 URL 生成逻辑，BDMV 文件与普通文件使用相同的逻辑
-        if self.mode == Alist2StrmMode.AlistURL:
-            content = path.download_url
-        elif self.mode == Alist2StrmMode.RawURL:
-            content = path.raw_url
-        elif self.mode == Alist2StrmMode.AlistPath:
-            content = path.full_path
+        content = self.__get_content(path)
 
         logger.debug(f"__file_processer: 初始 content = {content}")
 
-        if not content:
-            logger.warning(f"文件 {path.full_path} 的内容为空，跳过处理")
-            return
-
-        await to_thread(local_path.parent.mkdir, parents=True, exist_ok=True)
-
         logger.debug(f"开始处理 {local_path} | 内容: {content}")
         if local_path.suffix == ".strm":
-            async with async_open(local_path, mode="w", encoding="utf-8") as file:
-                await file.write(content)
-            logger.info(f"{local_path.name} 创建成功")
+            # 字幕、图片等下载的文件不使用 strm 内容（RawURL 模式下没有 raw_url），只检查 strm 文件
+            if not content:
+                logger.warning(f"文件 {path.full_path} 的内容为空，跳过处理")
+                return
+            if self.__is_manifest_content_unchanged(local_path, content):
+                written = False
+            else:
+                written = await self.writer.write(local_path, content)
+            if written:
+                self.written_count += 1
+                logger.info(f"{local_path.name} 创建成功")
+            else:
+                self.unchanged_count += 1
+                logger.debug(f"{local_path.name} 内容未变化，跳过写入")
         else:
+            await to_thread(local_path.parent.mkdir, parents=True, exist_ok=True)
             async with self.__max_downloaders:
-                await RequestUtils.download(path.download_url, local_path)
+                await RequestUtils.download(
+                    self.__get_download_url(path), local_path, rate_key=path.abs_path
+                )
                 logger.info(f"{local_path.name} 下载成功")
+            self.written_count += 1
 
-    def __get_local_path(self, path: AlistPath) -> Path:
+        if self.manifest:
+            self.__save_manifest(path, local_path, content)
+
+    def __is_manifest_content_unchanged(self, local_path: Path, content: str) -> bool:
+        """
+        根据输出清单中的内容哈希判断 strm 文件内容是否未变化，无需读取本地文件
+        全量扫描时始终返回 False，以读取本地文件进行比较
+
+        :param local_path: 本地文件路径
+        :param content: strm 文件内容
         """
-        根据给定的 AlistPath 对象和当前的配置，计算出本地文件路径。
+        if not self.manifest or self.__verify_local:
+            return False
+        record = self.manifest.get(self.__manifest_key(local_path))
+        return record is not None and record[3] == self.__content_hash(
+            local_path, content
+        )
 
-        :param path: AlistPath 对象
+    def __get_content(self, path: AlistEntry | AlistPath) -> str | None:
+        """
+        获取 strm 文件内容
+
+        :param path: AlistEntry/AlistPath 对象
+        :return: strm 文件内容，RawURL 模式下未获取详细信息时为 None
+        """
+        if self.mode == Alist2StrmMode.AlistURL:
+            return self.__get_download_url(path)
+        elif self.mode == Alist2StrmMode.RawURL:
+            return path.raw_url
+        elif self.mode == Alist2StrmMode.AlistPath:
+            return path.full_path
+        elif self.mode == Alist2StrmMode.PlayURL:
+            url = f"{self.play_url}/api/play/{self.task_id}{path.full_path}"
+            if self.play_secret:
+                sign = AlistUtils.sign(self.play_secret, self.task_id + path.full_path)
+                url += f"?sign={sign}"
+            return URLUtils.encode(url)
+
+    def __search_supported(self) -> bool:
+        """
+        判断各输出能否使用搜索结果生成文件
+        搜索结果不含签名，未设置 sign_secret 时，AlistURL 模式的 strm 文件与下载的文件
+        只能使用目录列表中返回的签名，此时不使用搜索索引
+        """
+        for output in self.outputs:
+            if output.sign_secret:
+                continue
+            if output.mode == Alist2StrmMode.AlistURL or output.download_exts:
+                logger.warning(
+                    f"搜索结果不含签名，{output.target_dir} 需要签名的下载地址且未设置 sign_secret，"
+                    "使用目录遍历"
+                )
+                return False
+        return True
+
+    def __modified_known(self, path: AlistEntry | AlistPath) -> bool:
+        """
+        文件修改时间是否已知（搜索结果中没有修改时间）
+        """
+        return path.modified != self.client.SEARCH_UNKNOWN_TIME
+
+    def __get_download_url(self, path: AlistEntry | AlistPath) -> str:
+        """
+        获取文件下载地址
+        设置了 sign_secret 时在本地计算签名，不依赖目录列表中返回的签名（搜索结果中没有签名）
+
+        :param path: AlistEntry/AlistPath 对象
+        :return: 文件下载地址
+        """
+        if not self.sign_secret:
+            return path.download_url
+        sign = AlistUtils.sign(self.sign_secret, path.abs_path)
+        return URLUtils.encode(f"{path.server_url}/d{path.abs_path}?sign={sign}")
+
+    def __manifest_key(self, local_path: Path) -> str:
+        """
+        获取本地文件在输出清单中的路径（相对输出目录）
+        """
+        return local_path.relative_to(self.target_dir).as_posix()
+
+    def __content_hash(
+        self, local_path: Path, content: str | None
+    ) -> str | None:
+        """
+        计算 strm 文件内容哈希，非 strm 文件或内容未知时返回 None
+        """
+        if local_path.suffix != ".strm" or not content:
+            return None
+        return sha1(content.encode("utf-8")).hexdigest()
+
+    def __check_manifest(
+        self, path: AlistEntry | AlistPath, local_path: Path
+    ) -> bool | None:
+        """
+        根据输出清单判断文件是否需要处理
+        云盘文件路径、修改时间、大小与记录一致，且 strm 内容未变化时无需处理
+
+        :param path: AlistEntry/AlistPath 对象
+        :param local_path: 本地文件路径
+        :return: 需要处理时返回 True，无需处理时返回 False，清单中没有记录时返回 None
+        """
+        key = self.__manifest_key(local_path)
+        record = self.manifest.get(key)
+        if record is None:
+            return None
+
+        # 标记为已出现，处理失败时也不会在同步时被删除
+        self.manifest.touch(key)
+        remote_path, modified, size, content_hash = record
+        # 搜索结果没有修改时间，只比较路径与大小
+        if not self.__modified_known(path):
+            modified = path.modified
+        if (remote_path, modified, size) != (path.full_path, path.modified, path.size):
+            logger.debug(f"文件 {path.full_path} 已变化，需要重新处理")
+            return True
+
+        expected_hash = self.__content_hash(local_path, self.__get_content(path))
+        if content_hash and expected_hash and content_hash != expected_hash:
+            logger.debug(f"文件 {local_path.name} 内容已变化，需要重新处理")
+            return True
+
+        logger.debug(f"文件 {local_path.name} 未变化，跳过处理 {path.full_path}")
+        return False
+
+    def __save_manifest(
+        self,
+        path: AlistEntry | AlistPath,
+        local_path: Path,
+        content: str | None = None,
+    ) -> None:
+        """
+        将本地文件记录至输出清单
+
+        :param path: AlistEntry/AlistPath 对象
+        :param local_path: 本地文件路径
+        :param content: strm 文件内容，为空时根据当前模式计算
+        """
+        key = self.__manifest_key(local_path)
+        modified = path.modified
+        if not self.__modified_known(path):
+            # 搜索结果没有修改时间，保留清单中同一文件已记录的修改时间
+            record = self.manifest.get(key)
+            if record is not None and record[0] == path.full_path:
+                modified = record[1]
+        self.manifest.set(
+            key,
+            path.full_path,
+            modified,
+            path.size,
+            self.__content_hash(local_path, content or self.__get_content(path)),
+        )
+
+    def __get_local_path(self, path: AlistEntry | AlistPath) -> Path:
+        """
+        根据给定的 AlistEntry/AlistPath 对象和当前的配置，计算出本地文件路径。
+
+        :param path: AlistEntry/AlistPath 对象
         :return: 本地文件路径
         """
         # 检查是否为 BDMV 文件
@@ -329,55 +1463,145 @@ class Alist2Strm:
 
         return local_path
 
-    async def __cleanup_local_files(self) -> None:
+    async def __cleanup_local_files(
+        self, source_dir: str, recursive: bool = True, started_at: float = 0
+    ) -> None:
         """
         删除服务器中已删除的本地的 .strm 文件及其关联文件
+        只清理本次遍历的云盘目录对应的本地目录（平铺模式下为输出目录）
         如果文件后缀在 sync_ignore 中，则不会被删除
+
+        :param source_dir: 本次遍历的云盘目录
+        :param recursive: 本次遍历是否包括子目录，为 False 时删除云盘中已不存在的子目录中的文件
+        :param started_at: 本次运行的开始时间，此后修改的文件由同时进行的其它运行（如变更推送）写入，不会被删除
         """
         logger.info("开始清理本地文件")
 
         if self.flatten_mode:
-            all_local_files = [f for f in self.target_dir.iterdir() if f.is_file()]
+            local_dir = self.target_dir
         else:
-            all_local_files = [f for f in self.target_dir.rglob("*") if f.is_file()]
+            relative_path = source_dir.replace(self.source_dir, "", 1).lstrip("/")
+            local_dir = self.target_dir / relative_path
+        files_to_delete = await to_thread(
+            self.__find_removed_files, local_dir, recursive, started_at
+        )
+
+        deleted_files = await self.__delete_local_files(files_to_delete)
+        if self.manifest:
+            for file in deleted_files:
+                self.manifest.delete(self.__manifest_key(Path(file)))
+
+    def __find_removed_files(
+        self, local_dir: Path, recursive: bool, started_at: float = 0
+    ) -> list[str]:
+        """
+        遍历本地目录，找出不在 processed_local_paths 中、且在 started_at 之前修改的文件
+        本地文件同样存入外部排序的路径集合，两个集合按顺序归并比较，内存占用与媒体库规模无关
 
-        files_to_delete = set(all_local_files) - self.processed_local_paths
+        :param local_dir: 本地目录
+        :param recursive: 本次遍历是否包括子目录
+        :param started_at: 本次运行的开始时间
+        :return: 待删除的文件路径列表
+        """
+        recursive = recursive and not self.flatten_mode
+        with SortedPathSet(settings.CONFIG_DIR / "cache") as local_files:
+            for files in FileUtils.iter_files(local_dir, recursive=recursive):
+                local_files.update(files)
+            if not recursive and not self.flatten_mode:
+                for sub_dir in self.__list_removed_dirs(local_dir):
+                    for files in FileUtils.iter_files(sub_dir):
+                        local_files.update(files)
+            files = local_files.difference(self.processed_local_paths)
+            if not started_at:
+                return list(files)
+            return [file for file in files if self.__modified_before(file, started_at)]
+
+    @staticmethod
+    def __modified_before(file: str, timestamp: float) -> bool:
+        """
+        判断文件是否在指定时间之前修改（文件已不存在时返回 False）
+        """
+        try:
+            return stat(file).st_mtime < timestamp
+        except OSError:
+            return False
 
-        for file_path in files_to_delete:
-            # 检查文件是否匹配忽略正则表达式
-            if self.sync_ignore_pattern and self.sync_ignore_pattern.search(
-                file_path.name
-            ):
-                logger.debug(f"文件 {file_path.name} 在忽略列表中，跳过删除")
-                continue
+    def __list_removed_dirs(self, local_dir: Path) -> list[str]:
+        """
+        获取本地目录中云盘已不存在的子目录
 
-            try:
-                if file_path.exists():
-                    await to_thread(file_path.unlink)
-                    logger.info(f"删除文件：{file_path}")
-
-                    # 检查并删除空目录
-                    parent_dir = file_path.parent
-                    while parent_dir != self.target_dir:
-                        if any(parent_dir.iterdir()):
-                            break  # 目录不为空，跳出循环
-                        else:
-                            parent_dir.rmdir()
-                            logger.info(f"删除空目录：{parent_dir}")
-                        parent_dir = parent_dir.parent
-            except Exception as e:
-                logger.error(f"删除文件 {file_path} 失败：{e}")
+        :param local_dir: 本地目录
+        :return: 子目录路径列表
+        """
+        try:
+            with scandir(local_dir) as entries:
+                return [
+                    entry.path
+                    for entry in entries
+                    if entry.is_dir(follow_symlinks=False)
+                    and entry.name not in self.__remote_dirs
+                ]
+        except FileNotFoundError:
+            return []
+
+    async def __cleanup_manifest_files(self, source_dir: str) -> None:
+        """
+        根据输出清单删除本次运行未出现的本地文件，不遍历本地目录
+        如果文件后缀在 sync_ignore 中，则不会被删除
 
-    def _is_bdmv_file(self, path: AlistPath) -> bool:
+        :param source_dir: 本次遍历的云盘目录
+        """
+        logger.info("开始根据输出清单清理本地文件")
+
+        files_to_delete = {
+            fspath(self.target_dir / key): key
+            for key in self.manifest.get_unseen(source_dir)
+        }
+        for file in await self.__delete_local_files(list(files_to_delete)):
+            self.manifest.delete(files_to_delete[file])
+
+    async def __delete_local_files(self, files: list[str]) -> list[str]:
+        """
+        使用线程池分批删除本地文件，完成后自底向上删除一次空目录
+        如果文件名匹配 sync_ignore，则不会被删除
+
+        :param files: 待删除的文件路径列表
+        :return: 已删除的文件路径列表
+        """
+        if self.sync_ignore_pattern:
+            ignored = [
+                file for file in files if self.sync_ignore_pattern.search(basename(file))
+            ]
+            for file in ignored:
+                logger.debug(f"文件 {basename(file)} 在忽略列表中，跳过删除")
+            if ignored:
+                ignored_set = set(ignored)
+                files = [file for file in files if file not in ignored_set]
+
+        deleted_files, failed_files = await to_thread(FileUtils.delete_files, files)
+        for file in deleted_files:
+            logger.info(f"删除文件：{file}")
+        for file, e in failed_files:
+            logger.error(f"删除文件 {file} 失败：{e}")
+
+        removed_dirs = await to_thread(
+            FileUtils.prune_empty_dirs, deleted_files, self.target_dir
+        )
+        for dir_path in removed_dirs:
+            logger.info(f"删除空目录：{dir_path}")
+
+        return deleted_files
+
+    def _is_bdmv_file(self, path: AlistEntry | AlistPath) -> bool:
         """
         检查文件是否为 BDMV 结构中的 .m2ts 文件
         
-        :param path: AlistPath 对象
+        :param path: AlistEntry/AlistPath 对象
         :return: 是否为 BDMV 文件
         """
         return "/BDMV/STREAM/" in path.full_path and path.suffix.lower() == ".m2ts"
 
-    def _get_bdmv_root_dir(self, path: AlistPath) -> str:
+    def _get_bdmv_root_dir(self, path: AlistEntry | AlistPath) -> str:
         """
         获取 BDMV 文件的根目录路径
         
@@ -400,49 +1624,43 @@ class Alist2Strm:
         # 获取最后一个目录名作为电影标题
         return Path(bdmv_root).name
 
-    def _collect_bdmv_file(self, path: AlistPath) -> None:
+    def _track_bdmv_file(self, path: AlistEntry | AlistPath) -> None:
         """
-        收集 BDMV 文件信息
-        
+        记录 BDMV 文件，每个 BDMV 目录只保留当前最大的文件
+
         :param path: BDMV 中的 .m2ts 文件路径
         """
         bdmv_root = self._get_bdmv_root_dir(path)
         if not bdmv_root:
             return
 
-        if bdmv_root not in self.bdmv_collections:
-            self.bdmv_collections[bdmv_root] = []
-
-        # 添加文件信息到集合中
-        self.bdmv_collections[bdmv_root].append((path, path.size))
+        largest_file, count = self.bdmv_pending.get(bdmv_root, (None, 0))
+        if largest_file is None or path.size > largest_file.size:
+            largest_file = path
+        self.bdmv_pending[bdmv_root] = (largest_file, count + 1)
         logger.debug(f"收集 BDMV 文件: {path.full_path}, 大小: {path.size}")
 
-    def _finalize_bdmv_collections(self) -> None:
+    def _select_bdmv_file(self, bdmv_root: str) -> AlistEntry | AlistPath | None:
         """
-        完成 BDMV 文件收集，确定每个 BDMV 目录中的最大文件
-        """
-        for bdmv_root, files in self.bdmv_collections.items():
-            if not files:
-                continue
+        确定 BDMV 目录中的最大文件
 
-            movie_title = self._get_movie_title_from_bdmv_path(bdmv_root)
-            logger.info(f"BDMV 目录 '{movie_title}' 中发现 {len(files)} 个 .m2ts 文件:")
-            
-            # 按大小排序并显示所有文件
-            sorted_files = sorted(files, key=lambda x: x[1], reverse=True)
-            for i, (file_path, file_size) in enumerate(sorted_files):
-                size_mb = file_size / (1024 * 1024)
-                status = "✓ 选中" if i == 0 else "  跳过"
-                logger.info(f"  {status} {file_path.name}: {size_mb:.1f} MB ({file_size} 字节)")
-
-            # 找出最大的文件
-            largest_file = max(files, key=lambda x: x[1])
-            self.bdmv_largest_files[bdmv_root] = largest_file[0]
-            
-            largest_size_mb = largest_file[1] / (1024 * 1024)
-            logger.info(f"BDMV 目录 '{movie_title}' 最终选择: {largest_file[0].name} ({largest_size_mb:.1f} MB)")
-
-    def _should_process_bdmv_file(self, path: AlistPath) -> bool:
+        :param bdmv_root: BDMV 根目录路径
+        :return: 最大文件，未收集到文件时返回 None
+        """
+        largest_file, count = self.bdmv_pending.pop(bdmv_root, (None, 0))
+        if largest_file is None:
+            return None
+
+        self.bdmv_largest_files[bdmv_root] = largest_file
+        movie_title = self._get_movie_title_from_bdmv_path(bdmv_root)
+        largest_size_mb = largest_file.size / (1024 * 1024)
+        logger.info(
+            f"BDMV 目录 '{movie_title}' 中发现 {count} 个 .m2ts 文件，"
+            f"选择: {largest_file.name} ({largest_size_mb:.1f} MB)"
+        )
+        return largest_file
+
+    def _should_process_bdmv_file(self, path: AlistEntry | AlistPath) -> bool:
         """
         检查 BDMV 文件是否应该被处理（即是否为最大文件）
         
@@ -456,3 +1674,21 @@ class Alist2Strm:
         largest_file = self.bdmv_largest_files.get(bdmv_root)
         return largest_file is not None and largest_file.full_path == path.full_path
 
+
+def _run_shard(
+    options: dict, source_dir: str, full_rescan: bool, shard: tuple[int, int]
+) -> dict:
+    """
+    在子进程中处理一个分片
+
+    :param options: Alist2Strm 配置
+    :param source_dir: 遍历的起始目录
+    :param full_rescan: 是否强制全量扫描
+    :param shard: (分片序号, 分片数)
+    :return: 执行结果字典
+    """
+    return run(
+        Alist2Strm(**options).run(
+            source_dir, sync_mode=False, full_rescan=full_rescan, shard=shard
+        )
+    )
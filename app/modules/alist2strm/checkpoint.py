@@ -0,0 +1,125 @@
+from json import dumps, loads
+from pathlib import Path
+from time import time
+
+from app.core import logger
+from app.utils import SQLiteUtils
+
+
+class Alist2StrmCheckpoint:
+    """
+    Alist2Strm 遍历检查点
+    使用 SQLite 定期保存遍历状态（已发现但未完成的目录、已完成的目录、统计信息），
+    运行中断后再次运行时从未完成的目录继续遍历，不再重新请求已完成的目录
+
+    目录完成是指：目录列表已获取完成，且其中需要处理的文件均已处理完毕
+    """
+
+    def __init__(self, db_path: Path, key: str, config_hash: str) -> None:
+        """
+        :param db_path: SQLite 数据库文件路径
+        :param key: 任务标识（服务器地址、遍历目录与输出目录）
+        :param config_hash: 任务配置哈希，配置变化时已保存的检查点失效
+        """
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.key = key
+        self.config_hash = config_hash
+        self.__new_dirs: list[str] = []
+        self.__done_dirs: list[str] = []
+        self.__conn = SQLiteUtils.connect(db_path)
+        self.__conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoint ("
+            "key TEXT PRIMARY KEY, config_hash TEXT NOT NULL, run_id INTEGER, "
+            "counters TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self.__conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoint_dir ("
+            "key TEXT NOT NULL, path TEXT NOT NULL, done INTEGER NOT NULL, "
+            "PRIMARY KEY (key, path))"
+        )
+        self.__conn.commit()
+
+    def load(self) -> tuple[int | None, dict, list[str], set[str]] | None:
+        """
+        读取上次中断时保存的检查点
+
+        :return: (输出清单运行标识, 统计信息, 未完成的目录列表, 已完成的目录集合)，
+                 不存在或任务配置已变化时返回 None
+        """
+        row = self.__conn.execute(
+            "SELECT config_hash, run_id, counters FROM checkpoint WHERE key = ?",
+            (self.key,),
+        ).fetchone()
+        if row is None:
+            return None
+        if row[0] != self.config_hash:
+            logger.info("任务配置已变化，丢弃上次保存的遍历检查点")
+            self.clear()
+            return None
+
+        pending: list[str] = []
+        done: set[str] = set()
+        for path, is_done in self.__conn.execute(
+            "SELECT path, done FROM checkpoint_dir WHERE key = ?", (self.key,)
+        ):
+            if is_done:
+                done.add(path)
+            else:
+                pending.append(path)
+        return row[1], loads(row[2]), pending, done
+
+    def discover(self, dir_path: str) -> None:
+        """
+        记录新发现的待遍历目录
+
+        :param dir_path: 目录路径
+        """
+        self.__new_dirs.append(dir_path)
+
+    def finish(self, dir_path: str) -> None:
+        """
+        记录已完成的目录
+
+        :param dir_path: 目录路径
+        """
+        self.__done_dirs.append(dir_path)
+
+    def save(self, run_id: int | None, counters: dict) -> None:
+        """
+        将自上次保存以来的变化写入数据库
+
+        :param run_id: 输出清单运行标识
+        :param counters: 统计信息
+        """
+        self.__conn.executemany(
+            "INSERT OR IGNORE INTO checkpoint_dir (key, path, done) VALUES (?, ?, 0)",
+            ((self.key, path) for path in self.__new_dirs),
+        )
+        self.__conn.executemany(
+            "INSERT OR REPLACE INTO checkpoint_dir (key, path, done) VALUES (?, ?, 1)",
+            ((self.key, path) for path in self.__done_dirs),
+        )
+        self.__conn.execute(
+            "INSERT OR REPLACE INTO checkpoint (key, config_hash, run_id, counters, "
+            "updated_at) VALUES (?, ?, ?, ?, ?)",
+            (self.key, self.config_hash, run_id, dumps(counters), time()),
+        )
+        self.__conn.commit()
+        self.__new_dirs.clear()
+        self.__done_dirs.clear()
+
+    def clear(self) -> None:
+        """
+        删除检查点（运行正常完成或配置变化时）
+        """
+        self.__conn.execute("DELETE FROM checkpoint WHERE key = ?", (self.key,))
+        self.__conn.execute("DELETE FROM checkpoint_dir WHERE key = ?", (self.key,))
+        self.__conn.commit()
+        self.__new_dirs.clear()
+        self.__done_dirs.clear()
+
+    def close(self) -> None:
+        """
+        释放数据库连接
+        """
+        SQLiteUtils.close(self.__conn)
@@ -0,0 +1,184 @@
+from os import getpid
+from pathlib import Path
+from secrets import token_hex
+from socket import gethostname
+from sqlite3 import connect
+from threading import Lock
+from time import time
+
+
+class Alist2StrmLeases:
+    """
+    Alist2Strm 工作单元租约
+    多个 AutoFilm 实例共享同一个 SQLite 数据库（位于共享存储上），将同一任务划分为多个工作单元，
+    每个工作单元同一时间只由一个实例处理；实例退出或失联时租约过期，其它实例可以接管
+
+    一轮运行包含任务的全部工作单元，所有工作单元完成后该轮结束，下一次运行时开始新的一轮
+
+    注意：SQLite 依赖文件锁，共享存储需要支持文件锁（如 NFSv4、SMB）
+    等待其它实例释放写锁时会阻塞调用线程，在事件循环中需通过 to_thread 调用各方法
+    """
+
+    def __init__(
+        self, db_path: Path, task: str, ttl: float = 300, owner: str | None = None
+    ) -> None:
+        """
+        :param db_path: SQLite 数据库文件路径
+        :param task: 任务标识
+        :param ttl: 租约有效时间，单位为秒，持有者需要在过期前续约
+        :param owner: 实例标识，默认为 "主机名-进程号-随机数"
+        """
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.task = task
+        self.ttl = ttl
+        self.owner = owner or f"{gethostname()}-{getpid()}-{token_hex(4)}"
+        self.round_id: int | None = None
+        # 自动提交模式，事务由 BEGIN IMMEDIATE 显式开始，避免多个实例同时升级写锁时死锁
+        # 各方法在线程池中执行，同一连接的访问由 __lock 串行化
+        self.__conn = connect(
+            db_path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self.__lock = Lock()
+        self.__conn.execute(
+            "CREATE TABLE IF NOT EXISTS lease_round ("
+            "task TEXT NOT NULL, round_id INTEGER NOT NULL, started_at REAL NOT NULL, "
+            "finished_at REAL, PRIMARY KEY (task, round_id))"
+        )
+        self.__conn.execute(
+            "CREATE TABLE IF NOT EXISTS lease_unit ("
+            "task TEXT NOT NULL, round_id INTEGER NOT NULL, unit TEXT NOT NULL, "
+            "owner TEXT, expires REAL NOT NULL, done INTEGER NOT NULL, "
+            "PRIMARY KEY (task, round_id, unit))"
+        )
+
+    def join_round(self, units: list[str], min_interval: float = 0) -> int | None:
+        """
+        加入进行中的一轮运行，没有进行中的运行时使用 units 开始新的一轮
+
+        :param units: 工作单元列表，只在开始新的一轮时使用
+        :param min_interval: 上一轮结束后不足该时间（单位为秒）时不开始新的一轮
+        :return: 运行轮次标识，上一轮刚结束时返回 None
+        """
+        with self.__lock:
+            now = time()
+            self.__conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.__conn.execute(
+                    "SELECT round_id, finished_at FROM lease_round WHERE task = ? "
+                    "ORDER BY round_id DESC LIMIT 1",
+                    (self.task,),
+                ).fetchone()
+                if row is not None and row[1] is None:
+                    self.round_id = row[0]
+                elif row is not None and now - row[1] < min_interval:
+                    self.round_id = None
+                else:
+                    self.round_id = (row[0] + 1) if row else 1
+                    self.__conn.execute(
+                        "INSERT INTO lease_round (task, round_id, started_at) VALUES (?, ?, ?)",
+                        (self.task, self.round_id, now),
+                    )
+                    self.__conn.executemany(
+                        "INSERT OR IGNORE INTO lease_unit (task, round_id, unit, owner, "
+                        "expires, done) VALUES (?, ?, ?, NULL, 0, 0)",
+                        ((self.task, self.round_id, unit) for unit in units),
+                    )
+                    # 只保留最近一轮的工作单元
+                    self.__conn.execute(
+                        "DELETE FROM lease_unit WHERE task = ? AND round_id < ?",
+                        (self.task, self.round_id),
+                    )
+                self.__conn.execute("COMMIT")
+            except BaseException:
+                self.__conn.execute("ROLLBACK")
+                raise
+            return self.round_id
+
+    def acquire(self) -> str | None:
+        """
+        获取一个未完成且未被持有（或租约已过期）的工作单元
+
+        :return: 工作单元，没有可获取的工作单元时返回 None
+        """
+        with self.__lock:
+            now = time()
+            self.__conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.__conn.execute(
+                    "SELECT unit, owner FROM lease_unit WHERE task = ? AND round_id = ? "
+                    "AND done = 0 AND (owner IS NULL OR expires < ?) ORDER BY unit LIMIT 1",
+                    (self.task, self.round_id, now),
+                ).fetchone()
+                if row is not None:
+                    self.__conn.execute(
+                        "UPDATE lease_unit SET owner = ?, expires = ? "
+                        "WHERE task = ? AND round_id = ? AND unit = ?",
+                        (self.owner, now + self.ttl, self.task, self.round_id, row[0]),
+                    )
+                self.__conn.execute("COMMIT")
+            except BaseException:
+                self.__conn.execute("ROLLBACK")
+                raise
+            return row[0] if row else None
+
+    def renew(self, unit: str) -> bool:
+        """
+        续约工作单元
+
+        :param unit: 工作单元
+        :return: 是否续约成功，租约已被其它实例接管时返回 False
+        """
+        with self.__lock:
+            cursor = self.__conn.execute(
+                "UPDATE lease_unit SET expires = ? WHERE task = ? AND round_id = ? "
+                "AND unit = ? AND owner = ? AND done = 0",
+                (time() + self.ttl, self.task, self.round_id, unit, self.owner),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, unit: str) -> bool:
+        """
+        标记工作单元已完成，全部工作单元完成时结束本轮运行
+
+        :param unit: 工作单元
+        :return: 是否标记成功，租约已被其它实例接管时返回 False
+        """
+        with self.__lock:
+            self.__conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self.__conn.execute(
+                    "UPDATE lease_unit SET done = 1 WHERE task = ? AND round_id = ? "
+                    "AND unit = ? AND owner = ?",
+                    (self.task, self.round_id, unit, self.owner),
+                )
+                self.__conn.execute(
+                    "UPDATE lease_round SET finished_at = ? WHERE task = ? AND round_id = ? "
+                    "AND NOT EXISTS (SELECT 1 FROM lease_unit WHERE task = ? AND "
+                    "round_id = ? AND done = 0)",
+                    (time(), self.task, self.round_id, self.task, self.round_id),
+                )
+                self.__conn.execute("COMMIT")
+            except BaseException:
+                self.__conn.execute("ROLLBACK")
+                raise
+            return cursor.rowcount == 1
+
+    def release(self, unit: str) -> None:
+        """
+        释放未完成的工作单元（处理失败时），其它实例可以立即获取
+
+        :param unit: 工作单元
+        """
+        with self.__lock:
+            self.__conn.execute(
+                "UPDATE lease_unit SET owner = NULL, expires = 0 WHERE task = ? AND "
+                "round_id = ? AND unit = ? AND owner = ? AND done = 0",
+                (self.task, self.round_id, unit, self.owner),
+            )
+
+    def close(self) -> None:
+        """
+        关闭数据库连接
+        """
+        with self.__lock:
+            self.__conn.close()
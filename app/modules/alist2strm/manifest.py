@@ -0,0 +1,235 @@
+from json import dumps, loads
+from os import fdopen, unlink
+from pathlib import Path
+from tempfile import mkstemp
+from time import time_ns
+from weakref import finalize
+
+from app.utils import SQLiteUtils
+
+
+class Alist2StrmManifest:
+    """
+    Alist2Strm 输出清单
+    使用 SQLite 持久化记录每个已生成的本地文件及其对应的云盘文件信息，
+    跳过判断与同步删除通过查询清单完成，不再逐个检查本地文件
+
+    注意：本地文件被手动删除或修改后清单不会感知，需要使用 overwrite 或全量扫描重新生成
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        target_dir: Path,
+        commit_interval: int = 500,
+        run_id: int | None = None,
+        deferred: bool = False,
+    ) -> None:
+        """
+        :param db_path: SQLite 数据库文件路径
+        :param target_dir: strm 文件输出目录，清单中的本地路径相对该目录保存
+        :param commit_interval: 每写入多少条记录提交一次事务
+        :param run_id: 运行标识，续传中断的运行时沿用上次的标识，默认为当前时间
+        :param deferred: 只读取数据库，修改逐行记录在临时文件中，由其它进程通过 export_changes 与 apply 写入（多进程分片执行时使用）
+        """
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.target = str(target_dir.absolute())
+        self.run_id = run_id or time_ns()  # 本次运行标识，用于找出本次未出现的文件
+        self.__commit_interval = commit_interval
+        self.deferred = deferred
+        # deferred 模式下未写入的修改，写入临时文件而不是保存在内存中
+        self.__changes = None
+        self.__changes_path = ""
+        self.__changes_cleanup = None
+        if deferred:
+            fd, self.__changes_path = mkstemp(
+                prefix="autofilm_manifest_", suffix=".jsonl"
+            )
+            self.__changes = fdopen(fd, "w", encoding="utf-8")
+            self.__changes_cleanup = finalize(self, unlink, self.__changes_path)
+        self.__pending = 0
+        # 多个输出目录或同时进行的多次运行共用同一连接，避免互相等待写锁
+        self.__conn = SQLiteUtils.connect(db_path)
+        self.__conn.execute(
+            "CREATE TABLE IF NOT EXISTS manifest ("
+            "target TEXT NOT NULL, local_path TEXT NOT NULL, remote_path TEXT NOT NULL, "
+            "modified TEXT NOT NULL, size INTEGER NOT NULL, content_hash TEXT, "
+            "seen INTEGER NOT NULL, PRIMARY KEY (target, local_path))"
+        )
+        self.__conn.execute(
+            "CREATE INDEX IF NOT EXISTS manifest_remote ON manifest (target, remote_path)"
+        )
+        self.__conn.commit()
+
+    def __changed(self) -> None:
+        """
+        累计未提交的修改，达到 commit_interval 时提交
+        """
+        self.__pending += 1
+        if self.__pending >= self.__commit_interval:
+            self.commit()
+
+    def __record(self, method: str, *args) -> None:
+        """
+        deferred 模式下记录一条修改
+        """
+        self.__changes.write(dumps([method, args]) + "\n")
+
+    def is_empty(self) -> bool:
+        """
+        输出目录在清单中是否没有任何记录
+        """
+        return (
+            self.__conn.execute(
+                "SELECT 1 FROM manifest WHERE target = ? LIMIT 1", (self.target,)
+            ).fetchone()
+            is None
+        )
+
+    def get(self, local_path: str) -> tuple[str, str, int, str | None] | None:
+        """
+        获取本地文件的记录
+
+        :param local_path: 相对输出目录的本地路径
+        :return: (云盘路径, 修改时间, 文件大小, 内容哈希)，不存在时返回 None
+        """
+        return self.__conn.execute(
+            "SELECT remote_path, modified, size, content_hash FROM manifest "
+            "WHERE target = ? AND local_path = ?",
+            (self.target, local_path),
+        ).fetchone()
+
+    def set(
+        self,
+        local_path: str,
+        remote_path: str,
+        modified: str,
+        size: int,
+        content_hash: str | None = None,
+    ) -> None:
+        """
+        写入本地文件的记录，并标记为本次运行已出现
+
+        :param local_path: 相对输出目录的本地路径
+        :param remote_path: 云盘文件路径
+        :param modified: 云盘文件修改时间
+        :param size: 云盘文件大小
+        :param content_hash: strm 文件内容哈希，下载的文件为 None
+        """
+        if self.deferred:
+            self.__record("set", local_path, remote_path, modified, size, content_hash)
+            return
+        self.__conn.execute(
+            "INSERT OR REPLACE INTO manifest (target, local_path, remote_path, "
+            "modified, size, content_hash, seen) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                self.target,
+                local_path,
+                remote_path,
+                modified,
+                size,
+                content_hash,
+                self.run_id,
+            ),
+        )
+        self.__changed()
+
+    def touch(self, local_path: str) -> None:
+        """
+        标记本地文件为本次运行已出现
+
+        :param local_path: 相对输出目录的本地路径
+        """
+        if self.deferred:
+            self.__record("touch", local_path)
+            return
+        self.__conn.execute(
+            "UPDATE manifest SET seen = ? WHERE target = ? AND local_path = ?",
+            (self.run_id, self.target, local_path),
+        )
+        self.__changed()
+
+    def delete(self, local_path: str) -> None:
+        """
+        删除本地文件的记录
+
+        :param local_path: 相对输出目录的本地路径
+        """
+        if self.deferred:
+            self.__record("delete", local_path)
+            return
+        self.__conn.execute(
+            "DELETE FROM manifest WHERE target = ? AND local_path = ?",
+            (self.target, local_path),
+        )
+        self.__changed()
+
+    def export_changes(self) -> str:
+        """
+        将 deferred 模式记录的修改交给其它清单（如多进程分片时子进程交给主进程），
+        交出的文件不再由本清单删除，由接收方的 apply 读取后删除
+
+        :return: 修改记录文件路径
+        """
+        self.__changes.close()
+        self.__changes_cleanup.detach()
+        return self.__changes_path
+
+    def apply(self, changes_path: str) -> None:
+        """
+        写入其它 deferred 模式的清单交出的修改，已出现的记录标记为本次运行
+        逐行读取修改记录文件，按 commit_interval 分批提交，完成后删除该文件
+
+        :param changes_path: export_changes 返回的修改记录文件路径
+        """
+        methods = {"set": self.set, "touch": self.touch, "delete": self.delete}
+        try:
+            with open(changes_path, encoding="utf-8") as file:
+                for line in file:
+                    method, args = loads(line)
+                    methods[method](*args)
+        finally:
+            unlink(changes_path)
+
+    def get_unseen(self, source_dir: str) -> list[str]:
+        """
+        获取云盘路径位于 source_dir 下、本次运行未出现的本地文件
+
+        :param source_dir: 本次遍历的云盘目录
+        :return: 相对输出目录的本地路径列表
+        """
+        self.commit()
+        source_dir = source_dir.rstrip("/")
+        # 运行标识递增，同时进行的后续运行（如变更推送）记录的文件不视为本次运行未出现
+        # "0" 是 "/" 的下一个字符，[dir/, dir0) 即 dir 下的所有路径，可以使用索引
+        rows = self.__conn.execute(
+            "SELECT local_path FROM manifest WHERE target = ? AND seen < ? AND "
+            "(remote_path = ? OR (remote_path >= ? AND remote_path < ?))",
+            (
+                self.target,
+                self.run_id,
+                source_dir,
+                source_dir + "/",
+                source_dir + "0",
+            ),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def commit(self) -> None:
+        """
+        提交未保存的修改
+        """
+        if self.deferred:
+            return
+        self.__conn.commit()
+        self.__pending = 0
+
+    def close(self) -> None:
+        """
+        提交修改并释放数据库连接，deferred 模式下删除未交出的修改记录文件
+        """
+        if self.__changes_cleanup and self.__changes_cleanup.alive:
+            self.__changes.close()
+            self.__changes_cleanup()
+        self.commit()
+        SQLiteUtils.close(self.__conn)
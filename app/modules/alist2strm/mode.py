@@ -7,6 +7,7 @@ class Alist2StrmMode(Enum):
     AlistURL = "AlistURL"
     RawURL = "RawURL"
     AlistPath = "AlistPath"
+    PlayURL = "PlayURL"  # 指向 AutoFilm 播放接口，播放时再解析 raw_url
 
     @classmethod
     def from_str(cls, mode_str: str) -> "Alist2StrmMode":
@@ -17,4 +18,7 @@ class Alist2StrmMode(Enum):
         :return: Alist2StrmMode 枚举值
         例如，"alisturl" 将返回 Alist2StrmMode.AlistURL
         """
-        return cls[mode_str.upper()] if mode_str.upper() in cls.__members__ else cls.AlistURL
\ No newline at end of file
+        for mode in cls:
+            if mode.value.upper() == mode_str.upper():
+                return mode
+        return cls.AlistURL
\ No newline at end of file
@@ -0,0 +1,113 @@
+from asyncio import Future, get_running_loop
+from concurrent.futures import ThreadPoolExecutor
+from os import makedirs
+from pathlib import Path
+
+from app.utils import FileUtils
+
+
+class StrmWriter:
+    """
+    strm 文件写入器
+    使用独立的线程池写入小文件，同一目录中同时提交的文件合并为一个线程任务，
+    目录的创建与文件写入在同一个线程任务中完成，且每个目录每次运行只创建一次
+    """
+
+    def __init__(self, max_workers: int = 4, batch_size: int = 64) -> None:
+        """
+        :param max_workers: 写入线程数
+        :param batch_size: 单个线程任务最多写入的文件数
+        """
+        self.batch_size = max(1, batch_size)
+        self.__executor = ThreadPoolExecutor(
+            max_workers=max(1, max_workers), thread_name_prefix="StrmWriter"
+        )
+        self.__created_dirs: set[str] = set()  # 本次运行已创建（或已确认存在）的目录
+        self.__batches: dict[str, list[tuple[str, str, Future[bool]]]] = {}
+
+    async def write(self, path: Path, content: str) -> bool:
+        """
+        内容与现有文件不同时写入文件
+
+        :param path: 文件路径
+        :param content: 文件内容
+        :return: 是否写入了文件，内容相同时返回 False
+        """
+        loop = get_running_loop()
+        future: Future[bool] = loop.create_future()
+        dir_path = str(path.parent)
+        batch = self.__batches.get(dir_path)
+        if batch is None:
+            # 在当前事件循环迭代中提交到同一目录的文件合并为一批
+            batch = self.__batches[dir_path] = []
+            loop.call_soon(self.__flush, dir_path)
+        batch.append((str(path), content, future))
+        if len(batch) >= self.batch_size:
+            self.__flush(dir_path)
+        return await future
+
+    def __flush(self, dir_path: str) -> None:
+        """
+        将目录中待写入的文件提交至线程池
+
+        :param dir_path: 目录路径
+        """
+        batch = self.__batches.pop(dir_path, None)
+        if not batch:
+            return
+
+        loop = get_running_loop()
+        task = loop.run_in_executor(
+            self.__executor,
+            self.__write_batch,
+            dir_path,
+            [(path, content) for path, content, _ in batch],
+        )
+
+        def set_results(task: Future[list[bool | Exception]]) -> None:
+            # 已取消的 Future 调用 exception() 会抛出 CancelledError，需要先判断是否已取消
+            error = RuntimeError("写入任务已取消") if task.cancelled() else task.exception()
+            if error is not None:
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                return
+            for (*_, future), result in zip(batch, task.result()):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+        task.add_done_callback(set_results)
+
+    def __write_batch(
+        self, dir_path: str, files: list[tuple[str, str]]
+    ) -> list[bool | Exception]:
+        """
+        在线程池中创建目录并写入一批文件
+
+        :param dir_path: 目录路径
+        :param files: [(文件路径, 文件内容)]
+        :return: 每个文件的写入结果或异常
+        """
+        if dir_path not in self.__created_dirs:
+            makedirs(dir_path, exist_ok=True)
+            self.__created_dirs.add(dir_path)
+
+        results: list[bool | Exception] = []
+        for path, content in files:
+            try:
+                results.append(
+                    FileUtils.write_if_changed(path, content, make_dirs=False)
+                )
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def close(self) -> None:
+        """
+        等待写入完成并关闭线程池
+        """
+        self.__executor.shutdown(wait=True)
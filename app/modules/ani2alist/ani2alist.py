@@ -85,6 +85,8 @@ class Ani2Alist:
                 "message": error_msg
             }
 
+        await self.client.ensure_initialized()
+
         storage = await self.client.get_storage_by_mount_path(
             mount_path=self.__target_dir,
             create=True,
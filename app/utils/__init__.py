@@ -1,20 +1,31 @@
 from app.utils.http import RequestUtils, HTTPClient
 from app.utils.alist import AlistUtils
 from app.utils.retry import Retry
+from app.utils.ratelimit import RateLimiter, TokenBucket
 from app.utils.url import URLUtils
 from app.utils.singleton import Singleton
 from app.utils.multiton import Multiton
 from app.utils.strings import StringsUtils
 from app.utils.photo import PhotoUtils
+from app.utils.file import FileUtils
+from app.utils.pathset import SortedPathSet
+from app.utils.matcher import PathMatcher
+from app.utils.sqlite import SQLiteUtils
 
 __all__ = [
     RequestUtils,
     HTTPClient,
     AlistUtils,
     Retry,
+    RateLimiter,
+    TokenBucket,
     URLUtils,
     Singleton,
     Multiton,
     StringsUtils,
     PhotoUtils,
+    FileUtils,
+    SortedPathSet,
+    PathMatcher,
+    SQLiteUtils,
 ]
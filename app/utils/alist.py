@@ -11,20 +11,22 @@ class AlistUtils(metaclass=Singleton):
     """
 
     @staticmethod
-    def sign(secret_key: str, data: str) -> str:
+    def sign(secret_key: str, data: str, expire: int = 0) -> str:
         """
-        计算 Alist 签名
+        计算 Alist 签名，与 Alist 服务端（pkg/sign/hmac.go）算法一致
         :param secret_key: Alist 签名 Token
         :param data: Alist 文件绝对路径（未编码）
+        :param expire: 签名过期时间戳，为 0 时不过期
+        :return: 签名（"?sign=" 之后的部分），secret_key 为空时返回空字符串
         """
 
         if not secret_key:
             return ""
         else:
             h = hmac_new(secret_key.encode(), digestmod=hashlib_sha256)
-            expire_time_stamp = str(0)
+            expire_time_stamp = str(expire)
             h.update((data + ":" + expire_time_stamp).encode())
-            return f"?sign={urlsafe_b64encode(h.digest()).decode()}:0"
+            return f"{urlsafe_b64encode(h.digest()).decode()}:{expire_time_stamp}"
 
     @staticmethod
     def structure2dict(text: str) -> dict:
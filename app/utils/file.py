@@ -0,0 +1,222 @@
+import os
+from os import (
+    O_CREAT,
+    O_EXCL,
+    O_WRONLY,
+    PathLike,
+    chmod,
+    fdopen,
+    fspath,
+    fstat,
+    makedirs,
+    open as os_open,
+    replace,
+    rmdir,
+    scandir,
+    sep,
+    unlink,
+)
+from os.path import basename, dirname, join
+from secrets import token_hex
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from collections.abc import Iterable, Iterator
+
+# Windows 下需以二进制模式打开文件描述符，避免写入时转换换行符
+_O_BINARY = getattr(os, "O_BINARY", 0)
+
+
+class FileUtils:
+    """
+    本地文件相关工具
+    """
+
+    @staticmethod
+    def __scan_dir(dir_path: str) -> tuple[list[str], list[str]]:
+        """
+        列出目录中的文件和子目录，使用 DirEntry 自带的类型信息，不额外调用 stat
+
+        :param dir_path: 目录路径
+        :return: (文件路径列表, 子目录路径列表)
+        """
+        # 与 Path 拼接路径的结果保持一致，便于与 Path 对象比较
+        prefix = "" if dir_path == "." else dir_path.rstrip(sep) + sep
+        files: list[str] = []
+        dirs: list[str] = []
+        try:
+            with scandir(dir_path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        dirs.append(prefix + entry.name)
+                    elif entry.is_file():
+                        files.append(prefix + entry.name)
+        except FileNotFoundError:
+            pass
+        return files, dirs
+
+    @classmethod
+    def iter_files(
+        cls, root: str | PathLike, recursive: bool = True, max_workers: int = 8
+    ) -> Iterator[list[str]]:
+        """
+        并发遍历目录，逐个目录返回其中的文件（不进入符号链接指向的目录）
+        调用方可以边遍历边处理，不需要将全部文件路径保存在内存中
+
+        :param root: 根目录
+        :param recursive: 是否遍历子目录
+        :param max_workers: 同时遍历的目录数
+        :return: 文件路径列表的迭代器，每个列表对应一个目录
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = {executor.submit(cls.__scan_dir, fspath(root))}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    sub_files, sub_dirs = future.result()
+                    if recursive:
+                        pending.update(
+                            executor.submit(cls.__scan_dir, sub_dir)
+                            for sub_dir in sub_dirs
+                        )
+                    yield sub_files
+
+    @classmethod
+    def scan_files(
+        cls, root: str | PathLike, recursive: bool = True, max_workers: int = 8
+    ) -> list[str]:
+        """
+        并发遍历目录，获取其中的所有文件（不进入符号链接指向的目录）
+
+        :param root: 根目录
+        :param recursive: 是否遍历子目录
+        :param max_workers: 同时遍历的目录数
+        :return: 文件路径列表
+        """
+        return [
+            file
+            for files in cls.iter_files(root, recursive, max_workers)
+            for file in files
+        ]
+
+    @staticmethod
+    def __unlink_batch(paths: list[str]) -> tuple[list[str], list[tuple[str, OSError]]]:
+        """
+        依次删除一批文件
+
+        :param paths: 文件路径列表
+        :return: (已删除（或本就不存在）的文件路径列表, [(删除失败的文件路径, 异常)])
+        """
+        deleted: list[str] = []
+        failed: list[tuple[str, OSError]] = []
+        for path in paths:
+            try:
+                unlink(path)
+                deleted.append(path)
+            except FileNotFoundError:
+                deleted.append(path)
+            except OSError as e:
+                failed.append((path, e))
+        return deleted, failed
+
+    @classmethod
+    def delete_files(
+        cls, paths: list[str], max_workers: int = 8, batch_size: int = 256
+    ) -> tuple[list[str], list[tuple[str, OSError]]]:
+        """
+        使用线程池分批删除文件
+
+        :param paths: 文件路径列表
+        :param max_workers: 删除线程数
+        :param batch_size: 每个线程任务删除的文件数
+        :return: (已删除（或本就不存在）的文件路径列表, [(删除失败的文件路径, 异常)])
+        """
+        deleted: list[str] = []
+        failed: list[tuple[str, OSError]] = []
+        batches = (paths[i : i + batch_size] for i in range(0, len(paths), batch_size))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for batch_deleted, batch_failed in executor.map(cls.__unlink_batch, batches):
+                deleted.extend(batch_deleted)
+                failed.extend(batch_failed)
+        return deleted, failed
+
+    @staticmethod
+    def prune_empty_dirs(
+        deleted_files: Iterable[str], root: str | PathLike
+    ) -> list[str]:
+        """
+        自底向上删除已删除文件所在的空目录，直至根目录（不含）
+
+        :param deleted_files: 已删除的文件路径
+        :param root: 根目录
+        :return: 已删除的目录路径列表
+        """
+        root = fspath(root)
+        root = "" if root == "." else root.rstrip(sep)
+        dirs: set[str] = set()
+        for file in deleted_files:
+            parent = dirname(file)
+            while len(parent) > len(root) and parent not in dirs:
+                dirs.add(parent)
+                parent = dirname(parent)
+
+        removed: list[str] = []
+        # 按深度倒序，子目录先于父目录删除；非空目录删除失败，其上级目录也必然非空
+        for dir_path in sorted(dirs, key=lambda path: path.count(sep), reverse=True):
+            try:
+                rmdir(dir_path)
+                removed.append(dir_path)
+            except OSError:
+                pass
+        return removed
+
+    @staticmethod
+    def write_if_changed(
+        path: str | PathLike,
+        content: str,
+        encoding: str = "utf-8",
+        make_dirs: bool = True,
+    ) -> bool:
+        """
+        内容与现有文件不同时写入文件
+        先写入同目录下的临时文件再重命名，写入过程中文件不会处于不完整状态
+
+        :param path: 文件路径
+        :param content: 文件内容
+        :param encoding: 文件编码
+        :param make_dirs: 文件不存在时是否创建上级目录，调用方已确认目录存在时可设为 False
+        :return: 是否写入了文件，内容相同时返回 False
+        """
+        path = fspath(path)
+        data = content.encode(encoding)
+        # 已有文件的权限，替换后保留；新文件与直接创建文件相同，由系统按 umask 决定
+        mode = None
+        try:
+            with open(path, "rb") as file:
+                if file.read(len(data) + 1) == data:
+                    return False
+                mode = fstat(file.fileno()).st_mode & 0o7777
+        except FileNotFoundError:
+            if make_dirs:
+                makedirs(dirname(path) or ".", exist_ok=True)
+
+        while True:
+            temp_path = join(
+                dirname(path), f".{basename(path)}.{token_hex(4)}.tmp"
+            )
+            try:
+                fd = os_open(temp_path, O_CREAT | O_EXCL | O_WRONLY | _O_BINARY, 0o666)
+                break
+            except FileExistsError:
+                continue
+        try:
+            with fdopen(fd, "wb") as file:
+                file.write(data)
+            if mode is not None:
+                chmod(temp_path, mode)
+            replace(temp_path, path)
+        except BaseException:
+            try:
+                unlink(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        return True
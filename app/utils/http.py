@@ -13,6 +13,7 @@ from aiofile import async_open
 from app.core import settings, logger
 from app.utils.url import URLUtils
 from app.utils.retry import Retry
+from app.utils.ratelimit import RateLimiter
 
 
 class HTTPClient:
@@ -28,11 +29,14 @@ class HTTPClient:
         "Accept": "application/json",
     }
 
-    def __init__(self):
+    def __init__(self, rate_limiter: RateLimiter | None = None):
         """
         初始化 HTTP 客户端
+
+        :param rate_limiter: 请求速率限制器，默认不限速
         """
 
+        self.rate_limiter = rate_limiter
         self.__new_async_client()
         self.__new_sync_client()
 
@@ -63,10 +67,15 @@ class HTTPClient:
             await self.__async_client.aclose()
 
     @Retry.sync_retry(TimeoutException, tries=3, delay=1, backoff=2)
-    def _sync_request(self, method: str, url: str, **kwargs) -> Response | None:
+    def _sync_request(
+        self, method: str, url: str, rate_key: str = "", **kwargs
+    ) -> Response | None:
         """
         发起同步 HTTP 请求
         """
+        rate_limiter = RateLimiter.current() or self.rate_limiter
+        if rate_limiter:
+            rate_limiter.acquire_sync(url, rate_key)
         try:
             return self.__sync_client.request(method, url, **kwargs)
         except TimeoutException as e:
@@ -75,10 +84,15 @@ class HTTPClient:
             raise TimeoutException(f"HTTP 请求超时：{e}")
 
     @Retry.async_retry(TimeoutException, tries=3, delay=1, backoff=2)
-    async def _async_request(self, method: str, url: str, **kwargs) -> Response | None:
+    async def _async_request(
+        self, method: str, url: str, rate_key: str = "", **kwargs
+    ) -> Response | None:
         """
         发起异步 HTTP 请求
         """
+        rate_limiter = RateLimiter.current() or self.rate_limiter
+        if rate_limiter:
+            await rate_limiter.acquire(url, rate_key)
         try:
             return await self.__async_client.request(method, url, **kwargs)
         except TimeoutException as e:
@@ -110,7 +124,8 @@ class HTTPClient:
         :param method: HTTP 方法，如 get, post, put 等
         :param url: 请求的 URL
         :param sync: 是否使用同步请求方式，默认为 False
-        :param kwargs: 其他请求参数，如 headers, cookies 等
+        :param kwargs: 其他请求参数，如 headers, cookies 等；
+                       rate_key 为限速时用于匹配覆盖规则的路径
         :return: HTTP 响应对象
         """
         headers = kwargs.get("headers", self.HEADERS)
@@ -363,6 +378,28 @@ class RequestUtils:
         cls.__client_list.add(client)
         return client
 
+    @classmethod
+    def set_rate_limit(
+        cls,
+        url: str,
+        rate: float,
+        burst: int = 1,
+        overrides: dict[str, dict[str, Any]] | None = None,
+    ) -> HTTPClient:
+        """
+        为指定主机的 HTTP 客户端设置请求速率限制
+        仅实际发出的 HTTP 请求（包括重试）会消耗令牌；当前上下文启用了限速器时（见 RateLimiter.activate）优先使用后者
+
+        :param url: 主机的任意 URL
+        :param rate: 每秒请求数，小于等于 0 时不限速
+        :param burst: 允许的突发请求数
+        :param overrides: 路径前缀 -> {"rate": 每秒请求数, "burst": 突发请求数}
+        :return: 该主机的 HTTP 客户端
+        """
+        client = cls.get_client(url)
+        client.rate_limiter = RateLimiter(rate, burst, overrides)
+        return client
+
     @overload
     @classmethod
     def request(
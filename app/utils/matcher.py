@@ -0,0 +1,157 @@
+from re import compile as re_compile, escape, Pattern
+
+
+class PathMatcher:
+    """
+    路径匹配器
+    将 include/exclude 规则一次性编译为名称集合、路径前缀树和一个合并的正则表达式
+
+    规则格式：
+    - "re:" 开头：正则表达式，在完整路径中搜索
+    - "/" 开头：绝对路径，匹配该路径及其下的所有内容，如 "/电影/预告片"
+    - 其它：匹配路径中任意一级（或连续多级）名称，如 "@eaDir"、"*.iso"、"BDMV/CLIPINF"
+    通配符：* 匹配单级名称中的任意字符，** 匹配任意多级，? 匹配单个字符，[...] 匹配字符集合
+
+    排除规则匹配的目录不会被遍历；包含规则只有绝对路径时，不在其路径上的目录不会被遍历，
+    否则包含规则只对文件生效
+    """
+
+    WILDCARDS = frozenset("*?[")
+
+    def __init__(
+        self, include: list[str] | None = None, exclude: list[str] | None = None
+    ) -> None:
+        """
+        :param include: 包含规则列表，为空时包含全部
+        :param exclude: 排除规则列表
+        """
+        self.__include = self.__compile(include or [])
+        self.__exclude = self.__compile(exclude or [])
+        self.__has_include = bool(include)
+        # 包含规则全部为不含通配符的绝对路径时，可以在遍历目录时剪枝
+        names, trie, regex = self.__include
+        self.__prune_include = self.__has_include and not names and regex is None
+
+    @staticmethod
+    def __glob_to_regex(pattern: str) -> str:
+        """
+        将通配符规则转换为正则表达式
+        """
+        i, parts = 0, []
+        while i < len(pattern):
+            char = pattern[i]
+            if char == "*":
+                if pattern[i + 1 : i + 2] == "*":
+                    parts.append(".*")
+                    i += 1
+                else:
+                    parts.append("[^/]*")
+            elif char == "?":
+                parts.append("[^/]")
+            elif char == "[" and (end := pattern.find("]", i + 1)) != -1:
+                chars = pattern[i + 1 : end].replace("\\", "\\\\")
+                if chars.startswith("!"):
+                    chars = "^" + chars[1:]
+                parts.append(f"[{chars}]")
+                i = end
+            else:
+                parts.append(escape(char))
+            i += 1
+        return "".join(parts)
+
+    @classmethod
+    def __compile(
+        cls, rules: list[str]
+    ) -> tuple[frozenset[str], dict, Pattern | None]:
+        """
+        编译规则
+
+        :param rules: 规则列表
+        :return: (名称集合, 绝对路径前缀树, 合并的正则表达式)
+        """
+        names: set[str] = set()
+        trie: dict = {}
+        regexes: list[str] = []
+        for rule in rules:
+            if rule.startswith("re:"):
+                regexes.append(rule[3:])
+            elif cls.WILDCARDS.isdisjoint(rule):
+                if rule.startswith("/"):
+                    node = trie
+                    for part in rule.strip("/").split("/"):
+                        node = node.setdefault(part, {})
+                    node[None] = True  # 终止标记
+                elif "/" not in rule.strip("/"):
+                    names.add(rule.strip("/"))
+                else:
+                    regexes.append(f"(?:^|/){escape(rule.strip('/'))}(?:/|$)")
+            elif rule.startswith("/"):
+                regexes.append(f"^{cls.__glob_to_regex(rule.rstrip('/'))}(?:/|$)")
+            else:
+                regexes.append(f"(?:^|/){cls.__glob_to_regex(rule.strip('/'))}(?:/|$)")
+
+        regex = (
+            re_compile("|".join(f"(?:{regex})" for regex in regexes))
+            if regexes
+            else None
+        )
+        return frozenset(names), trie, regex
+
+    @staticmethod
+    def __match(
+        path: str,
+        parts: list[str],
+        rules: tuple[frozenset[str], dict, Pattern | None],
+    ) -> bool:
+        """
+        判断路径（或其任意上级目录）是否匹配规则
+        """
+        names, trie, regex = rules
+        if names and not names.isdisjoint(parts):
+            return True
+        if trie:
+            node = trie
+            for part in parts:
+                node = node.get(part)
+                if node is None:
+                    break
+                if None in node:
+                    return True
+        return regex is not None and regex.search(path) is not None
+
+    def __on_include_path(self, parts: list[str]) -> bool:
+        """
+        判断目录是否位于包含规则的路径上（是包含路径的上级目录或位于包含路径中）
+        """
+        node = self.__include[1]
+        for part in parts:
+            node = node.get(part)
+            if node is None:
+                return False
+            if None in node:
+                return True
+        return True
+
+    def match_dir(self, path: str) -> bool:
+        """
+        判断是否需要遍历目录
+
+        :param path: 目录路径
+        """
+        parts = path.strip("/").split("/")
+        if self.__match(path, parts, self.__exclude):
+            return False
+        if self.__prune_include:
+            return self.__on_include_path(parts)
+        return True
+
+    def match_file(self, path: str) -> bool:
+        """
+        判断是否需要处理文件
+
+        :param path: 文件路径
+        """
+        parts = path.strip("/").split("/")
+        if self.__match(path, parts, self.__exclude):
+            return False
+        return not self.__has_include or self.__match(path, parts, self.__include)
@@ -0,0 +1,190 @@
+from collections.abc import Iterable, Iterator
+from heapq import merge
+from os import PathLike, fspath, makedirs, sep
+from shutil import rmtree
+from tempfile import NamedTemporaryFile, mkdtemp
+from weakref import finalize
+
+
+class SortedPathSet:
+    """
+    外部排序的路径集合，用于百万级文件同步时比较云盘文件与本地文件
+    新增的路径先缓存在内存中，达到 buffer_size 后排序写入临时文件（有序段），
+    遍历时归并各有序段并去重，内存占用只与 buffer_size 有关，与路径总数无关
+
+    路径按目录层级排序（路径分隔符排在所有字符之前），
+    两个集合按相同顺序遍历即可通过归并求差集，不需要将任一集合完整载入内存
+    """
+
+    def __init__(
+        self, temp_dir: str | PathLike | None = None, buffer_size: int = 100_000
+    ) -> None:
+        """
+        :param temp_dir: 有序段临时文件的上级目录，默认为系统临时目录
+        :param buffer_size: 内存中缓存的路径数
+        """
+        self.__temp_dir = temp_dir
+        self.__buffer_size = buffer_size
+        self.__buffer: list[str] = []
+        # 含换行符的路径无法写入按行分隔的有序段，始终保存在内存中
+        self.__pinned: list[str] = []
+        self.__runs: list[str] = []
+        self.__runs_dir: str | None = None
+        # 有序段所在目录（包括 import_runs 接收的目录）-> 删除该目录的 finalizer
+        self.__cleanups: dict[str, finalize] = {}
+
+    @staticmethod
+    def __key(path: str | PathLike) -> str:
+        """
+        路径分隔符替换为 \\0，使同一目录下的路径相邻，排序结果与逐层按名称遍历的顺序一致
+        """
+        return fspath(path).replace(sep, "\0")
+
+    def add(self, path: str | PathLike) -> None:
+        """
+        添加路径
+
+        :param path: 路径
+        """
+        key = self.__key(path)
+        if "\n" in key:
+            self.__pinned.append(key)
+            return
+        self.__buffer.append(key)
+        if len(self.__buffer) >= self.__buffer_size:
+            self.__spill()
+
+    def update(self, paths: Iterable[str | PathLike]) -> None:
+        """
+        批量添加路径
+
+        :param paths: 路径
+        """
+        for path in paths:
+            self.add(path)
+
+    def __spill(self) -> None:
+        """
+        将内存中的路径排序后写入新的有序段
+        """
+        if self.__runs_dir is None:
+            if self.__temp_dir is not None:
+                makedirs(self.__temp_dir, exist_ok=True)
+            self.__runs_dir = mkdtemp(prefix="AutoFilm_paths_", dir=self.__temp_dir)
+            self.__track_dir(self.__runs_dir)
+        self.__buffer.sort()
+        with NamedTemporaryFile(
+            "w",
+            encoding="utf-8",
+            errors="surrogateescape",
+            newline="\n",
+            dir=self.__runs_dir,
+            suffix=".run",
+            delete=False,
+        ) as file:
+            file.writelines(key + "\n" for key in self.__buffer)
+            self.__runs.append(file.name)
+        self.__buffer.clear()
+
+    def __track_dir(self, runs_dir: str) -> None:
+        """
+        集合关闭、被回收或进程正常退出时自动删除有序段目录
+        """
+        self.__cleanups[runs_dir] = finalize(self, rmtree, runs_dir, ignore_errors=True)
+
+    def export_runs(self) -> tuple[list[str], list[str], list[str]]:
+        """
+        将内存中的路径写入有序段，并将所有有序段交给其它集合（如多进程分片时子进程交给主进程），
+        交出的文件不再由本集合删除，本集合随后为空
+
+        :return: (有序段目录列表, 有序段文件列表, 含换行符的路径列表)
+        """
+        if self.__buffer:
+            self.__spill()
+        exported = (list(self.__cleanups), self.__runs, self.__pinned)
+        for cleanup in self.__cleanups.values():
+            cleanup.detach()
+        self.__cleanups = {}
+        self.__runs = []
+        self.__pinned = []
+        self.__runs_dir = None
+        return exported
+
+    def import_runs(
+        self, runs_dirs: list[str], runs: list[str], pinned: list[str]
+    ) -> None:
+        """
+        接收其它集合 export_runs 交出的有序段，关闭本集合时一并删除
+
+        :param runs_dirs: 有序段目录列表
+        :param runs: 有序段文件列表
+        :param pinned: 含换行符的路径列表
+        """
+        for runs_dir in runs_dirs:
+            self.__track_dir(runs_dir)
+        self.__runs.extend(runs)
+        self.__pinned.extend(pinned)
+
+    @staticmethod
+    def __read_run(run_path: str) -> Iterator[str]:
+        """
+        逐行读取有序段
+        """
+        with open(
+            run_path, encoding="utf-8", errors="surrogateescape", newline="\n"
+        ) as file:
+            for line in file:
+                yield line[:-1]
+
+    def __iter_keys(self) -> Iterator[str]:
+        """
+        按顺序遍历去重后的排序键
+        """
+        self.__buffer.sort()
+        self.__pinned.sort()
+        previous = None
+        for key in merge(
+            *(self.__read_run(run) for run in self.__runs), self.__buffer, self.__pinned
+        ):
+            if key != previous:
+                yield key
+                previous = key
+
+    def __iter__(self) -> Iterator[str]:
+        """
+        按顺序遍历去重后的路径
+        """
+        for key in self.__iter_keys():
+            yield key.replace("\0", sep)
+
+    def difference(self, other: "SortedPathSet") -> Iterator[str]:
+        """
+        按顺序遍历在本集合中但不在 other 中的路径
+
+        :param other: 另一个路径集合
+        """
+        others = other.__iter_keys()
+        current = next(others, None)
+        for key in self.__iter_keys():
+            while current is not None and current < key:
+                current = next(others, None)
+            if current != key:
+                yield key.replace("\0", sep)
+
+    def close(self) -> None:
+        """
+        清空集合并删除临时文件
+        """
+        self.__buffer.clear()
+        self.__pinned.clear()
+        self.__runs.clear()
+        for cleanup in self.__cleanups.values():
+            cleanup()
+        self.__cleanups.clear()
+        self.__runs_dir = None
+
+    def __enter__(self) -> "SortedPathSet":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
@@ -0,0 +1,186 @@
+from asyncio import sleep as async_sleep
+from contextvars import ContextVar, Token
+from threading import Lock
+from time import monotonic, sleep
+from typing import Any
+
+from app.utils.url import URLUtils
+
+
+class TokenBucket:
+    """
+    令牌桶
+    以 rate 的速度生成令牌，最多积攒 burst 个，每次请求消耗一个令牌
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        """
+        :param rate: 每秒生成的令牌数（每秒请求数）
+        :param burst: 令牌桶容量（允许的突发请求数）
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.__tokens: float = self.burst
+        self.__updated = monotonic()
+        self.__lock = Lock()
+
+    def reserve(self) -> float:
+        """
+        预留一个令牌
+
+        令牌不足时令牌数记为负数，后续调用者按预留顺序依次等待
+
+        :return: 获得令牌前需要等待的秒数
+        """
+        with self.__lock:
+            now = monotonic()
+            self.__tokens = min(
+                self.burst, self.__tokens + (now - self.__updated) * self.rate
+            )
+            self.__updated = now
+            self.__tokens -= 1
+            if self.__tokens >= 0:
+                return 0
+            return -self.__tokens / self.rate
+
+    async def acquire(self) -> None:
+        """
+        异步获取一个令牌
+        """
+        delay = self.reserve()
+        if delay > 0:
+            await async_sleep(delay)
+
+    def acquire_sync(self) -> None:
+        """
+        同步获取一个令牌
+        """
+        delay = self.reserve()
+        if delay > 0:
+            sleep(delay)
+
+
+class RateLimiter:
+    """
+    按主机划分的请求速率限制器
+    每个主机使用独立的令牌桶，可按路径前缀（如 Alist 挂载路径）覆盖速率
+
+    限速器可通过 activate 在当前上下文中启用（如某个任务的一次运行），
+    此后在该上下文中创建的协程任务与 to_thread 线程发出的请求均使用该限速器，
+    不同任务各自的限速配置互不影响
+    """
+
+    # 当前上下文启用的限速器
+    __current: ContextVar["RateLimiter | None"] = ContextVar(
+        "rate_limiter", default=None
+    )
+
+    def __init__(
+        self,
+        rate: float = 0,
+        burst: int = 1,
+        overrides: dict[str, dict[str, Any]] | None = None,
+        host: str = "",
+    ) -> None:
+        """
+        :param rate: 每秒请求数，小于等于 0 时不限速
+        :param burst: 允许的突发请求数
+        :param overrides: 路径前缀 -> {"rate": 每秒请求数, "burst": 突发请求数}
+        :param host: 只限制发往该地址所在主机的请求，为空时限制所有主机
+        """
+        self.host = self.__host_key(host) if host else ""
+        self.rate = rate
+        self.burst = burst
+        self.overrides = {
+            "/" + prefix.strip("/"): (
+                float(config.get("rate", rate)),
+                int(config.get("burst", burst)),
+            )
+            for prefix, config in (overrides or {}).items()
+        }
+        # 按前缀长度倒序，优先匹配最长前缀
+        self.__prefixes = sorted(self.overrides, key=len, reverse=True)
+        self.__buckets: dict[tuple[str, str], TokenBucket | None] = {}
+
+    @classmethod
+    def current(cls) -> "RateLimiter | None":
+        """
+        获取当前上下文启用的限速器
+
+        :return: 限速器，未启用时返回 None
+        """
+        return cls.__current.get()
+
+    def activate(self) -> Token:
+        """
+        在当前上下文中启用本限速器，使用完毕后需调用 deactivate 恢复
+
+        :return: 用于恢复的令牌
+        """
+        return RateLimiter.__current.set(self)
+
+    @classmethod
+    def deactivate(cls, token: Token) -> None:
+        """
+        恢复 activate 之前的限速器
+
+        :param token: activate 返回的令牌
+        """
+        cls.__current.reset(token)
+
+    @staticmethod
+    def __host_key(url: str) -> str:
+        """
+        获取 URL 的主机标识
+        """
+        _, domain, port = URLUtils.get_resolve_url(url)
+        return f"{domain}:{port}"
+
+    def __match_prefix(self, path: str) -> str:
+        """
+        获取路径匹配的最长覆盖前缀，未匹配时返回空字符串
+        """
+        for prefix in self.__prefixes:
+            if prefix == "/" or path == prefix or path.startswith(prefix + "/"):
+                return prefix
+        return ""
+
+    def get_bucket(self, url: str, path: str = "") -> TokenBucket | None:
+        """
+        获取请求对应的令牌桶
+
+        :param url: 请求的 URL
+        :param path: 用于匹配覆盖规则的路径，为空时不匹配覆盖规则
+        :return: 令牌桶，不限速时返回 None
+        """
+        host = self.__host_key(url)
+        if self.host and host != self.host:
+            return None
+        prefix = self.__match_prefix(path) if path else ""
+        key = (host, prefix)
+        if key not in self.__buckets:
+            rate, burst = self.overrides.get(prefix, (self.rate, self.burst))
+            self.__buckets[key] = TokenBucket(rate, burst) if rate > 0 else None
+        return self.__buckets[key]
+
+    async def acquire(self, url: str, path: str = "") -> None:
+        """
+        异步等待直到允许发起请求
+
+        :param url: 请求的 URL
+        :param path: 用于匹配覆盖规则的路径
+        """
+        bucket = self.get_bucket(url, path)
+        if bucket:
+            await bucket.acquire()
+
+    def acquire_sync(self, url: str, path: str = "") -> None:
+        """
+        同步等待直到允许发起请求
+
+        :param url: 请求的 URL
+        :param path: 用于匹配覆盖规则的路径
+        """
+        bucket = self.get_bucket(url, path)
+        if bucket:
+            bucket.acquire_sync()
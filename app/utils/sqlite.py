@@ -0,0 +1,52 @@
+from os import PathLike, fspath
+from os.path import abspath
+from sqlite3 import Connection, connect
+from threading import Lock, get_ident
+
+
+class SQLiteUtils:
+    """
+    进程内共享的 SQLite 连接
+    同一进程中同时进行的多次运行（如变更推送与定时全量扫描）各自打开连接时，
+    一个连接未提交的写事务会使另一个连接的写入等待锁直至超时（database is locked），且等待期间阻塞事件循环；
+    同一数据库文件共用一个连接后，各次运行的写入位于同一事务中，不再互相等待
+
+    SQLite 连接不能跨线程使用，只在同一线程（同一事件循环）中共享
+    """
+
+    # (线程标识, 数据库文件绝对路径) -> [连接, 引用数]
+    __connections: dict[tuple[int, str], list] = {}
+    __lock = Lock()
+
+    @classmethod
+    def connect(cls, db_path: str | PathLike) -> Connection:
+        """
+        获取数据库文件的共享连接，使用完毕后需调用 close 释放
+
+        :param db_path: SQLite 数据库文件路径
+        :return: 数据库连接
+        """
+        key = (get_ident(), abspath(fspath(db_path)))
+        with cls.__lock:
+            entry = cls.__connections.get(key)
+            if entry is None:
+                entry = cls.__connections[key] = [connect(key[1]), 0]
+            entry[1] += 1
+            return entry[0]
+
+    @classmethod
+    def close(cls, conn: Connection) -> None:
+        """
+        提交未保存的修改并释放共享连接，所有使用者都释放后关闭连接
+
+        :param conn: connect 返回的数据库连接
+        """
+        conn.commit()
+        with cls.__lock:
+            for key, entry in cls.__connections.items():
+                if entry[0] is conn:
+                    entry[1] -= 1
+                    if entry[1] <= 0:
+                        del cls.__connections[key]
+                        conn.close()
+                    return
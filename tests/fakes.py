@@ -0,0 +1,111 @@
+from asyncio import sleep
+
+from app.modules.alist import AlistClient, AlistEntry, AlistPath
+
+
+def make_path(
+    full_path: str,
+    is_dir: bool,
+    size: int = 0,
+    modified: str = "2024-09-27T04:01:20.652Z",
+) -> AlistEntry:
+    """
+    构造测试用 AlistEntry 对象
+    """
+    return AlistEntry(
+        server_url="https://alist.nn.ci",
+        base_path="/",
+        full_path=full_path,
+        name=full_path.rsplit("/", 1)[-1],
+        size=size,
+        is_dir=is_dir,
+        modified=modified,
+        created="2024-09-27T04:01:20.652Z",
+        sign="",
+        thumb="",
+        type=1 if is_dir else 2,
+        hashinfo="null",
+    )
+
+
+class FakeAlistClient:
+    """
+    模拟 Alist 服务器目录树的 AlistClient
+
+    目录树为 目录路径 -> [(名称, 是否为目录[, 大小[, 修改时间]]), ...]，
+    列出不在目录树中的目录或 fail_dirs 中的目录时抛出 RuntimeError
+    """
+
+    def __init__(self, tree: dict[str, list[tuple]], delay: float = 0.01) -> None:
+        """
+        :param tree: 目录树
+        :param delay: 每次列出目录的耗时，单位为秒
+        """
+        self.client = object.__new__(AlistClient)
+        self.client.url = "https://alist.nn.ci"
+        self.client.base_path = "/"
+        self.client.id = 1
+        self.client.async_api_fs_list = self.async_api_fs_list
+        self.client.async_api_fs_get = self.async_api_fs_get
+        self.client.ensure_initialized = self.ensure_initialized
+        self.client.async_api_fs_search = self.async_api_fs_search
+        self.client.is_search_available = self.is_search_available
+        self.tree = tree
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.listed: list[str] = []
+        self.searched: list[str] = []
+        self.fs_get_paths: list[str] = []
+        self.fail_dirs: set[str] = set()
+
+    async def ensure_initialized(self) -> None:
+        pass
+
+    async def async_api_fs_list(
+        self, dir_path: str, page: int = 1, per_page: int = 0
+    ) -> list[AlistEntry]:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await sleep(self.delay)
+            if dir_path in self.fail_dirs:
+                await sleep(0.2)
+                raise RuntimeError(f"获取 {dir_path} 目录列表失败")
+        finally:
+            self.in_flight -= 1
+        self.listed.append(dir_path)
+        if dir_path not in self.tree:
+            raise RuntimeError(f"获取目录 {dir_path} 的文件列表失败")
+        return [
+            make_path(dir_path.rstrip("/") + "/" + name, *item)
+            for name, *item in self.tree[dir_path]
+        ]
+
+    async def is_search_available(self, parent: str, max_age: float = 0) -> bool:
+        return True
+
+    async def async_api_fs_search(
+        self, parent: str, keywords: str = "", scope: int = 0, page: int = 1, per_page: int = 100
+    ) -> tuple[list[AlistEntry], int]:
+        """
+        返回 parent 下的全部文件，与真实搜索结果一样没有修改时间与签名
+        """
+        self.searched.append(parent)
+        files = [
+            make_path(
+                dir_path + "/" + name, False, size, AlistClient.SEARCH_UNKNOWN_TIME
+            )
+            for dir_path, items in self.tree.items()
+            if dir_path == parent or dir_path.startswith(parent + "/")
+            for name, is_dir, size, *_ in items
+            if not is_dir
+        ]
+        return files[(page - 1) * per_page : page * per_page], len(files)
+
+    async def async_api_fs_get(self, path: str) -> AlistPath:
+        await sleep(0)
+        self.fs_get_paths.append(path)
+        detail = make_path(path, False).to_alist_path()
+        detail.raw_url = "https://raw.example.com" + path
+        return detail
@@ -5,7 +5,7 @@ path.append(dirname(dirname(__file__)))
 
 import unittest
 import json
-from app.modules.alist import AlistPath
+from app.modules.alist import AlistPath, AlistEntry
 
 
 class TestAlistPath(unittest.TestCase):
@@ -314,6 +314,53 @@ class TestAlistPath(unittest.TestCase):
             self.assertEqual(path.type, item["type"])
             self.assertEqual(path.hashinfo, item["hashinfo"])
 
+    def test_alist_entry_consistent(self) -> None:
+        """
+        测试 AlistEntry 与 AlistPath 的属性及派生属性一致
+        """
+
+        item = {
+            "id": "",
+            "path": "/2024-10/[ANi] 凍牌~地下麻將鬥牌錄~ - 25 [1080P][Baha][WEB-DL][AAC AVC][CHT].mp4",
+            "name": "[ANi] 凍牌~地下麻將鬥牌錄~ - 25 [1080P][Baha][WEB-DL][AAC AVC][CHT].mp4",
+            "size": 293496422,
+            "is_dir": False,
+            "modified": "2025-04-04T18:25:43+02:00",
+            "created": "2025-04-04T18:25:43+02:00",
+            "sign": "4zZglYvgsJp2fE_L-w5HFwtbosHzYBlTgLiWXc8n4Q0=:0",
+            "thumb": "",
+            "type": 2,
+            "hashinfo": "null",
+            "hash_info": None,
+        }
+        kwargs = {
+            "server_url": "https://alist.nn.ci",
+            "base_path": "/user/",
+            "full_path": "/ani/2024-10/" + item["name"],
+            **item,
+        }
+        path = AlistPath(**kwargs)
+        entry = AlistEntry(**kwargs)
+
+        for attr in (
+            "full_path",
+            "abs_path",
+            "download_url",
+            "proxy_download_url",
+            "suffix",
+            "modified_timestamp",
+            "created_timestamp",
+        ):
+            self.assertEqual(getattr(entry, attr), getattr(path, attr), attr)
+        self.assertEqual(entry.to_alist_path(), path)
+
+        entry.full_path = "/ani/other.mkv"
+        self.assertEqual(entry.abs_path, "/user/ani/other.mkv")
+        self.assertEqual(
+            entry.download_url,
+            "https://alist.nn.ci/d/user/ani/other.mkv?sign=" + item["sign"],
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
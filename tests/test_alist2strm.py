@@ -0,0 +1,895 @@
+from sys import path
+from os.path import dirname
+
+path.append(dirname(dirname(__file__)))
+
+import unittest
+from asyncio import create_task, gather, sleep, wait_for
+from concurrent.futures import ThreadPoolExecutor
+from os import listdir, utime
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from threading import Event
+from unittest.mock import patch, PropertyMock
+
+from app.core import settings
+from app.utils import AlistUtils, RateLimiter, SQLiteUtils
+from app.modules.alist import AlistPath, AlistEntry
+from app.modules.alist2strm import (
+    Alist2Strm,
+    Alist2StrmLeases,
+    Alist2StrmManifest,
+    StrmWriter,
+)
+from tests.fakes import FakeAlistClient
+
+
+TREE = {
+    "/media": [("Show", True, 0), ("Movie", True, 0), ("@eaDir", True, 0)],
+    "/media/Show": [("S01E01.mkv", False, 100), ("S01E01.ass", False, 1)],
+    "/media/Movie": [("BDMV", True, 0)],
+    "/media/Movie/BDMV": [
+        ("STREAM", True, 0),
+        ("CLIPINF", True, 0),
+        ("index.bdmv", False, 1),
+    ],
+    "/media/Movie/BDMV/CLIPINF": [("00001.clpi", False, 1)],
+    "/media/Movie/BDMV/STREAM": [
+        ("00001.m2ts", False, 10),
+        ("00002.m2ts", False, 500),
+        ("00003.m2ts", False, 20),
+    ],
+    "/media/@eaDir": [("thumb.mkv", False, 1)],
+}
+
+
+class TestAlist2Strm(unittest.IsolatedAsyncioTestCase):
+    """
+    Alist2Strm 测试类
+    """
+
+    def setUp(self) -> None:
+        self.temp_dir = TemporaryDirectory(prefix="AutoFilm_")
+        self.target_dir = Path(self.temp_dir.name)
+        self.fake = FakeAlistClient(TREE)
+        self.patcher = patch(
+            "app.modules.alist2strm.alist2strm.AlistClient",
+            return_value=self.fake.client,
+        )
+        self.patcher.start()
+
+    def tearDown(self) -> None:
+        self.patcher.stop()
+        self.temp_dir.cleanup()
+
+    def local_files(self) -> dict[str, str]:
+        return {
+            file.relative_to(self.target_dir).as_posix(): file.read_text("utf-8")
+            for file in self.target_dir.rglob("*")
+            if file.is_file()
+        }
+
+    async def test_run_alist_url(self) -> None:
+        """
+        测试 AlistURL 模式生成的 strm 文件
+        """
+
+        alist2strm = Alist2Strm(
+            source_dir="/media", target_dir=self.target_dir, token="token"
+        )
+        result = await alist2strm.run()
+
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(
+            self.local_files(),
+            {
+                "Show/S01E01.strm": "https://alist.nn.ci/d/media/Show/S01E01.mkv",
+                "Movie/Movie.strm": "https://alist.nn.ci/d/media/Movie/BDMV/STREAM/00002.m2ts",
+            },
+        )
+        self.assertEqual(self.fake.fs_get_paths, [])
+        self.assertNotIn("/media/@eaDir", self.fake.listed)
+        self.assertNotIn("/media/Movie/BDMV/CLIPINF", self.fake.listed)
+
+    async def test_run_sign_secret(self) -> None:
+        """
+        测试设置签名密钥后在本地计算下载地址的签名
+        """
+
+        alist2strm = Alist2Strm(
+            source_dir="/media",
+            target_dir=self.target_dir,
+            token="token",
+            sign_secret="alist-d22d23ddf42fvv2",
+        )
+        await alist2strm.run()
+
+        self.assertEqual(
+            self.local_files()["Show/S01E01.strm"],
+            "https://alist.nn.ci/d/media/Show/S01E01.mkv"
+            "?sign=iNvRihVrHqoHQe9qj4JnYn6HtKuHl9tZHmCVI5Dp8Sc=:0",
+        )
+        self.assertEqual(self.fake.fs_get_paths, [])
+
+    async def test_run_play_url(self) -> None:
+        """
+        测试 PlayURL 模式生成指向播放接口的带签名地址，不请求 fs/get
+        """
+
+        with patch.object(
+            type(settings),
+            "APIConfig",
+            new_callable=PropertyMock,
+            return_value={"api_key": "secret"},
+        ):
+            alist2strm = Alist2Strm(
+                id="动漫",
+                source_dir="/media",
+                target_dir=self.target_dir,
+                token="token",
+                mode="PlayURL",
+                play_url="http://autofilm:8080/",
+            )
+        await alist2strm.run()
+
+        sign = AlistUtils.sign("secret", "动漫/media/Show/S01E01.mkv")
+        self.assertEqual(
+            self.local_files()["Show/S01E01.strm"],
+            "http://autofilm:8080/api/play/%E5%8A%A8%E6%BC%AB/media/Show/S01E01.mkv"
+            f"?sign={sign}",
+        )
+        self.assertEqual(self.fake.fs_get_paths, [])
+
+        with self.assertRaises(ValueError):
+            Alist2Strm(source_dir="/media", target_dir=self.target_dir, mode="PlayURL")
+
+    async def test_run_include_exclude(self) -> None:
+        """
+        测试排除规则匹配的目录与不在包含路径上的目录不会被遍历
+        """
+
+        alist2strm = Alist2Strm(
+            source_dir="/media",
+            target_dir=self.target_dir,
+            token="token",
+            include=["/media/Show"],
+            exclude=["*.ass"],
+            subtitle=True,
+        )
+        await alist2strm.run()
+
+        self.assertEqual(list(self.local_files()), ["Show/S01E01.strm"])
+        self.assertEqual(self.fake.listed, ["/media", "/media/Show"])
+
+    async def test_run_raw_url(self) -> None:
+        """
+        测试 RawURL 模式通过详细信息获取阶段得到 raw_url
+        """
+
+        alist2strm = Alist2Strm(
+            source_dir="/media",
+            target_dir=self.target_dir,
+            token="token",
+            mode="RawURL",
+            max_detail_workers=2,
+        )
+        await alist2strm.run()
+
+        files = self.local_files()
+        self.assertEqual(
+            files["Show/S01E01.strm"], "https://raw.example.com/media/Show/S01E01.mkv"
+        )
+        self.assertEqual(
+            files["Movie/Movie.strm"],
+            "https://raw.example.com/media/Movie/BDMV/STREAM/00002.m2ts",
+        )
+
+    async def test_run_raw_url_download(self) -> None:
+        """
+        测试 RawURL 模式下字幕等文件不经过详细信息获取阶段，通过 /d/ 地址下载
+        """
+
+        downloads: list[str] = []
+
+        async def download(url: str, file_path: Path, **kwargs) -> None:
+            downloads.append(url)
+            file_path.write_text("subtitle", "utf-8")
+
+        alist2strm = Alist2Strm(
+            source_dir="/media",
+            target_dir=self.target_dir,
+            token="token",
+            mode="RawURL",
+            subtitle=True,
+        )
+        with patch(
+            "app.modules.alist2strm.alist2strm.RequestUtils.download", new=download
+        ):
+            await alist2strm.run()
+
+        self.assertEqual(downloads, ["https://alist.nn.ci/d/media/Show/S01E01.ass"])
+        self.assertEqual(self.local_files()["Show/S01E01.ass"], "subtitle")
+        self.assertNotIn("/media/Show/S01E01.ass", self.fake.fs_get_paths)
+
+    async def test_run_bdmv_concurrent(self) -> None:
+        """
+        测试多个 BDMV 目录的详细信息并发获取
+        """
+
+        self.fake.tree = {"/media": [(f"Disc{i}", True, 0) for i in range(6)]}
+        for i in range(6):
+            self.fake.tree[f"/media/Disc{i}"] = [("BDMV", True, 0)]
+            self.fake.tree[f"/media/Disc{i}/BDMV"] = [("STREAM", True, 0)]
+            self.fake.tree[f"/media/Disc{i}/BDMV/STREAM"] = [
+                ("00001.m2ts", False, 1),
+                ("00002.m2ts", False, 100 + i),
+            ]
+        in_flight = max_in_flight = 0
+        fs_get = self.fake.async_api_fs_get
+
+        async def slow_fs_get(path: str) -> AlistPath:
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await sleep(0.01)
+            in_flight -= 1
+            return await fs_get(path)
+
+        self.fake.client.async_api_fs_get = slow_fs_get
+        alist2strm = Alist2Strm(
+            source_dir="/media",
+            target_dir=self.target_dir,
+            token="token",
+            mode="RawURL",
+            max_detail_workers=3,
+        )
+        await alist2strm.run()
+
+        self.assertEqual(
+            self.local_files(),
+            {
+                f"Disc{i}/Disc{i}.strm": f"https://raw.example.com/media/Disc{i}/BDMV/STREAM/00002.m2ts"
+                for i in range(6)
+            },
+        )
+        self.assertCountEqual(
+            self.fake.fs_get_paths,
+            [f"/media/Disc{i}/BDMV/STREAM/00002.m2ts" for i in range(6)],
+        )
+        self.assertGreater(max_in_flight, 1)
+        self.assertEqual(alist2strm.bdmv_pending, {})
+
+    async def test_run_sync_server(self) -> None:
+        """
+        测试同步模式删除服务器上已不存在的文件
+        """
+
+        stale = self.target_dir / "Old" / "Gone.strm"
+        stale.parent.mkdir(parents=True)
+        stale.write_text("https://alist.nn.ci/d/media/Old/Gone.mkv", "utf-8")
+
+        alist2strm = Alist2Strm(
+            source_dir="/media",
+            target_dir=self.target_dir,
+            token="token",
+            sync_server=True,
+        )
+        await alist2strm.run()
+
+        self.assertFalse(stale.exists())
+        self.assertFalse(stale.parent.exists())
+        self.assertIn("Show/S01E01.strm", self.local_files())
+
+    async def test_run_specific_dirs(self) -> None:
+        """
+        测试一次遍历同时处理多个指定目录，同步时只清理这些目录
+        """
+
+        stale = self.target_dir / "Show" / "S01E02.strm"
+        kept = self.target_dir / "Other" / "Old.strm"
+        for file in (stale, kept):
+            file.parent.mkdir(parents=True)
+            file.write_text("https://alist.nn.ci/d/media/old.mkv", "utf-8")
+
+        alist2strm = Alist2Strm(
+            source_dir="/media",
+            target_dir=self.target_dir,
+            token="token",
+            sync_server=True,
+        )
+        result = await alist2strm.run(specific_dirs=["/media/Show", "/media/Movie"])
+
+        self.assertNotIn("/media", self.fake.listed)
+        self.assertEqual(result["source_dir"], "/media")
+        self.assertEqual(
+            sorted(self.local_files()),
+            ["Movie/Movie.strm", "Other/Old.strm", "Show/S01E01.strm"],
+        )
+
+    async def test_run_specific_dirs_sync(self) -> None:
+        """
+        测试多个指定目录同步时，每个目录都只删除云盘中已不存在的文件
+        """
+
+        options = dict(
+            source_dir="/media", target_dir=self.target_dir, token="token", sync_server=True
+        )
+        await Alist2Strm(**options).run()
+        stale = self.target_dir / "Movie" / "Old.strm"
+        stale.write_text("https://alist.nn.ci/d/media/Movie/Old.mkv", "utf-8")
+        # 模拟上次运行生成的文件
+        for file in self.target_dir.rglob("*.strm"):
+            utime(file, (0, 0))
+
+        await Alist2Strm(**options).run(specific_dirs=["/media/Show", "/media/Movie"])
+
+        self.assertEqual(
+            sorted(self.local_files()), ["Movie/Movie.strm", "Show/S01E01.strm"]
+        )
+
+    async def test_run_hot_scan(self) -> None:
+        """
+        测试热扫描（设置时间预算）处理遍历到的文件，不执行同步删除
+        """
+
+        stale = self.target_dir / "Old" / "Gone.strm"
+        stale.parent.mkdir(parents=True)
+        stale.write_text("https://alist.nn.ci/d/media/Old/Gone.mkv", "utf-8")
+
+        alist2strm = Alist2Strm(
+            source_dir="/media",
+            target_dir=self.target_dir,
+            token="token",
+            sync_server=True,
+            newest_first=True,
+            time_budget=60,
+        )
+        await alist2strm.run()
+
+        self.assertTrue(stale.exists())
+        self.assertIn("Show/S01E01.strm", self.local_files())
+
+    async def test_run_bounded_workers(self) -> None:
+        """
+        测试同时处理的文件数不超过 max_workers，处理失败计入错误数
+        """
+
+        self.fake.tree = {"/media": [(f"{i:03d}.mkv", False, 1) for i in range(50)]}
+        alist2strm = Alist2Strm(
+            source_dir="/media", target_dir=self.target_dir, token="token", max_workers=3
+        )
+        in_flight = max_in_flight = 0
+
+        async def file_processer(path: AlistEntry) -> None:
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await sleep(0.001)
+            in_flight -= 1
+            if path.name == "007.mkv":
+                raise OSError("磁盘已满")
+
+        alist2strm._Alist2Strm__file_processer = file_processer
+        result = await alist2strm.run()
+
+        self.assertEqual(result["processed_count"], 50)
+        self.assertEqual(result["error_count"], 1)
+        self.assertEqual(max_in_flight, 3)
+
+    def patch_config_dir(self) -> None:
+        """
+        将配置目录（缓存、清单、检查点）替换为临时目录
+        """
+        config_dir = TemporaryDirectory(prefix="AutoFilm_")
+        self.addCleanup(config_dir.cleanup)
+        config_patcher = patch.object(
+            type(settings),
+            "CONFIG_DIR",
+            new_callable=PropertyMock,
+            return_value=Path(config_dir.name),
+        )
+        config_patcher.start()
+        self.addCleanup(config_patcher.stop)
+
+    async def test_run_manifest(self) -> None:
+        """
+        测试输出清单：未变化的文件不检查本地文件，同步删除根据清单完成
+        """
+
+        self.patch_config_dir()
+        self.fake.tree = dict(TREE)
+        alist2strm = Alist2Strm(
+            source_dir="/media",
+            target_dir=self.target_dir,
+            token="token",
+            sync_server=True,
+            use_manifest=True,
+        )
+        await alist2strm.run()
+        self.assertEqual(len(self.local_files()), 2)
+
+        # 清单记录未变化时不重新生成，也不检查本地文件
+        strm = self.target_dir / "Show" / "S01E01.strm"
+        strm.write_text("local", "utf-8")
+        await alist2strm.run()
+        self.assertEqual(strm.read_text("utf-8"), "local")
+
+        # 云盘文件变化但 strm 内容与清单记录一致时不重新写入
+        self.fake.tree["/media/Show"] = [("S01E01.mkv", False, 200)]
+        result = await alist2strm.run()
+        self.assertEqual(result["unchanged_count"], 1)
+        self.assertEqual(strm.read_text("utf-8"), "local")
+
+        # 覆盖模式下全量扫描时比较本地文件内容
+        alist2strm.overwrite = True
+        result = await alist2strm.run(full_rescan=True)
+        alist2strm.overwrite = False
+        self.assertEqual(result["written_count"], 1)
+        self.assertEqual(
+            strm.read_text("utf-8"), "https://alist.nn.ci/d/media/Show/S01E01.mkv"
+        )
+
+        # 云盘文件删除后根据清单删除本地文件，清单外的文件不受影响
+        unknown = self.target_dir / "Unknown.strm"
+        unknown.write_text("local", "utf-8")
+        self.fake.tree["/media/Show"] = []
+        await alist2strm.run()
+        self.assertFalse(strm.parent.exists())
+        self.assertTrue(unknown.exists())
+        self.assertIn("Movie/Movie.strm", self.local_files())
+
+    async def test_run_overlapping(self) -> None:
+        """
+        测试变更推送的运行与全量扫描同时进行时，输出清单与目录列表缓存的写入不互相等待数据库锁
+        """
+
+        self.patch_config_dir()
+        self.fake.tree = {
+            "/media": [("Show", True, 0), ("Movie", True, 0)],
+            "/media/Show": [(f"{i:03d}.mkv", False, 1) for i in range(300)],
+            "/media/Movie": [(f"{i:03d}.mkv", False, 1) for i in range(300)],
+        }
+        options = dict(
+            source_dir="/media",
+            target_dir=self.target_dir,
+            token="token",
+            sync_server=True,
+            use_manifest=True,
+            incremental=True,
+        )
+
+        full, feed = await gather(
+            Alist2Strm(**options).run(),
+            Alist2Strm(**options).run(specific_dirs=["/media/Show"]),
+        )
+
+        self.assertEqual(full["error_count"], 0)
+        self.assertEqual(feed["error_count"], 0)
+        self.assertEqual(len(self.local_files()), 600)
+
+    async def test_run_error_cleanup(self) -> None:
+        """
+        测试运行失败时仍恢复同步设置并释放输出清单的数据库连接
+        """
+
+        self.patch_config_dir()
+        self.fake.fail_dirs = {"/media/Show"}
+        alist2strm = Alist2Strm(
+            source_dir="/media",
+            target_dir=self.target_dir,
+            token="token",
+            use_manifest=True,
+        )
+        with self.assertRaises(Exception):
+            await alist2strm.run(sync_mode=True)
+
+        self.assertFalse(alist2strm.sync_server)
+        self.assertEqual(SQLiteUtils._SQLiteUtils__connections, {})
+
+    async def test_run_search(self) -> None:
+        """
+        测试搜索结果没有签名：未设置 sign_secret 时 AlistURL 模式使用目录遍历，
+        设置后使用搜索索引，且清单比较不受搜索结果中缺少修改时间影响
+        """
+
+        self.patch_config_dir()
+        options = dict(
+            source_dir="/media",
+            target_dir=self.target_dir,
+            token="token",
+            use_search=True,
+            use_manifest=True,
+        )
+        await Alist2Strm(**options).run()
+        self.assertEqual(self.fake.searched, [])
+        self.assertIn("/media/Show", self.fake.listed)
+
+        # 目录遍历时记录的文件未变化，搜索结果的修改时间未知时不视为变化
+        await Alist2Strm(**options | {"use_search": False}, sign_secret="secret").run()
+        alist2strm = Alist2Strm(**options, sign_secret="secret")
+        for _ in range(2):
+            result = await alist2strm.run()
+            self.assertEqual((result["skipped_count"], result["written_count"]), (2, 0))
+        self.assertEqual(self.fake.searched, ["/media"] * 2)
+        self.assertIn("?sign=", self.local_files()["Show/S01E01.strm"])
+
+    async def test_run_checkpoint(self) -> None:
+        """
+        测试中断的运行从检查点继续，不再请求已完成的目录，任务配置变化后检查点失效
+        """
+
+        self.patch_config_dir()
+        options = dict(
+            source_dir="/media",
+            target_dir=self.target_dir,
+            token="token",
+            max_list_workers=1,
+            checkpoint_interval=60,
+        )
+
+        self.fake.fail_dirs = {"/media/Movie/BDMV"}
+        with self.assertRaises(Exception):
+            await Alist2Strm(**options).run()
+        self.assertEqual(list(self.local_files()), ["Show/S01E01.strm"])
+
+        self.fake.fail_dirs = set()
+        self.fake.listed = []
+        result = await Alist2Strm(**options).run()
+        self.assertEqual(
+            self.fake.listed, ["/media/Movie/BDMV", "/media/Movie/BDMV/STREAM"]
+        )
+        self.assertEqual((result["processed_count"], result["written_count"]), (2, 2))
+        self.assertEqual(len(self.local_files()), 2)
+
+        # 运行完成后检查点被清除，下次运行重新遍历全部目录
+        self.fake.listed = []
+        await Alist2Strm(**options).run()
+        self.assertIn("/media", self.fake.listed)
+
+        # 任务配置变化后不使用上次保存的检查点
+        self.fake.fail_dirs = {"/media/Movie/BDMV"}
+        with self.assertRaises(Exception):
+            await Alist2Strm(**options).run()
+        self.fake.fail_dirs = set()
+        self.fake.listed = []
+        await Alist2Strm(**options, mode="AlistPath").run()
+        self.assertIn("/media/Show", self.fake.listed)
+
+    def test_manifest_deferred_changes(self) -> None:
+        """
+        测试 deferred 模式的清单修改写入临时文件，交出后由主进程写入并删除，未交出时关闭即删除
+        """
+
+        db_path = self.target_dir / "manifest.db"
+        shard = Alist2StrmManifest(db_path, self.target_dir, deferred=True)
+        shard.set("a.strm", "/media/a.mkv", "t", 1, "hash\nwith newline")
+        shard.set("b.strm", "/media/b.mkv", "t", 2)
+        shard.delete("b.strm")
+        changes_path = shard.export_changes()
+        shard.close()
+        self.assertTrue(Path(changes_path).exists())
+
+        manifest = Alist2StrmManifest(db_path, self.target_dir, commit_interval=1)
+        self.assertTrue(manifest.is_empty())
+        manifest.apply(changes_path)
+        self.assertFalse(Path(changes_path).exists())
+        self.assertEqual(
+            manifest.get("a.strm"), ("/media/a.mkv", "t", 1, "hash\nwith newline")
+        )
+        self.assertIsNone(manifest.get("b.strm"))
+        manifest.close()
+
+        discarded = Alist2StrmManifest(db_path, self.target_dir, deferred=True)
+        discarded.touch("a.strm")
+        changes_path = discarded._Alist2StrmManifest__changes_path
+        discarded.close()
+        self.assertFalse(Path(changes_path).exists())
+
+    async def test_run_sharded(self) -> None:
+        """
+        测试多进程分片执行：每个顶层目录只由一个分片遍历，主进程汇总结果并执行同步删除
+        """
+
+        self.patch_config_dir()
+        # 使用线程池代替进程池，子任务中可以使用模拟的 AlistClient
+        executor_patcher = patch(
+            "app.modules.alist2strm.alist2strm.ProcessPoolExecutor",
+            lambda max_workers, mp_context: ThreadPoolExecutor(max_workers),
+        )
+        executor_patcher.start()
+        self.addCleanup(executor_patcher.stop)
+
+        self.fake.tree = dict(TREE)
+        self.fake.tree["/media"] = TREE["/media"] + [
+            ("Root.mkv", False, 1),
+            *((f"Show{i}", True, 0) for i in range(4)),
+        ]
+        self.fake.tree |= {f"/media/Show{i}": [] for i in range(4)}
+        stale = self.target_dir / "Stale" / "Stale.strm"
+        stale.parent.mkdir()
+        stale.write_text("local", "utf-8")
+
+        alist2strm = Alist2Strm(
+            source_dir="/media",
+            target_dir=self.target_dir,
+            token="token",
+            sync_server=True,
+            use_manifest=True,
+            max_processes=3,
+        )
+        result = await alist2strm.run()
+        self.assertEqual((result["processed_count"], result["written_count"]), (3, 3))
+        self.assertEqual(
+            set(self.local_files()), {"Root.strm", "Show/S01E01.strm", "Movie/Movie.strm"}
+        )
+        self.assertEqual(self.fake.listed.count("/media"), 3)
+        listed = [dir_path for dir_path in self.fake.listed if dir_path != "/media"]
+        self.assertEqual(len(listed), len(set(listed)))
+        self.assertIn("/media/Show3", listed)
+
+        # 输出清单汇总至主进程后，同步删除根据清单完成
+        self.fake.tree["/media/Show"] = []
+        result = await alist2strm.run()
+        self.assertEqual(result["skipped_count"], 2)
+        self.assertEqual(set(self.local_files()), {"Root.strm", "Movie/Movie.strm"})
+        # 子进程交给主进程的已处理路径有序段在同步删除后被删除
+        self.assertFalse(
+            [
+                name
+                for name in listdir(settings.CONFIG_DIR / "cache")
+                if name.startswith("AutoFilm_paths_")
+            ]
+        )
+
+    def test_divide_rate_limit(self) -> None:
+        """
+        测试分片执行时各子进程均分限速配置
+        """
+
+        rate_limit = {
+            "rate": 8,
+            "burst": 4,
+            "overrides": {"/115": {"rate": 2}, "/local": {"burst": 1}},
+        }
+        self.assertEqual(
+            Alist2Strm._Alist2Strm__divide_rate_limit(rate_limit, 4),
+            {
+                "rate": 2.0,
+                "burst": 1,
+                "overrides": {"/115": {"rate": 0.5}, "/local": {"burst": 1}},
+            },
+        )
+
+    async def test_task_rate_limiter(self) -> None:
+        """
+        测试各任务使用独立的限速器，只在本任务运行期间生效，同一任务的多次构造共用限速器
+        """
+
+        options = {"source_dir": "/media", "target_dir": self.target_dir}
+        slow = Alist2Strm(id="slow", rate_limit={"rate": 1}, **options)
+        fast = Alist2Strm(id="fast", rate_limit={"rate": 100}, **options)
+        self.assertEqual(slow.rate_limiter.rate, 1)
+        self.assertEqual(fast.rate_limiter.rate, 100)
+        self.assertIs(
+            Alist2Strm(id="slow", rate_limit={"rate": 1}, **options).rate_limiter,
+            slow.rate_limiter,
+        )
+        self.assertIsNot(
+            Alist2Strm(id="slow", wait_time=2, **options).rate_limiter,
+            slow.rate_limiter,
+        )
+        self.assertIsNone(Alist2Strm(**options).rate_limiter)
+
+        limiters = []
+        fs_list = self.fake.client.async_api_fs_list
+
+        async def async_api_fs_list(*args, **kwargs):
+            limiters.append(RateLimiter.current())
+            return await fs_list(*args, **kwargs)
+
+        self.fake.client.async_api_fs_list = async_api_fs_list
+        await fast.run()
+        self.assertTrue(limiters)
+        self.assertTrue(all(limiter is fast.rate_limiter for limiter in limiters))
+        self.assertIsNone(RateLimiter.current())
+
+    async def test_run_leased(self) -> None:
+        """
+        测试租约模式：两个实例共同处理一个目录，每个工作单元只处理一次，同步删除限定在工作单元内
+        """
+
+        self.patch_config_dir()
+        lease_db = self.target_dir.parent / f"{self.target_dir.name}_lease.db"
+        self.addCleanup(lease_db.unlink, missing_ok=True)
+        self.fake.tree = dict(TREE)
+        self.fake.tree["/media"] = TREE["/media"] + [("Root.mkv", False, 1)]
+        stale = self.target_dir / "Removed" / "Stale.strm"
+        stale.parent.mkdir()
+        stale.write_text("local", "utf-8")
+
+        options = dict(
+            source_dir="/media",
+            target_dir=self.target_dir,
+            token="token",
+            sync_server=True,
+            lease_db=str(lease_db),
+        )
+        results = await gather(Alist2Strm(**options).run(), Alist2Strm(**options).run())
+        self.assertEqual(sum(result["written_count"] for result in results), 3)
+        self.assertEqual(
+            set(self.local_files()), {"Root.strm", "Show/S01E01.strm", "Movie/Movie.strm"}
+        )
+        # 每个实例获取一次顶层目录列表，起始目录中的文件作为一个工作单元再获取一次
+        self.assertEqual(self.fake.listed.count("/media"), 3)
+        self.assertEqual(self.fake.listed.count("/media/Show"), 1)
+
+        # 本轮刚结束，其它实例不再重复处理
+        self.fake.listed = []
+        result = await Alist2Strm(**options).run()
+        self.assertEqual(result["processed_count"], 0)
+        self.assertEqual(self.fake.listed, ["/media"])
+
+    async def test_run_lease_lost(self) -> None:
+        """
+        测试续约失败（租约被其它实例接管）时取消该工作单元的处理，继续处理其它工作单元
+        """
+
+        self.patch_config_dir()
+        lease_db = self.target_dir.parent / f"{self.target_dir.name}_lease.db"
+        self.addCleanup(lease_db.unlink, missing_ok=True)
+        self.fake.tree = dict(TREE)
+        list_dir = self.fake.async_api_fs_list
+
+        async def slow_list(dir_path: str, *args) -> list[AlistEntry]:
+            if dir_path == "/media/Show":
+                await sleep(1)
+            return await list_dir(dir_path, *args)
+
+        self.fake.client.async_api_fs_list = slow_list
+        alist2strm = Alist2Strm(
+            source_dir="/media",
+            target_dir=self.target_dir,
+            token="token",
+            lease_db=str(lease_db),
+            lease_ttl=0.15,
+        )
+        # 只有 Show 工作单元的租约被其它实例接管
+        with patch.object(Alist2StrmLeases, "renew", lambda _, unit: unit != "Show"):
+            result = await alist2strm.run()
+
+        self.assertEqual(result["written_count"], 1)
+        self.assertEqual(set(self.local_files()), {"Movie/Movie.strm"})
+
+    async def test_run_outputs(self) -> None:
+        """
+        测试一次遍历生成多个输出目录，每个输出使用自己的模式并分别同步删除
+        """
+
+        other_dir = TemporaryDirectory(prefix="AutoFilm_")
+        self.addCleanup(other_dir.cleanup)
+        other = Path(other_dir.name)
+        stale = other / "Stale.strm"
+        stale.write_text("local", "utf-8")
+
+        alist2strm = Alist2Strm(
+            source_dir="/media",
+            target_dir=self.target_dir,
+            token="token",
+            sync_server=True,
+            outputs=[
+                {"target_dir": other, "mode": "RawURL", "flatten_mode": True, "subtitle": True}
+            ],
+        )
+        result = await alist2strm.run()
+
+        self.assertEqual(len(self.fake.listed), len(set(self.fake.listed)))
+        self.assertEqual((result["processed_count"], result["written_count"]), (2, 4))
+        self.assertEqual(
+            self.local_files(),
+            {
+                "Show/S01E01.strm": "https://alist.nn.ci/d/media/Show/S01E01.mkv",
+                "Movie/Movie.strm": "https://alist.nn.ci/d/media/Movie/BDMV/STREAM/00002.m2ts",
+            },
+        )
+        self.assertEqual(
+            {file.name: file.read_text("utf-8") for file in other.iterdir()},
+            {
+                "S01E01.strm": "https://raw.example.com/media/Show/S01E01.mkv",
+                "Movie.strm": "https://raw.example.com/media/Movie/BDMV/STREAM/00002.m2ts",
+            },
+        )
+        # 平铺模式下不下载字幕；只有 RawURL 输出需要的视频文件获取详细信息
+        self.assertCountEqual(
+            self.fake.fs_get_paths,
+            ["/media/Show/S01E01.mkv", "/media/Movie/BDMV/STREAM/00002.m2ts"],
+        )
+
+    async def test_run_write_if_changed(self) -> None:
+        """
+        测试覆盖模式下内容未变化的 strm 文件不重新写入
+        """
+
+        alist2strm = Alist2Strm(
+            source_dir="/media", target_dir=self.target_dir, token="token", overwrite=True
+        )
+        result = await alist2strm.run()
+        self.assertEqual(result["written_count"], 2)
+
+        strm = self.target_dir / "Show" / "S01E01.strm"
+        mtime = strm.stat().st_mtime_ns
+        result = await alist2strm.run()
+        self.assertEqual(
+            (result["written_count"], result["unchanged_count"], result["skipped_count"]),
+            (0, 2, 0),
+        )
+        self.assertEqual(strm.stat().st_mtime_ns, mtime)
+
+        result = await Alist2Strm(
+            source_dir="/media", target_dir=self.target_dir, token="token"
+        ).run()
+        # BDMV 文件总是经过处理阶段，内容未变化时不重新写入
+        self.assertEqual((result["skipped_count"], result["unchanged_count"]), (1, 1))
+        self.assertEqual(list(self.target_dir.rglob("*.tmp")), [])
+
+
+class TestStrmWriter(unittest.IsolatedAsyncioTestCase):
+    """
+    StrmWriter 测试类
+    """
+
+    async def test_write_batches(self) -> None:
+        """
+        测试同一目录中同时提交的文件合并写入，内容相同时不重新写入
+        """
+
+        with TemporaryDirectory(prefix="AutoFilm_") as temp_dir:
+            root = Path(temp_dir)
+            files = {
+                root / f"D{i % 3}" / f"{i:03d}.strm": f"https://a/{i}.mkv"
+                for i in range(100)
+            }
+            writer = StrmWriter(max_workers=2, batch_size=16)
+            batches: list[int] = []
+            write_batch = writer._StrmWriter__write_batch
+
+            def counting_write_batch(dir_path, items):
+                batches.append(len(items))
+                return write_batch(dir_path, items)
+
+            writer._StrmWriter__write_batch = counting_write_batch
+            try:
+                results = await gather(
+                    *(writer.write(path, content) for path, content in files.items())
+                )
+                self.assertTrue(all(results))
+                self.assertEqual(sum(batches), 100)
+                self.assertLessEqual(len(batches), 9)
+                for path, content in files.items():
+                    self.assertEqual(path.read_text("utf-8"), content)
+
+                path = root / "D0" / "000.strm"
+                self.assertFalse(await writer.write(path, files[path]))
+            finally:
+                writer.close()
+
+    async def test_write_cancelled(self) -> None:
+        """
+        测试线程任务被取消时写入以异常结束，不会一直等待
+        """
+
+        with TemporaryDirectory(prefix="AutoFilm_") as temp_dir:
+            writer = StrmWriter(max_workers=1)
+            executor = writer._StrmWriter__executor
+            release = Event()
+            executor.submit(release.wait)
+            pending = create_task(writer.write(Path(temp_dir) / "a.strm", "x"))
+            await sleep(0.01)
+            # 排队中的写入任务被取消
+            executor.shutdown(wait=False, cancel_futures=True)
+            release.set()
+            with self.assertRaises(RuntimeError):
+                await wait_for(pending, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,573 @@
+from sys import path
+from os.path import dirname
+
+path.append(dirname(dirname(__file__)))
+
+import unittest
+from asyncio import gather, sleep
+from time import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from app.modules.alist import (
+    AlistClient,
+    AlistEntry,
+    AlistListingCache,
+    AlistRawURLResolver,
+)
+from tests.fakes import FakeAlistClient, make_path
+
+
+class TestAlistClientWalker(unittest.IsolatedAsyncioTestCase):
+    """
+    AlistClient 目录遍历测试类
+    """
+
+    TREE = {
+        "/media": [("a", True), ("b", True), ("1.mkv", False)],
+        "/media/a": [("a1", True), ("2.mkv", False)],
+        "/media/a/a1": [("3.mkv", False), ("4.mkv", False)],
+        "/media/b": [("5.mkv", False)],
+    }
+
+    async def test_iter_path_concurrent_same_result(self) -> None:
+        """
+        测试并发遍历与深度优先遍历返回相同的文件集合
+        """
+
+        fake = FakeAlistClient(self.TREE)
+        expected = [
+            path.full_path
+            async for path in fake.client.iter_path(
+                "/media", is_detail=False
+            )
+        ]
+        result = [
+            path.full_path
+            async for path in fake.client.iter_path_concurrent(
+                "/media", is_detail=False, max_workers=4
+            )
+        ]
+        self.assertCountEqual(result, expected)
+        self.assertEqual(len(result), 8)
+
+    async def test_iter_path_concurrent_bounded(self) -> None:
+        """
+        测试同时进行的 fs/list 请求数不超过 max_workers
+        """
+
+        tree = {"/": [(f"d{i}", True) for i in range(20)]}
+        tree |= {f"/d{i}": [("1.mkv", False)] for i in range(20)}
+        fake = FakeAlistClient(tree)
+        result = [
+            path
+            async for path in fake.client.iter_path_concurrent(
+                "/",
+                is_detail=False,
+                filter=lambda path: not path.is_dir,
+                max_workers=3,
+            )
+        ]
+        self.assertEqual(len(result), 20)
+        self.assertLessEqual(fake.max_in_flight, 3)
+        self.assertGreater(fake.max_in_flight, 1)
+
+    async def test_iter_path_concurrent_on_dir_listed(self) -> None:
+        """
+        测试目录列表完成回调在该目录的所有条目经过 filter 之后调用
+        """
+
+        fake = FakeAlistClient(self.TREE)
+        seen: list[str] = []
+        listed: dict[str, list[str]] = {}
+
+        async def on_dir_listed(dir_path: str) -> None:
+            listed[dir_path] = list(seen)
+
+        def filter(path) -> bool:
+            seen.append(path.full_path)
+            return True
+
+        async for _ in fake.client.iter_path_concurrent(
+            "/media", is_detail=False, filter=filter, on_dir_listed=on_dir_listed
+        ):
+            pass
+
+        self.assertCountEqual(listed, self.TREE)
+        for dir_path, names in self.TREE.items():
+            for name, _ in names:
+                self.assertIn(f"{dir_path}/{name}", listed[dir_path])
+
+    async def test_iter_path_concurrent_newest_first(self) -> None:
+        """
+        测试按目录修改时间从新到旧遍历
+        """
+
+        tree = {
+            "/ani": [
+                ("2026-08", True, 0, "2026-08-30T00:00:00Z"),
+                ("2026-10", True, 0, "2026-10-16T00:00:00Z"),
+                ("2026-09", True, 0, "2026-09-30T00:00:00Z"),
+            ],
+            "/ani/2026-08": [("old", True, 0, "2026-08-01T00:00:00Z")],
+            "/ani/2026-08/old": [],
+            "/ani/2026-09": [],
+            "/ani/2026-10": [("new", True, 0, "2026-10-16T00:00:00Z")],
+            "/ani/2026-10/new": [("1.mkv", False)],
+        }
+        fake = FakeAlistClient(tree)
+        async for _ in fake.client.iter_path_concurrent(
+            "/ani", is_detail=False, max_workers=1, newest_first=True
+        ):
+            pass
+        self.assertEqual(
+            fake.listed,
+            [
+                "/ani",
+                "/ani/2026-10",
+                "/ani/2026-10/new",
+                "/ani/2026-09",
+                "/ani/2026-08",
+                "/ani/2026-08/old",
+            ],
+        )
+
+    async def test_iter_path_concurrent_time_budget(self) -> None:
+        """
+        测试超出时间预算后不再请求新的目录，遍历正常结束
+        """
+
+        tree = {"/": [(f"d{i}", True) for i in range(20)]}
+        tree |= {f"/d{i}": [("1.mkv", False)] for i in range(20)}
+        fake = FakeAlistClient(tree)
+        result = [
+            path
+            async for path in fake.client.iter_path_concurrent(
+                "/",
+                is_detail=False,
+                filter=lambda path: not path.is_dir,
+                max_workers=1,
+                time_budget=0.05,
+            )
+        ]
+        self.assertGreater(len(fake.listed), 1)
+        self.assertLess(len(fake.listed), 21)
+        self.assertEqual(len(result), len(fake.listed) - 1)
+
+    async def test_iter_path_concurrent_error(self) -> None:
+        """
+        测试遍历出错时异常会被抛出
+        """
+
+        fake = FakeAlistClient({"/media": [("missing", True)]})
+        with self.assertRaises(RuntimeError):
+            async for _ in fake.client.iter_path_concurrent(
+                "/media", is_detail=False
+            ):
+                pass
+
+
+class TestAlistRawURLResolver(unittest.IsolatedAsyncioTestCase):
+    """
+    raw_url 按需解析测试类
+    """
+
+    def setUp(self) -> None:
+        self.requests: list[str] = []
+        self.client = object.__new__(AlistClient)
+        self.client.async_api_fs_get = self.fs_get
+
+    async def fs_get(self, path: str) -> AlistEntry:
+        self.requests.append(path)
+        await sleep(0.02)
+        if path == "/missing.mkv":
+            raise RuntimeError(f"获取路径 {path} 详细信息失败")
+        entry = make_path(path, False)
+        entry.raw_url = f"https://raw.example.com{path}?n={len(self.requests)}"
+        return entry
+
+    async def test_single_flight_and_ttl(self) -> None:
+        """
+        测试并发请求同一路径只发出一次 fs/get，缓存过期后重新请求
+        """
+
+        resolver = AlistRawURLResolver(self.client, ttl=0.1)
+        urls = await gather(*(resolver.resolve("/a.mkv") for _ in range(10)))
+        self.assertEqual(set(urls), {"https://raw.example.com/a.mkv?n=1"})
+        self.assertEqual(await resolver.resolve("/a.mkv"), urls[0])
+        self.assertEqual(self.requests, ["/a.mkv"])
+
+        await sleep(0.15)
+        self.assertEqual(
+            await resolver.resolve("/a.mkv"), "https://raw.example.com/a.mkv?n=2"
+        )
+        metrics = resolver.metrics()
+        self.assertEqual(
+            (metrics["hits"], metrics["misses"], metrics["coalesced"]), (1, 2, 9)
+        )
+        self.assertGreater(metrics["latency_p50_ms"], 0)
+
+    async def test_lru_and_errors(self) -> None:
+        """
+        测试超出条目数上限时淘汰最久未使用的条目，解析失败不写入缓存
+        """
+
+        resolver = AlistRawURLResolver(self.client, max_size=2)
+        await resolver.resolve("/a.mkv")
+        await resolver.resolve("/b.mkv")
+        await resolver.resolve("/a.mkv")
+        await resolver.resolve("/c.mkv")
+        await resolver.resolve("/a.mkv")
+        await resolver.resolve("/b.mkv")
+        self.assertEqual(self.requests, ["/a.mkv", "/b.mkv", "/c.mkv", "/b.mkv"])
+
+        for _ in range(2):
+            with self.assertRaises(RuntimeError):
+                await resolver.resolve("/missing.mkv")
+        self.assertEqual(resolver.metrics()["errors"], 2)
+        self.assertEqual(resolver.metrics()["cache_size"], 2)
+
+
+class TestAlistClientToken(unittest.IsolatedAsyncioTestCase):
+    """
+    AlistClient 临时令牌刷新测试类
+    """
+
+    def setUp(self) -> None:
+        self.logins = 0
+        self.client = object.__new__(AlistClient)
+        self.client._AlistClient__refresh_task = None
+        self.client.async_api_auth_login = self.login
+
+    async def login(self) -> str:
+        self.logins += 1
+        await sleep(0.05)
+        return f"token-{self.logins}"
+
+    def set_token(self, token: str, expires: int) -> None:
+        self.client._AlistClient__token = {"token": token, "expires": expires}
+
+    async def get_token(self) -> str:
+        return await self.client._AlistClient__async_get_token()
+
+    async def test_single_flight(self) -> None:
+        """
+        测试令牌过期时并发请求只触发一次登录
+        """
+
+        self.set_token("expired", int(time()) - 1)
+        tokens = await gather(*(self.get_token() for _ in range(20)))
+        self.assertEqual(set(tokens), {"token-1"})
+        self.assertEqual(self.logins, 1)
+        self.assertEqual(await self.get_token(), "token-1")
+        self.assertEqual(self.logins, 1)
+
+    async def test_proactive_refresh(self) -> None:
+        """
+        测试令牌即将过期时不阻塞请求，在后台刷新
+        """
+
+        self.set_token("old", int(time()) + 60)
+        self.assertEqual(await self.get_token(), "old")
+        self.assertEqual(await self.get_token(), "old")
+        await sleep(0.1)
+        self.assertEqual(self.logins, 1)
+        self.assertEqual(await self.get_token(), "token-1")
+
+    async def test_permanent_token(self) -> None:
+        """
+        测试永久令牌不触发登录
+        """
+
+        self.set_token("permanent", -1)
+        self.assertEqual(await self.get_token(), "permanent")
+        self.assertEqual(self.logins, 0)
+
+
+class TestAlistClientInitialize(unittest.IsolatedAsyncioTestCase):
+    """
+    AlistClient 异步初始化测试类
+    """
+
+    def setUp(self) -> None:
+        self.calls = 0
+        self.fail = False
+        self.client = object.__new__(AlistClient)
+        self.client._AlistClient__init_task = None
+        self.client.async_api_me = self.api_me
+
+    async def api_me(self) -> None:
+        self.calls += 1
+        await sleep(0.01)
+        if self.fail:
+            raise RuntimeError("获取用户信息失败")
+        self.client.base_path = "/user"
+
+    async def test_ensure_initialized_once(self) -> None:
+        """
+        测试并发初始化只请求一次用户信息
+        """
+
+        await gather(*(self.client.ensure_initialized() for _ in range(10)))
+        await self.client.ensure_initialized()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.client.base_path, "/user")
+
+    async def test_ensure_initialized_retry(self) -> None:
+        """
+        测试初始化失败后再次调用会重新请求
+        """
+
+        self.fail = True
+        with self.assertRaises(RuntimeError):
+            await self.client.ensure_initialized()
+        self.fail = False
+        await self.client.ensure_initialized()
+        self.assertEqual(self.calls, 2)
+
+    async def test_rate_key(self) -> None:
+        """
+        测试限速匹配路径包含用户基础路径，与挂载路径一致
+        """
+
+        requests = []
+
+        async def request(method: str, url: str, sync: bool = False, **kwargs):
+            requests.append(kwargs.get("rate_key"))
+
+        self.client.base_path = "/user"
+        self.client._AlistClient__client = type("", (), {"request": staticmethod(request)})
+        await self.client._AlistClient__request(
+            "POST", "https://alist.nn.ci/api/fs/list", auth=False, json={"path": "/115"}
+        )
+        await self.client._AlistClient__request(
+            "GET", "https://alist.nn.ci/api/me", auth=False
+        )
+        self.assertEqual(requests, ["/user/115", None])
+
+
+class TestAlistListingCache(unittest.IsolatedAsyncioTestCase):
+    """
+    目录列表缓存增量遍历测试类
+    """
+
+    def setUp(self) -> None:
+        self.temp_dir = TemporaryDirectory(prefix="AutoFilm_")
+        self.db_path = Path(self.temp_dir.name) / "listing.db"
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    async def walk(
+        self, fake: FakeAlistClient, refresh: bool = False
+    ) -> list[str]:
+        cache = AlistListingCache(self.db_path, server=fake.client.url, refresh=refresh)
+        try:
+            return [
+                path.full_path
+                async for path in fake.client.iter_path_concurrent(
+                    "/media", is_detail=False, cache=cache
+                )
+            ]
+        finally:
+            cache.close()
+
+    async def test_incremental_walk(self) -> None:
+        """
+        测试未变化的目录使用缓存，不再请求 fs/list
+        """
+
+        fake = FakeAlistClient(TestAlistClientWalker.TREE)
+        first = await self.walk(fake)
+        self.assertEqual(len(fake.listed), 4)
+
+        fake.listed.clear()
+        second = await self.walk(fake)
+        self.assertCountEqual(second, first)
+        self.assertEqual(fake.listed, ["/media"])
+
+        fake.listed.clear()
+        await self.walk(fake, refresh=True)
+        self.assertEqual(len(fake.listed), 4)
+
+    async def test_modified_directory(self) -> None:
+        """
+        测试修改时间变化的目录重新请求 fs/list
+        """
+
+        fake = FakeAlistClient(TestAlistClientWalker.TREE)
+        await self.walk(fake)
+
+        cache = AlistListingCache(self.db_path, server=fake.client.url)
+        cache.set("/media/a", "2000-01-01T00:00:00Z", [])
+        cache.close()
+
+        fake.listed.clear()
+        result = await self.walk(fake)
+        self.assertCountEqual(fake.listed, ["/media", "/media/a"])
+        self.assertIn("/media/a/a1/3.mkv", result)
+
+
+class FakeResponse:
+    """
+    模拟 httpx.Response
+    """
+
+    status_code = 200
+
+    def __init__(self, result: dict) -> None:
+        self.result = result
+
+    def json(self) -> dict:
+        return self.result
+
+
+class TestAlistClientPagination(unittest.IsolatedAsyncioTestCase):
+    """
+    AlistClient 分页获取目录列表测试类
+    """
+
+    def setUp(self) -> None:
+        self.names = [f"{i:05d}.mkv" for i in range(2345)]
+        self.pages: list[tuple[int, int]] = []
+        self.client = object.__new__(AlistClient)
+        self.client.url = "https://alist.nn.ci"
+        self.client.base_path = "/"
+        self.client._AlistClient__post = self.post
+
+    async def post(self, url: str, json: dict, **_) -> FakeResponse:
+        page, per_page = json["page"], json["per_page"]
+        self.pages.append((page, per_page))
+        await sleep(0.01 * (10 - page))
+        if per_page == 0:
+            names = self.names
+        else:
+            names = self.names[(page - 1) * per_page : page * per_page]
+        content = [
+            make_path("/all/" + name, False).to_dict() for name in names
+        ]
+        return FakeResponse(
+            {
+                "code": 200,
+                "message": "success",
+                "data": {"content": content, "total": len(self.names)},
+            }
+        )
+
+    async def test_iter_fs_list_pages(self) -> None:
+        """
+        测试分页获取的条目与一次性获取的条目一致
+        """
+
+        pages = [
+            page async for page in self.client.iter_fs_list("/all", per_page=500)
+        ]
+        self.assertEqual(len(pages), 5)
+        self.assertEqual(len(pages[0]), 500)
+        self.assertEqual(sorted(page for page, _ in self.pages), [1, 2, 3, 4, 5])
+
+        paged = sorted(path.full_path for page in pages for path in page)
+        whole = [path.full_path for path in await self.client.async_api_fs_list("/all")]
+        self.assertEqual(paged, whole)
+
+    async def test_iter_fs_list_window(self) -> None:
+        """
+        测试调用方处理较慢时，已请求但未取走的页面不超过 max_workers 个
+        """
+
+        max_outstanding = consumed = pages = 0
+        async for _ in self.client.iter_fs_list("/all", per_page=100, max_workers=3):
+            consumed += 1
+            await sleep(0.05)
+            pages = len(self.pages)
+            max_outstanding = max(max_outstanding, pages - consumed)
+        self.assertEqual(consumed, 24)
+        self.assertEqual(pages, 24)
+        self.assertLessEqual(max_outstanding, 3)
+
+    async def test_iter_path_per_page(self) -> None:
+        """
+        测试分页模式下 iter_path 返回全部条目
+        """
+
+        result = [
+            path.name
+            async for path in self.client.iter_path(
+                "/all", is_detail=False, per_page=1000
+            )
+        ]
+        self.assertCountEqual(result, self.names)
+
+
+class TestAlistClientSearch(unittest.IsolatedAsyncioTestCase):
+    """
+    AlistClient 搜索索引枚举测试类
+    """
+
+    def setUp(self) -> None:
+        self.nodes = [
+            {
+                "parent": "/user/media/Show",
+                "name": f"{i:03d}.mkv",
+                "is_dir": False,
+                "size": i,
+                "type": 2,
+            }
+            for i in range(250)
+        ]
+        self.client = object.__new__(AlistClient)
+        self.client.url = "https://alist.nn.ci"
+        self.client.base_path = "/user"
+        self.client._AlistClient__post = self.post
+
+    async def post(self, url: str, json: dict, **_) -> FakeResponse:
+        self.assertTrue(url.endswith("/api/fs/search"))
+        page, per_page = json["page"], json["per_page"]
+        return FakeResponse(
+            {
+                "code": 200,
+                "message": "success",
+                "data": {
+                    "content": self.nodes[(page - 1) * per_page : page * per_page],
+                    "total": len(self.nodes),
+                },
+            }
+        )
+
+    async def test_iter_search(self) -> None:
+        """
+        测试搜索结果转换为相对用户根目录的 AlistPath
+        """
+
+        result = [
+            path
+            async for path in self.client.iter_search(
+                "/media", filter=lambda path: path.size % 2 == 0
+            )
+        ]
+        self.assertEqual(len(result), 125)
+        self.assertCountEqual(
+            [path.full_path for path in result],
+            [f"/media/Show/{i:03d}.mkv" for i in range(0, 250, 2)],
+        )
+        self.assertEqual(
+            result[0].download_url, "https://alist.nn.ci/d/user/media/Show/000.mkv"
+        )
+
+    async def test_search_base_path_prefix(self) -> None:
+        """
+        测试只去除完整的用户基础路径，名称以基础路径开头的目录不受影响
+        """
+
+        self.nodes = [
+            {"parent": parent, "name": "a.mkv", "is_dir": False, "size": 1, "type": 2}
+            for parent in ("/user", "/username/media")
+        ]
+        paths, _ = await self.client.async_api_fs_search("/")
+        self.assertEqual(
+            [path.full_path for path in paths], ["/a.mkv", "/username/media/a.mkv"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+from sys import path
+from os.path import dirname
+
+path.append(dirname(dirname(__file__)))
+
+import unittest
+
+from app.utils import AlistUtils
+
+
+class TestAlistUtils(unittest.TestCase):
+    """
+    Alist 工具测试类
+    """
+
+    def test_sign(self) -> None:
+        """
+        测试签名与 Alist 服务端算法（pkg/sign/hmac.go）的计算结果一致
+        """
+
+        # 期望值由 Alist 的 HMACSign.Sign 计算得到
+        secret = "alist-d22d23ddf42fvv2"
+        self.assertEqual(
+            AlistUtils.sign(secret, "/media/Show/S01E01.mkv"),
+            "iNvRihVrHqoHQe9qj4JnYn6HtKuHl9tZHmCVI5Dp8Sc=:0",
+        )
+        self.assertEqual(
+            AlistUtils.sign(
+                secret, "/user/ani/2024-10/[ANi] 凍牌~地下麻將鬥牌錄~ - 25 [1080P].mp4"
+            ),
+            "2v3o1iil6J8qjJP8X6BW0G_8CqwYviGV9jUgBgh9-DU=:0",
+        )
+        self.assertEqual(
+            AlistUtils.sign(secret, "/media/Show/S01E01.mkv", expire=1760000000),
+            "ESZbB1EILBMiw6oJ8KqHYs0Gow3Mbqr4XZtdBtxZ1Kw=:1760000000",
+        )
+        self.assertEqual(AlistUtils.sign("", "/media/Show/S01E01.mkv"), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
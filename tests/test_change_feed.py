@@ -0,0 +1,80 @@
+from sys import path
+from os.path import dirname
+
+path.append(dirname(dirname(__file__)))
+
+import unittest
+from asyncio import sleep
+
+from app.core.change_feed import ChangeFeed, collapse_paths
+
+
+class TestChangeFeed(unittest.IsolatedAsyncioTestCase):
+    """
+    目录变更推送队列测试类
+    """
+
+    def test_collapse_paths(self) -> None:
+        """
+        测试去除被包含的子路径，超出上限时逐层合并为上级目录
+        """
+
+        self.assertEqual(
+            collapse_paths(["/a/b", "/a/b/c", "/a-b", "/a/b/", "/x/y/z", "/a/bc"]),
+            ["/a/b", "/a/bc", "/a-b", "/x/y/z"],
+        )
+        self.assertEqual(
+            collapse_paths(["/a/1/x", "/a/2/y", "/a/3", "/b"], max_roots=3),
+            ["/a", "/b"],
+        )
+        self.assertEqual(collapse_paths(["/a", "/b", "/"]), ["/"])
+
+    async def test_debounce_and_coalesce(self) -> None:
+        """
+        测试连续推送的变更合并为一批，执行期间收到的变更进入下一批
+        """
+
+        batches: list[list[str]] = []
+
+        async def handler(dirs: list[str]) -> None:
+            batches.append(dirs)
+            await sleep(0.1)
+
+        feed = ChangeFeed(handler, debounce=0.05, max_delay=1)
+        for i in range(500):
+            feed.push([f"/ani/2026-10/Show{i % 5}", "/ani/2026-10/Show0/Season 1"])
+        await sleep(0.1)
+        self.assertEqual(len(batches), 1)
+        feed.push(["/ani/2026-10/Show9"])
+        await feed.join()
+
+        self.assertEqual(
+            batches,
+            [
+                [f"/ani/2026-10/Show{i}" for i in range(5)],
+                ["/ani/2026-10/Show9"],
+            ],
+        )
+        self.assertFalse(feed.running)
+
+    async def test_max_delay(self) -> None:
+        """
+        测试持续收到变更时，超过最长等待时间即执行
+        """
+
+        batches: list[list[str]] = []
+
+        async def handler(dirs: list[str]) -> None:
+            batches.append(dirs)
+
+        feed = ChangeFeed(handler, debounce=0.05, max_delay=0.2)
+        for i in range(10):
+            feed.push([f"/d{i}"])
+            await sleep(0.03)
+        self.assertEqual(len(batches), 1)
+        await feed.join()
+        self.assertEqual(sum(len(dirs) for dirs in batches), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
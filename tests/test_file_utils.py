@@ -0,0 +1,103 @@
+from sys import path
+from os.path import dirname
+
+path.append(dirname(dirname(__file__)))
+
+import unittest
+from os import chdir, chmod, getcwd, stat, symlink, umask
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from app.utils import FileUtils
+
+
+class TestFileUtils(unittest.TestCase):
+    """
+    本地文件工具测试类
+    """
+
+    def setUp(self) -> None:
+        self.temp_dir = TemporaryDirectory(prefix="AutoFilm_")
+        self.root = Path(self.temp_dir.name)
+        for name in ["a.strm", "A/b.strm", "A/B/c.strm", "A/B/d.nfo", "C/D/e.strm"]:
+            file = self.root / name
+            file.parent.mkdir(parents=True, exist_ok=True)
+            file.write_text(name, "utf-8")
+        (self.root / "Empty").mkdir()
+        symlink(self.root / "A", self.root / "Link")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_scan_files(self) -> None:
+        """
+        测试遍历结果与 Path 拼接的路径一致，且不进入符号链接目录
+        """
+
+        expected = [
+            str(file)
+            for file in self.root.rglob("*")
+            if file.is_file() and "Link" not in file.parts
+        ]
+        self.assertCountEqual(FileUtils.scan_files(self.root), expected)
+        self.assertEqual(
+            FileUtils.scan_files(self.root, recursive=False), [str(self.root / "a.strm")]
+        )
+
+        cwd = getcwd()
+        chdir(self.root)
+        try:
+            self.assertIn(str(Path(".") / "A" / "b.strm"), FileUtils.scan_files("."))
+        finally:
+            chdir(cwd)
+
+    def test_delete_and_prune(self) -> None:
+        """
+        测试删除文件后只删除因此变空的目录
+        """
+
+        files = [str(self.root / name) for name in ["A/B/c.strm", "A/B/d.nfo", "C/D/e.strm", "x.strm"]]
+        deleted, failed = FileUtils.delete_files(files, batch_size=2)
+        self.assertCountEqual(deleted, files)
+        self.assertEqual(failed, [])
+
+        removed = FileUtils.prune_empty_dirs(deleted, self.root)
+        self.assertCountEqual(
+            removed,
+            [str(self.root / name) for name in ["A/B", "C/D", "C"]],
+        )
+        self.assertTrue((self.root / "A" / "b.strm").exists())
+        self.assertTrue((self.root / "Empty").exists())
+
+    def test_write_if_changed(self) -> None:
+        """
+        测试内容相同时不写入，写入时不残留临时文件
+        """
+
+        file = self.root / "New" / "f.strm"
+        self.assertTrue(FileUtils.write_if_changed(file, "https://a/1.mkv"))
+        self.assertFalse(FileUtils.write_if_changed(file, "https://a/1.mkv"))
+        self.assertTrue(FileUtils.write_if_changed(file, "https://a/1"))
+        self.assertEqual(file.read_text("utf-8"), "https://a/1")
+        self.assertEqual([path.name for path in file.parent.iterdir()], ["f.strm"])
+
+    def test_write_if_changed_mode(self) -> None:
+        """
+        测试新文件的权限与直接创建的文件一致，已有文件保留原权限
+        """
+
+        old_umask = umask(0o022)
+        try:
+            file = self.root / "mode.strm"
+            FileUtils.write_if_changed(file, "https://a/1")
+            self.assertEqual(stat(file).st_mode & 0o777, 0o644)
+
+            chmod(file, 0o640)
+            FileUtils.write_if_changed(file, "https://a/2")
+            self.assertEqual(stat(file).st_mode & 0o777, 0o640)
+        finally:
+            umask(old_umask)
+
+
+if __name__ == "__main__":
+    unittest.main()
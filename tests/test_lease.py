@@ -0,0 +1,109 @@
+from sys import path
+from os.path import dirname
+
+path.append(dirname(dirname(__file__)))
+
+import unittest
+from multiprocessing import get_context
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import sleep
+
+from app.modules.alist2strm import Alist2StrmLeases
+
+
+UNITS = [f"unit{i:02d}" for i in range(20)]
+
+
+def lease_worker(db_path: str, owner: str) -> list[str]:
+    """
+    在子进程中依次获取并完成工作单元
+
+    :return: 本进程完成的工作单元
+    """
+    leases = Alist2StrmLeases(Path(db_path), task="task", ttl=60, owner=owner)
+    units = []
+    try:
+        # 另一个进程启动较晚、本轮已结束时不再开始新的一轮
+        if leases.join_round(UNITS, min_interval=60) is None:
+            return units
+        while (unit := leases.acquire()) is not None:
+            sleep(0.01)
+            units.append(unit)
+            leases.complete(unit)
+    finally:
+        leases.close()
+    return units
+
+
+class TestAlist2StrmLeases(unittest.TestCase):
+    """
+    工作单元租约测试类
+    """
+
+    def setUp(self) -> None:
+        self.temp_dir = TemporaryDirectory(prefix="AutoFilm_")
+        self.db_path = Path(self.temp_dir.name) / "lease.db"
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_two_processes(self) -> None:
+        """
+        测试两个进程共同完成一轮运行，每个工作单元只被处理一次
+        """
+
+        with get_context("spawn").Pool(2) as pool:
+            results = pool.starmap(
+                lease_worker, [(str(self.db_path), "a"), (str(self.db_path), "b")]
+            )
+
+        self.assertEqual(sorted(results[0] + results[1]), UNITS)
+
+    def test_expire_and_takeover(self) -> None:
+        """
+        测试租约过期后被其它实例接管，原持有者无法续约
+        """
+
+        a = Alist2StrmLeases(self.db_path, task="task", ttl=0.1, owner="a")
+        b = Alist2StrmLeases(self.db_path, task="task", ttl=0.1, owner="b")
+        self.addCleanup(a.close)
+        self.addCleanup(b.close)
+
+        self.assertEqual(a.join_round(["x"]), 1)
+        self.assertEqual(b.join_round(["y"]), 1)
+        self.assertEqual(a.acquire(), "x")
+        self.assertIsNone(b.acquire())
+        self.assertTrue(a.renew("x"))
+
+        sleep(0.2)
+        self.assertEqual(b.acquire(), "x")
+        self.assertFalse(a.renew("x"))
+        # 原持有者不能将已被接管的工作单元标记为完成，本轮仍未结束
+        self.assertFalse(a.complete("x"))
+        self.assertEqual(a.join_round(["x"]), 1)
+        self.assertTrue(b.complete("x"))
+
+        # 本轮刚结束时不开始新的一轮，超过间隔后开始新的一轮
+        self.assertIsNone(a.join_round(["x"], min_interval=60))
+        self.assertEqual(a.join_round(["x"]), 2)
+
+    def test_release(self) -> None:
+        """
+        测试释放的工作单元可以立即被其它实例获取
+        """
+
+        a = Alist2StrmLeases(self.db_path, task="task", ttl=60, owner="a")
+        b = Alist2StrmLeases(self.db_path, task="task", ttl=60, owner="b")
+        self.addCleanup(a.close)
+        self.addCleanup(b.close)
+
+        a.join_round(["x"])
+        b.join_round([])
+        self.assertEqual(a.acquire(), "x")
+        a.release("x")
+        self.assertEqual(b.acquire(), "x")
+
+
+if __name__ == "__main__":
+    unittest.main()
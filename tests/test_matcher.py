@@ -0,0 +1,76 @@
+from sys import path
+from os.path import dirname
+
+path.append(dirname(dirname(__file__)))
+
+import unittest
+
+from app.utils import PathMatcher
+
+
+class TestPathMatcher(unittest.TestCase):
+    """
+    路径匹配器测试类
+    """
+
+    def test_exclude(self) -> None:
+        """
+        测试各类排除规则对目录及其下文件生效
+        """
+
+        matcher = PathMatcher(
+            exclude=[
+                "@eaDir",
+                "BDMV/CLIPINF",
+                "/media/电影/预告片",
+                "extrafanart*",
+                "/media/*/Sample",
+                r"re:\.(iso|ISO)$",
+            ]
+        )
+        for path in [
+            "/media/@eaDir",
+            "/media/a/@eaDir/b.jpg",
+            "/media/Movie/BDMV/CLIPINF",
+            "/media/电影/预告片/a.mkv",
+            "/media/Show/extrafanart1",
+            "/media/Show/Sample/a.mkv",
+            "/media/a.iso",
+        ]:
+            self.assertFalse(matcher.match_file(path), path)
+        for path in [
+            "/media/eaDir/a.mkv",
+            "/media/Movie/BDMV/STREAM/00001.m2ts",
+            "/media/电影/预告片2/a.mkv",
+            "/media/Show/S01/Sample/a.mkv",
+            "/media/a.iso.mkv",
+        ]:
+            self.assertTrue(matcher.match_file(path), path)
+        self.assertFalse(matcher.match_dir("/media/Movie/BDMV/CLIPINF"))
+        self.assertTrue(matcher.match_dir("/media/Movie/BDMV"))
+
+    def test_include(self) -> None:
+        """
+        测试包含规则：绝对路径规则可以剪枝目录，其它规则只对文件生效
+        """
+
+        matcher = PathMatcher(include=["/media/电影", "/media/剧集/A"])
+        self.assertTrue(matcher.match_dir("/media"))
+        self.assertTrue(matcher.match_dir("/media/剧集"))
+        self.assertTrue(matcher.match_dir("/media/电影/B"))
+        self.assertFalse(matcher.match_dir("/media/剧集/B"))
+        self.assertFalse(matcher.match_dir("/media/动漫"))
+        self.assertTrue(matcher.match_file("/media/剧集/A/1.mkv"))
+        self.assertFalse(matcher.match_file("/media/剧集/1.mkv"))
+
+        matcher = PathMatcher(include=["*.mkv", "/media/电影"])
+        self.assertTrue(matcher.match_dir("/media/动漫"))
+        self.assertTrue(matcher.match_file("/media/动漫/1.mkv"))
+        self.assertTrue(matcher.match_file("/media/电影/1.mp4"))
+        self.assertFalse(matcher.match_file("/media/动漫/1.mp4"))
+
+        self.assertTrue(PathMatcher().match_file("/a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+from sys import path
+from os.path import dirname
+
+path.append(dirname(dirname(__file__)))
+
+import unittest
+from os import listdir
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from app.utils import SortedPathSet
+
+
+class TestSortedPathSet(unittest.TestCase):
+    """
+    外部排序路径集合测试类
+    """
+
+    def setUp(self) -> None:
+        self.temp_dir = TemporaryDirectory(prefix="AutoFilm_")
+        self.root = Path(self.temp_dir.name)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_spill_and_iterate(self) -> None:
+        """
+        测试超出内存缓存的路径写入有序段，遍历结果有序且去重，关闭后删除临时文件
+        """
+
+        paths = [f"/media/{i % 7}/{i}.strm" for i in range(50)] * 2
+        paths_set = SortedPathSet(self.root, buffer_size=8)
+        paths_set.update(paths)
+        self.assertTrue(listdir(self.root))
+
+        result = list(paths_set)
+        self.assertCountEqual(result, set(paths))
+        self.assertEqual(len(result), 50)
+
+        paths_set.close()
+        self.assertEqual(listdir(self.root), [])
+
+    def test_difference(self) -> None:
+        """
+        测试按目录层级排序的归并差集，包括名称前缀相同的目录与含换行符的文件名
+        """
+
+        local = ["a/b", "a-b", "a/c/d", "ab", "a\nb", "z/1", "z/2"]
+        remote = ["a/b", "a/c/d", "a\nb", "z/2", "y"]
+        with SortedPathSet(self.root, buffer_size=2) as local_files, SortedPathSet(
+            self.root, buffer_size=3
+        ) as remote_files:
+            local_files.update(Path(file) for file in local)
+            remote_files.update(remote)
+            self.assertEqual(
+                list(local_files.difference(remote_files)), ["a-b", "ab", "z/1"]
+            )
+
+    def test_export_runs(self) -> None:
+        """
+        测试有序段交给其它集合后由接收方遍历与删除
+        """
+
+        paths = [f"/media/{i}.strm" for i in range(20)] + ["/media/a\nb.strm"]
+        source = SortedPathSet(self.root, buffer_size=8)
+        source.update(paths)
+        target = SortedPathSet(self.root, buffer_size=8)
+        target.add("/media/0.strm")
+        target.import_runs(*source.export_runs())
+
+        source.close()
+        self.assertEqual(list(source), [])
+        self.assertCountEqual(list(target), paths)
+
+        target.close()
+        self.assertEqual(listdir(self.root), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
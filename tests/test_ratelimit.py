@@ -0,0 +1,105 @@
+from sys import path
+from os.path import dirname
+
+path.append(dirname(dirname(__file__)))
+
+import unittest
+from asyncio import create_task, gather, sleep
+from time import monotonic
+
+from app.utils import RateLimiter, TokenBucket
+
+
+class TestRateLimiter(unittest.IsolatedAsyncioTestCase):
+    """
+    请求速率限制器测试类
+    """
+
+    async def test_token_bucket_burst(self) -> None:
+        """
+        测试令牌桶先允许突发请求，之后按速率放行
+        """
+
+        bucket = TokenBucket(rate=20, burst=5)
+        start = monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        self.assertLess(monotonic() - start, 0.05)
+
+        for _ in range(4):
+            await bucket.acquire()
+        self.assertGreaterEqual(monotonic() - start, 0.19)
+
+    def test_overrides(self) -> None:
+        """
+        测试按主机和最长路径前缀选择令牌桶
+        """
+
+        limiter = RateLimiter(
+            rate=5,
+            burst=10,
+            overrides={
+                "/115": {"rate": 1, "burst": 2},
+                "/115/电影": {"rate": 2},
+                "/local": {"rate": 0},
+            },
+        )
+        url = "http://alist.example.com:5244/api/fs/list"
+
+        default = limiter.get_bucket(url, "/ali/动漫")
+        self.assertEqual((default.rate, default.burst), (5, 10))
+        self.assertIs(limiter.get_bucket(url), default)
+
+        bucket_115 = limiter.get_bucket(url, "/115/剧集/S01")
+        self.assertEqual((bucket_115.rate, bucket_115.burst), (1, 2))
+        self.assertIs(limiter.get_bucket(url, "/115"), bucket_115)
+        self.assertIs(limiter.get_bucket(url, "/1150"), default)
+
+        movie = limiter.get_bucket(url, "/115/电影/A")
+        self.assertEqual((movie.rate, movie.burst), (2, 10))
+
+        self.assertIsNone(limiter.get_bucket(url, "/local/a.mkv"))
+        self.assertIsNot(
+            limiter.get_bucket("http://other.example.com/api/fs/list", "/ali"),
+            default,
+        )
+
+    async def test_activate(self) -> None:
+        """
+        测试限速器只在启用它的上下文及其创建的任务中生效，不同任务互不影响
+        """
+
+        url = "http://alist.example.com:5244/api/fs/list"
+        slow = RateLimiter(rate=1, host=url)
+        fast = RateLimiter(rate=100, host=url)
+
+        async def current(limiter: RateLimiter) -> RateLimiter | None:
+            token = limiter.activate()
+            try:
+                await sleep(0)
+                return await create_task(get_current())
+            finally:
+                RateLimiter.deactivate(token)
+
+        async def get_current() -> RateLimiter | None:
+            return RateLimiter.current()
+
+        self.assertEqual(
+            await gather(current(slow), current(fast)), [slow, fast]
+        )
+        self.assertIsNone(RateLimiter.current())
+
+        # 只限制指定主机的请求
+        self.assertEqual(slow.get_bucket(url, "/115").rate, 1)
+        self.assertIsNone(slow.get_bucket("http://cdn.example.com/a.mkv"))
+
+    def test_unlimited(self) -> None:
+        """
+        测试未设置速率时不限速
+        """
+
+        self.assertIsNone(RateLimiter().get_bucket("http://alist.example.com"))
+
+
+if __name__ == "__main__":
+    unittest.main()